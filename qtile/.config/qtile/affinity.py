@@ -0,0 +1,61 @@
+# Group to screen affinity.
+#
+# Each group has a preferred screen. The table of where a group actually goes
+# is built once at config load and rebuilt whenever the set of outputs
+# changes, so switching groups is a single dict lookup and never tries to
+# focus a screen that isn't there any more. Groups whose preferred screen
+# disappeared fall back to the last surviving output.
+
+from libqtile.log_utils import logger
+
+
+class GroupAffinity:
+    def __init__(self, preferred, num_screens=1):
+        # group name -> preferred screen index
+        self.preferred = dict(preferred)
+        self.table = {}
+        self.num_screens = 0
+        self.rebuild(num_screens)
+
+    @classmethod
+    def split(cls, group_names, per_screen, num_screens=1):
+        """Give the first per_screen[0] groups screen 0, the next per_screen[1] screen 1, ..."""
+        preferred = {}
+        names = iter(group_names)
+        for screen, count in enumerate(per_screen):
+            for _ in range(count):
+                name = next(names, None)
+                if name is not None:
+                    preferred[name] = screen
+        # Anything left over goes with the last screen.
+        for name in names:
+            preferred[name] = len(per_screen) - 1
+        return cls(preferred, num_screens)
+
+    def rebuild(self, num_screens):
+        num_screens = max(num_screens, 1)
+        if num_screens == self.num_screens:
+            return
+        self.num_screens = num_screens
+        self.table = {
+            name: min(screen, num_screens - 1) for name, screen in self.preferred.items()
+        }
+
+    def screen_for(self, name):
+        return self.table.get(name)
+
+    def switch(self, qtile, name):
+        """Show group name on its screen and focus that screen."""
+        group = qtile.groups_map.get(name)
+        if group is None:
+            return
+        screen = self.screen_for(name)
+        if screen is not None and screen != qtile.current_screen.index:
+            qtile.focus_screen(screen)
+        group.toscreen()
+
+    def on_screens_changed(self, qtile):
+        old = self.num_screens
+        self.rebuild(len(qtile.screens))
+        if old != self.num_screens:
+            logger.info("group affinity rebuilt for %d screen(s)", self.num_screens)
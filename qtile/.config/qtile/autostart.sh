@@ -1,5 +1,9 @@
 #!/usr/bin/env bash
 
+# NOTE: config.py no longer runs this script. Autostart programs are declared
+# as services in config.py (autostart_services) and started by supervisor.py.
+# Kept for starting the session by hand outside of qtile.
+
 COLORSCHEME=tomorrow-night
 
 ### AUTOSTART PROGRAMS ###
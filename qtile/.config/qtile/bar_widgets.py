@@ -0,0 +1,61 @@
+# Widget factory for the bars.
+#
+# A logical widget (CPU, Memory, Volume, Clock) is built once and the same
+# instance is handed to every bar. qtile configures it on the first bar and
+# turns every later appearance into a Mirror, which only copies the rendered
+# surface. The data/update path therefore runs once no matter how many screens
+# there are. Only widgets whose output is the same on every screen can be
+# shared. Widgets that show per-screen state (GroupBox, CurrentLayout, Prompt,
+# WindowName, which shows the focused window of its own screen) are still
+# built per bar.
+
+import sys
+from collections import Counter
+
+
+def _sizeof(obj):
+    """Rough size of a widget: the object, its attribute dict and the values in it."""
+    size = sys.getsizeof(obj)
+    attrs = getattr(obj, "__dict__", None)
+    if attrs is not None:
+        size += sys.getsizeof(attrs)
+        size += sum(sys.getsizeof(v) for v in attrs.values())
+    return size
+
+
+class WidgetFactory:
+    def __init__(self):
+        self.shared_widgets = {}
+        self.built = []
+
+    def build(self, cls, **config):
+        """Build a new widget, used for widgets that differ per bar."""
+        instance = cls(**config)
+        self.built.append(instance)
+        return instance
+
+    def shared(self, name, cls, **config):
+        """Return the single instance of a logical widget, building it on first use."""
+        if name not in self.shared_widgets:
+            self.shared_widgets[name] = self.build(cls, **config)
+        return self.shared_widgets[name]
+
+    def reset(self):
+        """Forget shared instances so the next bar set gets fresh widgets."""
+        self.shared_widgets = {}
+        self.built = []
+
+    def report(self):
+        """Count the widgets built by the config and estimate their memory use."""
+        classes = Counter(type(w).__name__ for w in self.built)
+        mirrors = sum(len(getattr(w, "_mirrors", ())) for w in self.shared_widgets.values())
+        return {
+            "built": len(self.built),
+            "shared": len(self.shared_widgets),
+            "mirrors": mirrors,
+            "bytes": sum(_sizeof(w) for w in self.built),
+            "classes": dict(classes),
+        }
+
+
+factory = WidgetFactory()
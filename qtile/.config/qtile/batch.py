@@ -0,0 +1,65 @@
+# Batched window state changes.
+#
+# Every minimize, float or group move makes qtile relayout the group right
+# away, so touching N windows in a loop costs N layouts and N rounds of
+# configure requests and redraws. deferred_layout() holds those back while a
+# batch runs and lays each affected group out once at the end.
+
+from contextlib import contextmanager
+
+
+@contextmanager
+def deferred_layout(*groups):
+    """Swallow layout_all() calls on groups and run each one once on exit."""
+    pending = {}
+
+    def defer(group):
+        def layout_all(warp=False, focus=True):
+            pending[group] = (warp, focus)
+        return layout_all
+
+    for group in groups:
+        group.layout_all = defer(group)
+    try:
+        yield pending
+    finally:
+        for group in groups:
+            del group.layout_all
+        for group, (warp, focus) in pending.items():
+            group.layout_all(warp=warp, focus=focus)
+
+
+# group name -> ids of the windows hide_all() minimized there
+_hidden = {}
+
+
+def hide_all(group):
+    """Minimize every visible window in group and remember which ones."""
+    windows = [w for w in group.windows if hasattr(w, "toggle_minimize") and not w.minimized]
+    if not windows:
+        return 0
+    with group.qtile.core.masked(), deferred_layout(group):
+        for win in windows:
+            win.minimized = True
+    _hidden[group.name] = {win.wid for win in windows}
+    return len(windows)
+
+
+def restore_all(group):
+    """Un-minimize exactly the windows hide_all() hid, leaving others alone."""
+    wids = _hidden.pop(group.name, set())
+    windows = [w for w in group.windows if w.wid in wids and w.minimized]
+    if not windows:
+        return 0
+    with group.qtile.core.masked(), deferred_layout(group):
+        for win in windows:
+            win.minimized = False
+    return len(windows)
+
+
+def toggle_all(group):
+    """Restore the windows hidden earlier, or hide everything if nothing is hidden."""
+    hidden = _hidden.get(group.name)
+    if hidden and any(w.wid in hidden and w.minimized for w in group.windows):
+        return restore_all(group)
+    return hide_all(group)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# Headless benchmark for loading this config.
+#
+# Imports colors.py and config.py the way reload_config does, against the
+# stub libqtile in stub_libqtile.py (or the real one with --backend real),
+# and reports import time, time spent in each init_* function and how many
+# Key, Group, layout and widget objects the config builds. Exits non-zero
+# when a budget is exceeded so reload regressions show up before they reach
+# the desktop.
+#
+#   python bench/config_load.py
+#   python bench/config_load.py --budget import_ms=40 --budget widgets=40
+#   python bench/config_load.py --budgets other-budgets.json --json
+#
+# Budgets are read from bench/budgets.json unless --budgets says otherwise.
+
+import argparse
+import importlib
+import json
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.dirname(HERE)
+DEFAULT_BUDGETS = os.path.join(HERE, "budgets.json")
+
+
+def _forget_config_modules():
+    # Everything next to config.py is reloaded along with it by reload_config.
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if path and os.path.dirname(os.path.abspath(path)) == CONFIG_DIR:
+            del sys.modules[name]
+
+
+def _count_keys(keys):
+    count = 0
+    for key in keys:
+        count += 1
+        count += _count_keys(getattr(key, "submappings", []))
+    return count
+
+
+def _count_widgets(screens):
+    count = 0
+    for screen in screens:
+        for position in ("top", "bottom", "left", "right"):
+            bar = getattr(screen, position, None)
+            if bar is not None:
+                count += len(bar.widgets)
+    return count
+
+
+def load_once():
+    """Import config from scratch and return (timings, module)."""
+    _forget_config_modules()
+    start = time.perf_counter()
+    importlib.import_module("colors")
+    colors_done = time.perf_counter()
+    config = importlib.import_module("config")
+    end = time.perf_counter()
+    return {
+        "import_ms": (end - start) * 1000,
+        "colors_import_ms": (colors_done - start) * 1000,
+        "config_import_ms": (end - colors_done) * 1000,
+    }, config
+
+
+def time_init_functions(config, rounds):
+    """Time every init_* function in the config on its own."""
+    results = {}
+    for name in sorted(dir(config)):
+        func = getattr(config, name)
+        if not name.startswith("init_") or not callable(func):
+            continue
+        samples = []
+        for _ in range(rounds):
+            factory = getattr(config, "factory", None)
+            if factory is not None:
+                factory.reset()
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = statistics.median(samples)
+    return results
+
+
+def count_objects(config):
+    counts = {
+        "keys": _count_keys(config.keys),
+        "groups": len(config.groups),
+        "layouts": len(config.layouts),
+        "widgets": _count_widgets(config.screens),
+        "screens": len(config.screens),
+    }
+    factory = getattr(config, "factory", None)
+    if factory is not None:
+        counts["widget_objects"] = factory.report()["built"]
+    keymap = getattr(config, "keymap", None)
+    if keymap is not None:
+        counts["key_conflicts"] = len(keymap.conflicts)
+    return counts
+
+
+def run(rounds=20):
+    imports = []
+    config = None
+    for _ in range(rounds):
+        timings, config = load_once()
+        imports.append(timings)
+    report = {
+        key: statistics.median(t[key] for t in imports) for key in imports[0]
+    }
+    report["counts"] = count_objects(config)
+    report["init_ms"] = time_init_functions(config, rounds)
+    return report
+
+
+def check_budgets(report, budgets):
+    """Return a list of (name, value, limit) for every exceeded budget."""
+    flat = dict(report["counts"])
+    flat.update({k: v for k, v in report.items() if isinstance(v, float)})
+    flat.update({name + "_ms": v for name, v in report["init_ms"].items()})
+    failures = []
+    for name, limit in budgets.items():
+        if name not in flat:
+            raise SystemExit("unknown budget: %s (have: %s)" % (name, ", ".join(sorted(flat))))
+        if flat[name] > limit:
+            failures.append((name, flat[name], limit))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading the qtile config.")
+    parser.add_argument("--backend", choices=["stub", "real"], default="stub",
+                        help="libqtile to load the config against")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--budgets", default=DEFAULT_BUDGETS,
+                        help="JSON file mapping metric name to limit")
+    parser.add_argument("--budget", action="append", default=[], metavar="NAME=LIMIT",
+                        help="single budget, may be repeated")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    if args.backend == "stub":
+        sys.path.insert(0, HERE)
+        import stub_libqtile
+        stub_libqtile.install()
+    sys.path.insert(0, CONFIG_DIR)
+
+    report = run(args.rounds)
+
+    budgets = {}
+    if args.budgets and os.path.exists(args.budgets):
+        with open(args.budgets) as f:
+            budgets.update(json.load(f))
+    for item in args.budget:
+        name, _, limit = item.partition("=")
+        budgets[name] = float(limit)
+    failures = check_budgets(report, budgets)
+
+    if args.json:
+        report["budget_failures"] = [
+            {"name": n, "value": v, "limit": l} for n, v, l in failures
+        ]
+        print(json.dumps(report, indent=2))
+    else:
+        print("import:  %.2f ms (colors %.2f ms, config %.2f ms)" % (
+            report["import_ms"], report["colors_import_ms"], report["config_import_ms"]))
+        for name, ms in report["init_ms"].items():
+            print("  %-24s %.3f ms" % (name, ms))
+        for name, count in report["counts"].items():
+            print("  %-24s %d" % (name, count))
+        for name, value, limit in failures:
+            print("OVER BUDGET: %s = %.2f (limit %.2f)" % (name, value, limit))
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# Map-request float decision benchmark.
+#
+# Times the "should this new window float?" check the way layout.Floating does
+# it (every Match in turn) against float_rules.FloatRuleIndex, for the rules in
+# config.py padded out with extra synthetic rules. Windows come from a small
+# pool of classes and titles, like a Slack or browser session opening popups.
+#
+#   python bench/float_rules.py
+#   python bench/float_rules.py --sizes 25 100 400 --windows 5000 --json
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.dirname(HERE)
+
+
+class FakeWindow:
+    """Just enough of a client for Match.compare() and FloatRuleIndex."""
+
+    def __init__(self, wid, wm_class, title, wm_type="normal"):
+        self.wid = wid
+        self.name = title
+        self._wm_class = wm_class
+        self._wm_type = wm_type
+        self.fetches = 0
+
+    def get_wm_class(self):
+        self.fetches += 1
+        return self._wm_class
+
+    def get_wm_type(self):
+        self.fetches += 1
+        return self._wm_type
+
+    def get_wm_role(self):
+        self.fetches += 1
+        return None
+
+    def get_pid(self):
+        return 0
+
+    def match(self, rule):
+        return rule.compare(self)
+
+
+def make_windows(count, seed=1):
+    rng = random.Random(seed)
+    pool = [
+        (["slack", "Slack"], "Slack call"),
+        (["slack", "Slack"], "Slack | general"),
+        (["google-chrome", "Google-chrome"], "Inbox - Google Chrome"),
+        (["google-chrome", "Google-chrome"], "Save File"),
+        (["kitty", "kitty"], "~/src"),
+        (["tasty.javafx.launcher.LauncherFxApp"] * 2, "tastytrade"),
+        (["pinentry-gtk-2", "Pinentry-gtk-2"], "pinentry"),
+        (["gitk", "Gitk"], "branchdialog"),
+    ]
+    return [FakeWindow(i, *rng.choice(pool)) for i in range(count)]
+
+
+def pad_rules(Match, rules, size):
+    rules = list(rules)
+    n = 0
+    while len(rules) < size:
+        if n % 3 == 2:
+            rules.append(Match(title=re.compile(r"^popup-%d\b" % n)))
+        else:
+            rules.append(Match(wm_class="synthetic-app-%d" % n))
+        n += 1
+    return rules
+
+
+def time_decisions(decide, windows):
+    start = time.perf_counter()
+    floated = sum(1 for win in windows if decide(win))
+    elapsed = time.perf_counter() - start
+    return elapsed * 1e6 / len(windows), floated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark float rule matching.")
+    parser.add_argument("--backend", choices=["stub", "real"], default="stub")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[25, 50, 100, 200, 400])
+    parser.add_argument("--windows", type=int, default=2000)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.backend == "stub":
+        sys.path.insert(0, HERE)
+        import stub_libqtile
+        stub_libqtile.install()
+    sys.path.insert(0, CONFIG_DIR)
+    import config
+    import float_rules
+    from libqtile.config import Match
+
+    base_rules = config.floating_layout.float_rules
+    results = []
+    for size in args.sizes:
+        rules = pad_rules(Match, base_rules, size)
+        windows = make_windows(args.windows)
+        linear_us, linear_floated = time_decisions(
+            lambda win: any(win.match(rule) for rule in rules), windows)
+        linear_fetches = sum(w.fetches for w in windows)
+
+        windows = make_windows(args.windows)
+        index = float_rules.FloatRuleIndex(rules)
+        indexed_us, indexed_floated = time_decisions(index.match, windows)
+        indexed_fetches = sum(w.fetches for w in windows)
+
+        if linear_floated != indexed_floated:
+            raise SystemExit("indexed matching disagrees with Match.compare at %d rules" % size)
+        results.append({
+            "rules": len(rules),
+            "linear_us": linear_us,
+            "indexed_us": indexed_us,
+            "speedup": linear_us / indexed_us if indexed_us else float("inf"),
+            "linear_fetches_per_window": linear_fetches / args.windows,
+            "indexed_fetches_per_window": indexed_fetches / args.windows,
+            "cache_hits": index.hits,
+            "cache_misses": index.misses,
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print("%6s %12s %12s %8s %16s" % ("rules", "linear us", "indexed us", "speedup", "fetches/window"))
+    for r in results:
+        print("%6d %12.2f %12.2f %7.1fx %8.1f -> %.1f" % (
+            r["rules"], r["linear_us"], r["indexed_us"], r["speedup"],
+            r["linear_fetches_per_window"], r["indexed_fetches_per_window"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
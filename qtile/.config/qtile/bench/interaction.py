@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# Headless multi-screen interaction benchmark.
+#
+# Starts Xvfb with one screen wide enough for --screens monitors of --size,
+# runs qtile on it with bench/interaction_config.py (this config, with the
+# init_screens() bars laid out side by side as fake_screens) and times:
+#
+#   map_N            mapping N client windows, one at a time (--windows)
+#   layout_cycle     mod+Tab through MonadTall, MonadWide, Tile, Max and VirtualTall
+#   group_switch     mod+1..0, i.e. switch_to_group_on_monitor
+#   minimize_all     mod+shift+m, hiding and restoring every window
+#
+# Keys are injected with XTEST. A sample is the time from sending the key
+# press (or the map request) until qtile has finished relaying out and
+# flushing the bars for it, see Probe in interaction_config.py. Needs Xvfb,
+# qtile and xcffib (which qtile depends on).
+#
+#   python bench/interaction.py
+#   python bench/interaction.py --windows 10 100 --rounds 30 --output run.json
+#   python bench/interaction.py --baseline run.json
+
+import argparse
+import ast
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.dirname(HERE)
+BENCH_CONFIG = os.path.join(HERE, "interaction_config.py")
+
+KEYSYMS = {
+    "mod4": 0xFFEB,  # Super_L
+    "shift": 0xFFE1,  # Shift_L
+    "Tab": 0xFF09,
+    "m": 0x006D,
+}
+KEYSYMS.update({str(d): 0x30 + d for d in range(10)})
+GROUPS = ["1", "2", "3", "4", "5", "6", "7", "8", "9", "0"]
+LAYOUT_COUNT = 5
+
+
+def percentile(ordered, p):
+    return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+
+def summarize(samples, timeouts):
+    ordered = sorted(samples)
+    if not ordered:
+        return {"n": 0, "timeouts": timeouts}
+    return {
+        "n": len(ordered),
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3),
+        "timeouts": timeouts,
+    }
+
+
+class Session:
+    """Xvfb plus qtile running the bench config, and the ways to drive them."""
+
+    def __init__(self, screens, width, height, display, env=None):
+        self.screens = screens
+        self.width = width
+        self.height = height
+        self.display = display
+        self.env = env or {}
+        self.workdir = tempfile.mkdtemp(prefix="qtile-bench-")
+        self.socket = os.path.join(self.workdir, "qtile.sock")
+        self.xvfb = None
+        self.qtile = None
+        self.conn = None
+        self.client = None
+        self.windows = []
+        self.atoms = {}
+        # Whether sending an event first asks the probe for its count, which
+        # settle() needs. Sending on a schedule turns it off, see replay.py.
+        self.counting = True
+
+    def start(self, timeout=20.0):
+        for program in ("Xvfb", "qtile"):
+            if shutil.which(program) is None:
+                raise SystemExit("%s not found, it's needed to run this benchmark" % program)
+        self.xvfb = subprocess.Popen(
+            ["Xvfb", self.display, "-screen", "0",
+             "%dx%dx24" % (self.width * self.screens, self.height), "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        x_socket = "/tmp/.X11-unix/X" + self.display.lstrip(":")
+        self._wait(lambda: os.path.exists(x_socket), timeout, "Xvfb didn't start")
+
+        env = dict(os.environ, DISPLAY=self.display,
+                   QTILE_BENCH_SCREEN="%dx%d" % (self.width, self.height),
+                   QTILE_BENCH_WORKDIR=self.workdir, **self.env)
+        self.qtile = subprocess.Popen(
+            ["qtile", "start", "-b", "x11", "-c", BENCH_CONFIG, "-s", self.socket,
+             "-l", "WARNING"],
+            env=env, stdout=subprocess.DEVNULL, stderr=open(os.path.join(self.workdir, "qtile.log"), "w"),
+        )
+
+        from libqtile.command.client import InteractiveCommandClient
+        from libqtile.command.interface import IPCCommandInterface
+        from libqtile.ipc import Client
+
+        self.client = InteractiveCommandClient(IPCCommandInterface(Client(self.socket)))
+        self._wait(self._responding, timeout, "qtile didn't start, see %s/qtile.log" % self.workdir)
+
+        import xcffib
+        import xcffib.xproto
+        import xcffib.xtest
+
+        self.conn = xcffib.connect(display=self.display)
+        self.xproto = xcffib.xproto
+        self.xtest = self.conn(xcffib.xtest.key)
+        self.root = self.conn.get_setup().roots[0]
+        self.keymap = self._keymap()
+        self.keycodes = {}
+        for name, keysym in KEYSYMS.items():
+            if keysym not in self.keymap:
+                raise SystemExit("no keycode for %s in the Xvfb keymap" % name)
+            self.keycodes[name] = self.keymap[keysym]
+
+    def stop(self):
+        if self.conn is not None:
+            self.conn.disconnect()
+        for proc in (self.qtile, self.xvfb):
+            if proc is not None and proc.poll() is None:
+                proc.terminate()
+                try:
+                    proc.wait(5)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def _wait(self, ready, timeout, message):
+        deadline = time.monotonic() + timeout
+        while not ready():
+            if time.monotonic() > deadline:
+                raise SystemExit(message)
+            time.sleep(0.05)
+
+    def _responding(self):
+        if not os.path.exists(self.socket):
+            return False
+        try:
+            self.client.status()
+            return True
+        except Exception:
+            return False
+
+    def _keymap(self):
+        """{keysym: first keycode that produces it}"""
+        setup = self.conn.get_setup()
+        count = setup.max_keycode - setup.min_keycode + 1
+        reply = self.conn.core.GetKeyboardMapping(setup.min_keycode, count).reply()
+        per = reply.keysyms_per_keycode
+        keymap = {}
+        for i in range(count):
+            for keysym in reply.keysyms[i * per:(i + 1) * per]:
+                if keysym:
+                    keymap.setdefault(keysym, setup.min_keycode + i)
+        return keymap
+
+    def atom(self, name):
+        if name not in self.atoms:
+            self.atoms[name] = self.conn.core.InternAtom(False, len(name), name).reply().atom
+        return self.atoms[name]
+
+    # Driving
+
+    def probe(self):
+        ok, result = self.client.eval("__import__('interaction_config').probe.state()")
+        if not ok:
+            raise SystemExit("probe failed: %s" % result)
+        return ast.literal_eval(result)
+
+    def event_count(self):
+        return self.probe()[1] if self.counting else None
+
+    def frames_since(self, start):
+        """monotonic times of the frames qtile made from start on."""
+        ok, result = self.client.eval("__import__('interaction_config').probe.frames_since(%r)" % start)
+        if not ok:
+            raise SystemExit("probe failed: %s" % result)
+        return ast.literal_eval(result)
+
+    def settle(self, start, events=None, quiet=0.03, timeout=2.0):
+        """ms from start until qtile has done something after the probe counted
+        events and then been quiet for `quiet` seconds, None on timeout."""
+        deadline = start + timeout
+        while True:
+            now = time.monotonic()
+            last, count, busy = self.probe()
+            if (events is None or count > events) and not busy and now - last >= quiet:
+                return (last - start) * 1000
+            if now > deadline:
+                return None
+            time.sleep(0.001)
+
+    def _fake(self, kind, keycode):
+        self.xtest.FakeInput(kind, keycode, 0, self.root.root, 0, 0, 0)
+
+    def press_keycodes(self, modifiers, keycode):
+        """Send the key with the modifier keys held, return (start, probe events before)."""
+        events = self.event_count()
+        start = time.monotonic()
+        for mod in modifiers:
+            self._fake(2, mod)
+        self._fake(2, keycode)
+        self._fake(3, keycode)
+        for mod in reversed(modifiers):
+            self._fake(3, mod)
+        self.conn.flush()
+        return start, events
+
+    def press(self, modifiers, key):
+        return self.press_keycodes([self.keycodes[m] for m in modifiers], self.keycodes[key])
+
+    def _set_text(self, wid, prop, kind, text):
+        data = text.encode("utf-8")
+        self.conn.core.ChangeProperty(
+            self.xproto.PropMode.Replace, wid, prop, kind, 8, len(data), data)
+
+    def map_window(self, title=None, instance=None, cls=None, wm_type=None):
+        events = self.event_count()
+        wid = self.conn.generate_id()
+        start = time.monotonic()
+        self.conn.core.CreateWindow(
+            self.root.root_depth, wid, self.root.root, 0, 0, 200, 150, 0,
+            self.xproto.WindowClass.InputOutput, self.root.root_visual, 0, [],
+        )
+        if title:
+            self.set_title(wid, title, flush=False)
+        if instance or cls:
+            self._set_text(wid, self.xproto.Atom.WM_CLASS, self.xproto.Atom.STRING,
+                           "%s\0%s\0" % (instance, cls))
+        if wm_type:
+            atom = self.atom("_NET_WM_WINDOW_TYPE_" + wm_type.upper())
+            self.conn.core.ChangeProperty(
+                self.xproto.PropMode.Replace, wid, self.atom("_NET_WM_WINDOW_TYPE"),
+                self.xproto.Atom.ATOM, 32, 1, [atom])
+        self.conn.core.MapWindow(wid)
+        self.conn.flush()
+        self.windows.append(wid)
+        return start, events
+
+    def set_title(self, wid, title, flush=True):
+        events = self.event_count() if flush else None
+        start = time.monotonic()
+        self._set_text(wid, self.xproto.Atom.WM_NAME, self.xproto.Atom.STRING, title)
+        self._set_text(wid, self.atom("_NET_WM_NAME"), self.atom("UTF8_STRING"), title)
+        if flush:
+            self.conn.flush()
+        return start, events
+
+    def destroy_window(self, wid):
+        events = self.event_count()
+        start = time.monotonic()
+        self.conn.core.DestroyWindow(wid)
+        self.conn.flush()
+        self.windows.remove(wid)
+        return start, events
+
+    def destroy_windows(self):
+        for wid in self.windows:
+            self.conn.core.DestroyWindow(wid)
+        self.conn.flush()
+        self.windows = []
+        self.settle(time.monotonic(), timeout=10.0)
+
+
+def time_actions(session, action, rounds):
+    samples, timeouts = [], 0
+    for i in range(rounds):
+        ms = session.settle(*action(i))
+        if ms is None:
+            timeouts += 1
+        else:
+            samples.append(ms)
+    return summarize(samples, timeouts)
+
+
+def run(session, window_counts, rounds, working_set):
+    results = {}
+    session.settle(*session.press(["mod4"], "1"))
+    for count in window_counts:
+        results["map_%d" % count] = time_actions(session, lambda i: session.map_window(), count)
+        session.destroy_windows()
+
+    for _ in range(working_set):
+        session.settle(*session.map_window())
+    results["layout_cycle"] = time_actions(
+        session, lambda i: session.press(["mod4"], "Tab"), max(rounds, LAYOUT_COUNT))
+    results["group_switch"] = time_actions(
+        session, lambda i: session.press(["mod4"], GROUPS[(i + 1) % len(GROUPS)]), rounds)
+    session.settle(*session.press(["mod4"], "1"))
+    # Every press flips between hidden and restored, keep the count even.
+    results["minimize_all"] = time_actions(
+        session, lambda i: session.press(["mod4", "shift"], "m"), rounds + rounds % 2)
+    session.destroy_windows()
+    return results
+
+
+def compare(results, baseline):
+    lines = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if not before or "p95_ms" not in before or "p95_ms" not in now:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            delta = now[key] - before[key]
+            pct = delta / before[key] * 100 if before[key] else 0.0
+            lines.append("%-16s %-7s %9.2f -> %9.2f  (%+.1f%%)" % (
+                name, key[:3], before[key], now[key], pct))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark keypress-to-frame latency on several screens.")
+    parser.add_argument("--screens", type=int, default=3)
+    parser.add_argument("--size", default="3440x1440", help="WIDTHxHEIGHT of each screen")
+    parser.add_argument("--windows", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--working-set", type=int, default=20,
+                        help="windows open during the layout, group and minimize runs")
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--display", default=":99")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    session = Session(args.screens, width, height, args.display)
+    try:
+        session.start()
+        results = run(session, args.windows, args.rounds, args.working_set)
+    finally:
+        session.stop()
+
+    import libqtile
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "screens": args.screens,
+            "size": args.size,
+            "rounds": args.rounds,
+            "working_set": args.working_set,
+            "qtile": getattr(libqtile, "__version__", None),
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print("%-16s %6s %9s %9s %9s %9s %8s" % (
+            "scenario", "n", "p50 ms", "p95 ms", "p99 ms", "max ms", "timeouts"))
+        for name, r in results.items():
+            if not r["n"]:
+                print("%-16s all %d samples timed out" % (name, r["timeouts"]))
+                continue
+            print("%-16s %6d %9.2f %9.2f %9.2f %9.2f %8d" % (
+                name, r["n"], r["p50_ms"], r["p95_ms"], r["p99_ms"], r["max_ms"], r["timeouts"]))
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        for line in compare(results, baseline):
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
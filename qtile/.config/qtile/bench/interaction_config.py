@@ -0,0 +1,110 @@
+# qtile config used by bench/interaction.py.
+#
+# Loads the real config.py and lays the screens from init_screens() side by
+# side as fake_screens, so one wide Xvfb screen stands in for several
+# monitors. Things that would start programs on a headless display (autostart,
+# the prewarm pools) are unhooked.
+#
+# Probe records when qtile last relaid out a group or flushed a bar. The
+# driver reads it over IPC to tell when a keypress has finished producing its
+# frame:
+#
+#   qtile cmd-obj -o cmd -f eval -a "__import__('interaction_config').probe.state()"
+#
+# It also keeps the time of every recent frame, bench/replay.py reads them
+# with probe.frames_since(t) to attribute frames to the events it sent.
+#
+# Screen geometry comes from QTILE_BENCH_SCREEN ("3440x1440", the default).
+# Files the config would keep under ~/.cache, like the session snapshot, go
+# to QTILE_BENCH_WORKDIR instead, so a bench run never touches the real ones.
+# With QTILE_BENCH_NO_SPAWN set, keybindings don't start programs. Replayed
+# traces already contain the windows those programs opened.
+
+import collections
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from libqtile import hook, qtile
+from libqtile.config import Screen
+
+import config
+import redraw
+import session_state
+import spawner
+import wmtrace
+from config import *  # noqa: F401,F403
+
+hook.unsubscribe.startup_once(config.start_once)
+hook.unsubscribe.startup_complete(config.start_prewarm)
+
+workdir = os.environ.get("QTILE_BENCH_WORKDIR") or tempfile.mkdtemp(prefix="qtile-bench-")
+session_state.state.path = os.path.join(workdir, "session.qstate")
+# A replayed trace may hold the mod+p e that toggles recording.
+wmtrace.recorder.start = lambda path=None: None
+
+_width, _height = (int(v) for v in os.environ.get("QTILE_BENCH_SCREEN", "3440x1440").split("x"))
+fake_screens = [
+    Screen(top=screen.top, x=i * _width, y=0, width=_width, height=_height)
+    for i, screen in enumerate(config.screens)
+]
+
+
+class Probe:
+    def __init__(self):
+        self.last = 0.0
+        self.events = 0
+        self.frames = collections.deque(maxlen=65536)
+
+    def touch(self):
+        self.last = time.monotonic()
+        self.events += 1
+        self.frames.append(self.last)
+
+    def frames_since(self, start):
+        return [t for t in self.frames if t >= start]
+
+    def busy(self):
+        """Whether a bar flush is still scheduled."""
+        return any(state["handle"] is not None for state in redraw.scheduler.state.values())
+
+    def state(self):
+        return (self.last, self.events, self.busy())
+
+
+probe = Probe()
+
+
+def _flush(b, flush=redraw.scheduler.flush):
+    flush(b)
+    probe.touch()
+
+
+redraw.scheduler.flush = _flush
+
+
+@hook.subscribe.startup_complete
+def _watch_relayouts():
+    group_class = type(qtile.current_group)
+    layout_all = group_class.layout_all
+
+    def counted(self, *args, **kwargs):
+        try:
+            return layout_all(self, *args, **kwargs)
+        finally:
+            probe.touch()
+
+    group_class.layout_all = counted
+
+
+if os.environ.get("QTILE_BENCH_NO_SPAWN"):
+    # Without the helper, spawner falls back to qtile.spawn.
+    spawner.spawner.start = lambda: None
+
+    @hook.subscribe.startup_complete
+    def _no_spawn():
+        qtile.spawn = lambda *args, **kwargs: 0
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# Layout cache hit rate for the mod+f binding.
+#
+# mod+f switches the group between monadtall and max with
+# layout_cache.switch_layout() and then toggles fullscreen on the focused
+# window, which makes qtile fire float_change. This drives that sequence
+# against a fake group that counts its layout passes, with and without the
+# cache, and reports cache hits and misses and layout passes per press. The
+# fullscreen toggle always costs one pass, qtile relays out the group when a
+# window enters or leaves fullscreen. Windows are occasionally opened and closed between presses, a
+# change the cache has to notice.
+#
+#   python bench/layout_toggle.py
+#   python bench/layout_toggle.py --windows 20 --presses 1000 --json
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.dirname(HERE)
+
+
+class Rect:
+    def __init__(self, x, y, width, height):
+        self.x, self.y, self.width, self.height = x, y, width, height
+
+
+class FakeScreen:
+    def get_rect(self):
+        return Rect(0, 0, 3440, 1410)
+
+
+class FakeLayout:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeWindow:
+    def __init__(self, wid):
+        self.wid = wid
+        self.floating = False
+        self.fullscreen = False
+        self.hidden = False
+        self.x = self.y = self.width = self.height = 0
+        self.borderwidth = 0
+        self.bordercolor = None
+        self.group = None
+
+    def place(self, x, y, width, height, borderwidth, bordercolor):
+        self.x, self.y, self.width, self.height = x, y, width, height
+        self.borderwidth, self.bordercolor = borderwidth, bordercolor
+
+    def hide(self):
+        self.hidden = True
+
+    def unhide(self):
+        self.hidden = False
+
+    def focus(self, warp):
+        pass
+
+
+class FakeCore:
+    @contextlib.contextmanager
+    def masked(self):
+        yield
+
+
+class FakeQtile:
+    def __init__(self):
+        self.core = FakeCore()
+        self.current_screen = FakeScreen()
+        self.current_window = None
+
+
+class FakeGroup:
+    name = "1"
+
+    def __init__(self, qtile):
+        self.qtile = qtile
+        self.screen = qtile.current_screen
+        self.windows = []
+        self.current_window = None
+        self._layout = FakeLayout("monadtall")
+        self.passes = 0
+
+    @property
+    def layout(self):
+        return self._layout
+
+    @layout.setter
+    def layout(self, name):
+        self._layout = FakeLayout(name)
+        self.layout_all()
+
+    def layout_all(self, warp=False, focus=True):
+        self.passes += 1
+        rect = self.screen.get_rect()
+        tiled = [w for w in self.windows if not w.floating]
+        for i, win in enumerate(tiled):
+            if self._layout.name == "max":
+                if win is not self.current_window:
+                    win.hide()
+                    continue
+                win.place(rect.x, rect.y, rect.width, rect.height, 0, None)
+            elif i == 0:
+                win.place(rect.x, rect.y, rect.width // 2, rect.height, 0, None)
+            else:
+                height = rect.height // (len(tiled) - 1)
+                win.place(rect.width // 2, (i - 1) * height, rect.width // 2, height, 0, None)
+            win.unhide()
+        for win in self.windows:
+            if win.fullscreen:
+                win.place(rect.x, rect.y, rect.width, rect.height, 0, None)
+
+
+def run(layout_cache, windows, presses, use_cache, seed=1):
+    qtile = FakeQtile()
+    layout_cache.qtile = qtile
+    layout_cache._cache.clear()
+    layout_cache._fullscreen.clear()
+    layout_cache.stats.update(hits=0, misses=0)
+    group = FakeGroup(qtile)
+    next_wid = iter(range(1, 1 << 30))
+
+    def open_window():
+        win = FakeWindow(next(next_wid))
+        win.group = group
+        group.windows.append(win)
+        group.current_window = qtile.current_window = win
+        layout_cache.on_group_window_change(group, win)
+        group.layout_all()
+
+    def close_window():
+        win = group.windows.pop(0)
+        layout_cache.on_client_killed(win)
+        group.current_window = qtile.current_window = group.windows[-1]
+        layout_cache.on_group_window_change(group, win)
+        group.layout_all()
+
+    for _ in range(windows):
+        open_window()
+    rng = random.Random(seed)
+    passes = 0
+    for press in range(presses):
+        # Windows change now and then, never in the middle of a press pair.
+        if press % 2 == 0 and rng.random() < 0.05:
+            if rng.random() < 0.5:
+                open_window()
+            else:
+                close_window()
+        before = group.passes
+        # maximize_by_switching_layout()
+        name = "max" if group.layout.name == "monadtall" else "monadtall"
+        if use_cache:
+            layout_cache.switch_layout(group, name)
+        else:
+            group.layout = name
+        # lazy.window.toggle_fullscreen()
+        win = group.current_window
+        win.fullscreen = not win.fullscreen
+        win.floating = win.fullscreen
+        layout_cache.on_float_change()
+        group.layout_all()
+        passes += group.passes - before
+    return {
+        "hits": layout_cache.stats["hits"],
+        "misses": layout_cache.stats["misses"],
+        "passes_per_press": passes / presses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the layout cache on the mod+f binding.")
+    parser.add_argument("--windows", type=int, default=8)
+    parser.add_argument("--presses", type=int, default=400)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    sys.path.insert(0, HERE)
+    import stub_libqtile
+    stub_libqtile.install()
+    sys.path.insert(0, CONFIG_DIR)
+    import layout_cache
+
+    results = {
+        "cached": run(layout_cache, args.windows, args.presses, True),
+        "uncached": run(layout_cache, args.windows, args.presses, False),
+    }
+    if results["cached"]["hits"] == 0:
+        raise SystemExit("mod+f never hit the layout cache")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print("%-9s %6s %7s %12s" % ("", "hits", "misses", "passes/press"))
+    for name, r in results.items():
+        print("%-9s %6d %7d %12.1f" % (name, r["hits"], r["misses"], r["passes_per_press"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
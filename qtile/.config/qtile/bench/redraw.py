@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# Title storm through the frame scheduler, with mirrored widgets.
+#
+# Three bars share a WindowName-like widget: the first bar has the widget,
+# the other two mirror it the way qtile does when one widget is given to
+# several bars (add_mirror() wraps its draw). The bars flush at different
+# refresh rates. The widget's text changes every --period ms for --seconds
+# and the run reports requested against performed draws, and how often a
+# mirror copied the widget while the widget still had a change it hadn't
+# drawn. Exits non-zero if any mirror showed stale content or the bars don't
+# all end up showing the last title.
+#
+#   python bench/redraw.py
+#   python bench/redraw.py --seconds 2 --period 0.5 --json
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.dirname(HERE)
+
+CALCULATED, STRETCH = -1, -2
+
+
+class FakeQtile:
+    def __init__(self, loop):
+        self.loop = loop
+
+    def call_soon(self, func, *args):
+        return self.loop.call_soon(func, *args)
+
+    def call_later(self, delay, func, *args):
+        return self.loop.call_later(delay, func, *args)
+
+
+class FakeScreen:
+    def __init__(self, x):
+        self.x = x
+        self.y = 0
+
+
+class FakeBar:
+    def __init__(self, qtile, scheduler, screen, widgets):
+        self.qtile = qtile
+        self.scheduler = scheduler
+        self.screen = screen
+        self.widgets = widgets
+        for widget in widgets:
+            widget.bar = self
+
+    def draw(self):
+        if not self.scheduler.request_bar(self):
+            self.flush_draw()
+
+    def flush_draw(self):
+        for widget in self.widgets:
+            widget.draw()
+
+
+class TextWidget:
+    """Keeps what it last drew, add_mirror() as in libqtile.widget.base._Widget."""
+
+    length_type = STRETCH
+
+    def __init__(self, check):
+        self.check = check
+        self.text = ""
+        self.painted = ""
+        self.configured = True
+        self._mirrors = set()
+        self.bar = None
+
+    def update(self, text):
+        self.text = text
+        self.draw()
+
+    def draw(self):
+        self.painted = self.text
+
+    def _draw_with_mirrors(self):
+        self._old_draw()
+        for mirror in self._mirrors:
+            if not mirror.configured:
+                continue
+            if mirror.length_type == CALCULATED and mirror.bar is not self.bar:
+                mirror.bar.draw()
+            else:
+                mirror.draw()
+
+    def add_mirror(self, widget):
+        if not self._mirrors:
+            self._old_draw = self.draw
+            self.draw = self._draw_with_mirrors
+        self._mirrors.add(widget)
+
+
+class Mirror:
+    def __init__(self, reflects, check):
+        self.reflects = reflects
+        self.check = check
+        self.length_type = reflects.length_type
+        self.painted = ""
+        self.configured = True
+        self.bar = None
+
+    def draw(self):
+        if self.reflects.painted != self.reflects.text:
+            self.check["stale"] += 1
+        self.painted = self.reflects.painted
+        self.check["mirror_draws"] += 1
+
+
+async def storm(widget, seconds, period):
+    loop = asyncio.get_running_loop()
+    end = loop.time() + seconds
+    n = 0
+    while loop.time() < end:
+        n += 1
+        widget.update("title %d" % n)
+        await asyncio.sleep(period / 1000)
+    # Let the last frame flush on every bar.
+    await asyncio.sleep(0.1)
+    return "title %d" % n
+
+
+def run(redraw, seconds, period, length_type):
+    loop = asyncio.new_event_loop()
+    qtile = FakeQtile(loop)
+    scheduler = redraw.FrameScheduler()
+    scheduler.rates = {(0, 0): 60.0, (3440, 0): 144.0, (6880, 0): 30.0}
+    check = {"stale": 0, "mirror_draws": 0}
+    master = TextWidget(check)
+    master.length_type = length_type
+    bars = [FakeBar(qtile, scheduler, FakeScreen(0), [master])]
+    for x in (3440, 6880):
+        mirror = Mirror(master, check)
+        bars.append(FakeBar(qtile, scheduler, FakeScreen(x), [mirror]))
+    # qtile configures the bars in order, the first one gets the widget and
+    # the others mirror it once it's configured.
+    scheduler.attach(bars[0])
+    for b in bars[1:]:
+        scheduler.attach(b)
+        master.add_mirror(b.widgets[0])
+    try:
+        last = loop.run_until_complete(storm(master, seconds, period))
+    finally:
+        loop.close()
+    shown = [b.widgets[0].painted for b in bars]
+    return dict(check, **scheduler.stats(), final=all(text == last for text in shown))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check mirrored widgets through the frame scheduler.")
+    parser.add_argument("--seconds", type=float, default=1.0)
+    parser.add_argument("--period", type=float, default=1.0, help="ms between title changes")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    sys.path.insert(0, HERE)
+    import stub_libqtile
+    stub_libqtile.install()
+    sys.path.insert(0, CONFIG_DIR)
+    import redraw
+
+    results = {
+        "stretch": run(redraw, args.seconds, args.period, STRETCH),
+        "calculated": run(redraw, args.seconds, args.period, CALCULATED),
+    }
+    for r in results.values():
+        del r["rates"]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print("%-11s %10s %10s %13s %6s %6s" % (
+            "length", "requested", "performed", "mirror draws", "stale", "final"))
+        for name, r in results.items():
+            print("%-11s %10d %10d %13d %6d %6s" % (
+                name, r["requested"], r["performed"], r["mirror_draws"], r["stale"],
+                "ok" if r["final"] else "STALE"))
+    if any(r["stale"] or not r["final"] for r in results.values()):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# Replay a recorded event trace (see wmtrace.py) against this config.
+#
+# Runs the config headless like bench/interaction.py, with keybindings that
+# would start programs turned off, and feeds it the trace:
+#
+#   key      XTEST key press with the recorded modifiers held
+#   map      a window with the recorded title, WM_CLASS and window type, so
+#            float rules see what they saw on the desktop
+#   unmap    the window mapped for that recorded window is destroyed
+#   title    WM_NAME/_NET_WM_NAME of that window change
+#   screens  qtile reconfigures its screens. Xvfb can't change its outputs,
+#            so only the work of reconfiguring is reproduced, not new sizes.
+#
+# --speed 1 sends the events on their recorded schedule, without waiting for
+# qtile, so bursts like title churn or a storm of popups arrive as they did
+# on the desktop. Afterwards the frames qtile made (relayouts and bar
+# flushes, see bench/interaction_config.py) are attributed to the last event
+# sent before them. An event's latency runs until the end of the first run
+# of frames after it, frames less than --quiet apart counting as one run.
+# Events with no frame before the next event was sent, because the work was
+# merged into a later frame or because it never made one, like a key that
+# only spawns a program, are counted as no frame. The report also says how
+# far behind schedule sending fell.
+#
+# --speed 0 instead sends each event as soon as qtile has finished the
+# frames for the previous one.
+#
+#   python bench/replay.py ~/.cache/qtile/traces/20240101-120000.qtrace
+#   python bench/replay.py trace.qtrace --speed 0 --output run.json
+#   python bench/replay.py trace.qtrace --info
+
+import argparse
+import collections
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.dirname(HERE)
+
+# X modifier mask bits and a key that sets each of them.
+MODIFIER_KEYSYMS = (
+    (1, 0xFFE1),  # Shift_L
+    (4, 0xFFE3),  # Control_L
+    (8, 0xFFE9),  # Alt_L
+    (64, 0xFFEB),  # Super_L
+)
+
+
+def info(path, wmtrace):
+    counts = collections.Counter()
+    sessions = 0
+    end = 0.0
+    for event in wmtrace.read(path):
+        if event.kind == wmtrace.SESSION:
+            sessions += 1
+            continue
+        counts[wmtrace.KIND_NAMES[event.kind]] += 1
+        end = event.time
+    return {
+        "bytes": os.path.getsize(path),
+        "sessions": sessions,
+        "events": dict(counts),
+        "seconds": round(end, 3),
+    }
+
+
+class Replayer:
+    def __init__(self, session, wmtrace, timeout=0.5, quiet=0.005):
+        self.session = session
+        self.wmtrace = wmtrace
+        self.timeout = timeout
+        self.quiet = quiet
+        # recorded wid -> replayed wid
+        self.windows = {}
+        self.samples = collections.defaultdict(list)
+        self.no_frame = collections.Counter()
+        self.skipped = collections.Counter()
+        self.lag = []
+
+    def _key(self, keysym, mask):
+        keymap = self.session.keymap
+        if keysym not in keymap:
+            return None
+        modifiers = [keymap[sym] for bit, sym in MODIFIER_KEYSYMS if mask & bit and sym in keymap]
+        return self.session.press_keycodes(modifiers, keymap[keysym])
+
+    def _map(self, wid, title, instance, cls, wm_type):
+        started = self.session.map_window(title, instance, cls, wm_type)
+        self.windows[wid] = self.session.windows[-1]
+        return started
+
+    def _unmap(self, wid):
+        if wid not in self.windows:
+            return None
+        return self.session.destroy_window(self.windows.pop(wid))
+
+    def _title(self, wid, title):
+        if wid not in self.windows:
+            return None
+        return self.session.set_title(self.windows[wid], title)
+
+    def _screens(self, *screens):
+        events = self.session.event_count()
+        start = time.monotonic()
+        self.session.client.reconfigure_screens()
+        return start, events
+
+    def dispatch(self, event):
+        wmtrace = self.wmtrace
+        handlers = {
+            wmtrace.KEY: self._key,
+            wmtrace.MAP: self._map,
+            wmtrace.UNMAP: self._unmap,
+            wmtrace.TITLE: self._title,
+            wmtrace.SCREENS: self._screens,
+        }
+        return handlers[event.kind](*event.fields)
+
+    def run(self, events, speed):
+        if speed:
+            self.run_scheduled(events, speed)
+            return
+        for event in events:
+            if event.kind == self.wmtrace.SESSION:
+                continue
+            name = self.wmtrace.KIND_NAMES[event.kind]
+            started = self.dispatch(event)
+            if started is None:
+                self.skipped[name] += 1
+                continue
+            self._record(name, self.session.settle(*started, quiet=self.quiet, timeout=self.timeout))
+
+    def run_scheduled(self, events, speed):
+        self.session.counting = False
+        base = None
+        # (kind name, monotonic time it was sent)
+        sent = []
+        for event in events:
+            if event.kind == self.wmtrace.SESSION:
+                # Recordings in one file are replayed back to back.
+                base = None
+                continue
+            now = time.monotonic()
+            if base is None:
+                base = now - event.time / speed
+            due = base + event.time / speed
+            if due > now:
+                time.sleep(due - now)
+            else:
+                self.lag.append((now - due) * 1000)
+            name = self.wmtrace.KIND_NAMES[event.kind]
+            started = self.dispatch(event)
+            if started is None:
+                self.skipped[name] += 1
+                continue
+            sent.append((name, started[0]))
+        if not sent:
+            return
+        self.session.settle(sent[-1][1], quiet=self.quiet, timeout=self.timeout)
+        self.attribute(sent, self.session.frames_since(sent[0][1]))
+
+    def attribute(self, sent, frames):
+        """Give each sent event the run of frames that follows it."""
+        frames = collections.deque(sorted(frames))
+        for i, (name, start) in enumerate(sent):
+            end = sent[i + 1][1] if i + 1 < len(sent) else float("inf")
+            while frames and frames[0] < start:
+                frames.popleft()
+            if not frames or frames[0] >= end or frames[0] - start > self.timeout:
+                self._record(name, None)
+                continue
+            last = frames.popleft()
+            while frames and frames[0] < end and frames[0] - last < self.quiet:
+                last = frames.popleft()
+            self._record(name, (last - start) * 1000)
+
+    def _record(self, name, ms):
+        if ms is None:
+            self.no_frame[name] += 1
+        else:
+            self.samples[name].append(ms)
+
+    def report(self, interaction):
+        results = {}
+        for name in sorted(set(self.samples) | set(self.no_frame) | set(self.skipped)):
+            summary = interaction.summarize(self.samples[name], 0)
+            del summary["timeouts"]
+            summary["no_frame"] = self.no_frame[name]
+            summary["skipped"] = self.skipped[name]
+            results[name] = summary
+        everything = [ms for samples in self.samples.values() for ms in samples]
+        results["all"] = interaction.summarize(everything, 0)
+        del results["all"]["timeouts"]
+        if self.lag:
+            lag = sorted(self.lag)
+            results["lag"] = {
+                "late_events": len(lag),
+                "p95_ms": round(interaction.percentile(lag, 95), 3),
+                "max_ms": round(lag[-1], 3),
+            }
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded WM event trace headless.")
+    parser.add_argument("trace")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="1 for recorded timing, 2 for twice as fast, 0 for as fast as possible")
+    parser.add_argument("--screens", type=int, default=3)
+    parser.add_argument("--size", default="3440x1440", help="WIDTHxHEIGHT of each screen")
+    parser.add_argument("--display", default=":98")
+    parser.add_argument("--timeout", type=float, default=0.5,
+                        help="seconds to wait for an event's frame before counting it as no frame")
+    parser.add_argument("--quiet", type=float, default=0.005,
+                        help="seconds between frames that ends an event's run of frames")
+    parser.add_argument("--info", action="store_true", help="only describe the trace")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    sys.path.insert(0, HERE)
+    sys.path.insert(0, CONFIG_DIR)
+    import interaction
+    import wmtrace
+
+    if args.info:
+        print(json.dumps(info(args.trace, wmtrace), indent=2))
+        return 0
+
+    width, height = (int(v) for v in args.size.split("x"))
+    session = interaction.Session(args.screens, width, height, args.display,
+                                  env={"QTILE_BENCH_NO_SPAWN": "1"})
+    replayer = Replayer(session, wmtrace, timeout=args.timeout, quiet=args.quiet)
+    try:
+        session.start()
+        replayer.run(wmtrace.read(args.trace), args.speed)
+    finally:
+        session.stop()
+
+    report = {
+        "trace": info(args.trace, wmtrace),
+        "speed": args.speed,
+        "results": replayer.report(interaction),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print("%-8s %6s %9s %9s %9s %9s %9s %8s" % (
+        "event", "n", "p50 ms", "p95 ms", "p99 ms", "max ms", "no frame", "skipped"))
+    for name, r in report["results"].items():
+        if name == "lag":
+            continue
+        if not r["n"]:
+            print("%-8s %6d %39s %9d %8d" % (name, 0, "", r.get("no_frame", 0), r.get("skipped", 0)))
+            continue
+        print("%-8s %6d %9.2f %9.2f %9.2f %9.2f %9d %8d" % (
+            name, r["n"], r["p50_ms"], r["p95_ms"], r["p99_ms"], r["max_ms"],
+            r.get("no_frame", 0), r.get("skipped", 0)))
+    lag = report["results"].get("lag")
+    if lag:
+        print("%d events fired late, p95 %.2f ms, max %.2f ms" % (
+            lag["late_events"], lag["p95_ms"], lag["max_ms"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
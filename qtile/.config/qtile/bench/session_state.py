@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# Snapshot size and restore time for session_state.py.
+#
+# Builds a fake qtile with the config's groups and N windows spread over
+# them, some floating or minimized, and times writing a snapshot and
+# restoring it into a fresh qtile where every window starts out in the first
+# group, the way windows come back after a restart. Two restores are timed:
+#
+#   restart  only qtile restarted, windows keep their X ids
+#   relogin  the X server restarted too, windows are matched by class, role
+#            and title
+#
+# The fake qtile does no X requests or placement, so the times are the
+# config's own work: reading and decoding, matching and moving windows.
+#
+#   python bench/session_state.py
+#   python bench/session_state.py --sizes 100 1000 10000 --json
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.dirname(HERE)
+
+APPS = [
+    ("kitty", "kitty", "", "~/src"),
+    ("google-chrome", "Google-chrome", "browser", "Inbox - Google Chrome"),
+    ("google-chrome", "Google-chrome", "pop-up", "Sign in"),
+    ("slack", "Slack", "browser-window", "Slack | general"),
+    ("emacs", "Emacs", "", "*scratch*"),
+    ("pcmanfm", "Pcmanfm", "", "Downloads"),
+]
+
+
+class FakeLayout:
+    def __init__(self, name, ratio=None):
+        self.name = name
+        if ratio is not None:
+            self.ratio = ratio
+
+
+class FakeGroup:
+    def __init__(self, qtile, name, label):
+        self.qtile = qtile
+        self.name = name
+        self.label = label
+        self.windows = []
+        self.layouts = [FakeLayout("monadtall", 0.5), FakeLayout("monadwide", 0.5),
+                        FakeLayout("tile", 0.618), FakeLayout("max"), FakeLayout("virtualtall", 0.5)]
+        self.current_layout = 0
+        self.current_window = None
+        self.screen = None
+        self.relayouts = 0
+
+    def layout_all(self, warp=False, focus=True):
+        self.relayouts += 1
+
+    def use_layout(self, index):
+        self.current_layout = index
+        self.layout_all()
+
+    def add(self, window):
+        self.windows.append(window)
+        window.group = self
+        self.layout_all()
+
+    def remove(self, window):
+        self.windows.remove(window)
+        window.group = None
+        self.layout_all()
+
+    def focus(self, window, warp=True):
+        self.current_window = window
+        self.layout_all()
+
+
+class FakeWindow:
+    def __init__(self, wid, instance, wm_class, role, title):
+        self.wid = wid
+        self.name = title
+        self._wm_class = [instance, wm_class]
+        self._role = role
+        self.group = None
+        self.floating = False
+        self.minimized = False
+
+    def get_wm_class(self):
+        return self._wm_class
+
+    def get_wm_role(self):
+        return self._role
+
+    def togroup(self, name, switch_group=False):
+        qtile = self.group.qtile
+        self.group.remove(self)
+        qtile.groups_map[name].add(self)
+
+
+class FakeCore:
+    @contextlib.contextmanager
+    def masked(self):
+        yield
+
+
+class FakeQtile:
+    def __init__(self, group_names):
+        self.core = FakeCore()
+        self.groups = [FakeGroup(self, name, "g" + name) for name in group_names]
+        self.groups.append(FakeGroup(self, "prewarm", ""))
+        self.groups_map = {g.name: g for g in self.groups}
+
+    def call_later(self, delay, func, *args):
+        pass
+
+
+def make_windows(count, seed=1, first_wid=0x1000000):
+    rng = random.Random(seed)
+    windows = []
+    for i in range(count):
+        instance, wm_class, role, title = rng.choice(APPS)
+        windows.append(FakeWindow(first_wid + i, instance, wm_class, role, "%s %d" % (title, i)))
+    return windows
+
+
+def arrange(qtile, windows, seed=2):
+    """Spread windows over the labelled groups like a long running session."""
+    rng = random.Random(seed)
+    groups = [g for g in qtile.groups if g.label]
+    for window in windows:
+        rng.choice(groups).add(window)
+        window.floating = rng.random() < 0.1
+        window.minimized = rng.random() < 0.05
+    for group in groups:
+        group.current_layout = rng.randrange(len(group.layouts))
+        group.layouts[0].ratio = round(rng.uniform(0.3, 0.7), 2)
+        if group.windows:
+            group.current_window = group.windows[-1]
+
+
+def run(session_state, group_names, count, path, rounds):
+    qtile = FakeQtile(group_names)
+    windows = make_windows(count)
+    arrange(qtile, windows)
+    session_state.qtile = qtile
+    qtile._session_state_restored = True
+
+    state = session_state.SessionState(path)
+    for window in windows:
+        state.on_client_new(window)
+    write_ms = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        state.write()
+        write_ms.append((time.perf_counter() - start) * 1000)
+    expected = {w.wid: (w.group.name, w.floating, w.minimized) for w in windows}
+    order = [w.wid for w in windows]
+
+    result = {
+        "windows": count,
+        "bytes": os.path.getsize(path),
+        "bytes_per_window": os.path.getsize(path) / count,
+        "write_ms": min(write_ms),
+    }
+    for name, same_wids in (("restart", True), ("relogin", False)):
+        samples = []
+        for _ in range(rounds):
+            fresh = FakeQtile(group_names)
+            restarted = make_windows(count, first_wid=0x1000000 if same_wids else 0x3000000)
+            for window in restarted:
+                fresh.groups[0].add(window)
+            for group in fresh.groups:
+                group.relayouts = 0
+            session_state.qtile = fresh
+            restorer = session_state.SessionState(path)
+            start = time.perf_counter()
+            restorer.restore()
+            samples.append((time.perf_counter() - start) * 1000)
+        # Same seed, so the nth window is the same app as before.
+        restored = {order[i]: (w.group.name, w.floating, w.minimized) for i, w in enumerate(restarted)}
+        if restored != expected:
+            raise SystemExit("%s restore of %d windows put some in the wrong place" % (name, count))
+        result[name + "_ms"] = min(samples)
+        result[name + "_relayouts"] = sum(g.relayouts for g in fresh.groups)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark session snapshot size and restore time.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    sys.path.insert(0, HERE)
+    import stub_libqtile
+    stub_libqtile.install()
+    sys.path.insert(0, CONFIG_DIR)
+    import config
+    import session_state
+
+    group_names = [g.name for g in config.groups if g.label]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.qstate")
+        for count in args.sizes:
+            results.append(run(session_state, group_names, count, path, args.rounds))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print("%8s %10s %8s %10s %12s %12s %10s" % (
+        "windows", "bytes", "B/win", "write ms", "restart ms", "relogin ms", "relayouts"))
+    for r in results:
+        print("%8d %10d %8.1f %10.2f %12.2f %12.2f %10d" % (
+            r["windows"], r["bytes"], r["bytes_per_window"], r["write_ms"],
+            r["restart_ms"], r["relogin_ms"], r["relogin_relayouts"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
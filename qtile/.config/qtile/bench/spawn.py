@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# Keypress-to-exec benchmark for spawning commands.
+#
+# Compares three ways of starting a keybinding's command from a process with
+# a qtile sized heap (--heap-mb):
+#
+#   fork         what older qtile releases do: parse, search PATH, double fork
+#   posix_spawn  what qtile.spawn does now: parse, search PATH, posix_spawn
+#   helper       spawner.py: argv parsed at config load, one send() per press
+#
+# Each command is "touch MARKER". "call" is how long the keypress handler
+# blocks the event loop, "exec" is the time until the marker shows up.
+#
+#   python bench/spawn.py
+#   python bench/spawn.py --runs 200 --heap-mb 300 --json
+
+import argparse
+import json
+import os
+import shlex
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.dirname(HERE)
+
+
+def rss_mb(pid="self"):
+    with open("/proc/%s/status" % pid) as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def spawn_fork(cmd):
+    args = shlex.split(cmd)
+    path = shutil.which(args[0])
+    pid = os.fork()
+    if pid == 0:
+        try:
+            if os.fork() == 0:
+                os.setsid()
+                null = os.open(os.devnull, os.O_RDWR)
+                for fd in (0, 1, 2):
+                    os.dup2(null, fd)
+                os.execve(path, args, os.environ)
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+
+def spawn_posix(cmd):
+    args = shlex.split(cmd)
+    path = shutil.which(args[0])
+    env = os.environ.copy()
+    env.pop("VIRTUAL_ENV", None)
+    null = os.open(os.devnull, os.O_RDWR)
+    try:
+        os.posix_spawn(path, args, env, setsid=True, file_actions=[
+            (os.POSIX_SPAWN_DUP2, null, fd) for fd in (0, 1, 2)
+        ])
+    finally:
+        os.close(null)
+
+
+class FakeQtile:
+    def spawn(self, args):
+        raise SystemExit("the helper fell back to qtile.spawn")
+
+
+def wait_for(path, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while not os.path.exists(path):
+        if time.perf_counter() > deadline:
+            raise SystemExit("%s never showed up" % path)
+        time.sleep(0.00005)
+    return time.perf_counter()
+
+
+def measure(name, launch, prepare, runs, workdir):
+    calls, execs = [], []
+    for i in range(runs):
+        marker = os.path.join(workdir, "%s-%d" % (name, i))
+        job = prepare("touch " + marker)
+        start = time.perf_counter()
+        launch(job)
+        called = time.perf_counter()
+        done = wait_for(marker)
+        calls.append((called - start) * 1e6)
+        execs.append((done - start) * 1e3)
+    execs.sort()
+    return {
+        "path": name,
+        "call_us_p50": statistics.median(calls),
+        "exec_ms_p50": statistics.median(execs),
+        "exec_ms_p95": execs[int(len(execs) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark keybinding spawn latency.")
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--heap-mb", type=int, default=150)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    sys.path.insert(0, HERE)
+    import stub_libqtile
+    stub_libqtile.install()
+    sys.path.insert(0, CONFIG_DIR)
+    import spawner
+
+    # Stand-in for qtile's heap: lots of small objects, like the real thing.
+    heap = [str(i) * 4 for i in range(args.heap_mb * 2 ** 20 // 64)]
+    qtile = FakeQtile()
+    helper = spawner.Spawner()
+    helper.start()
+
+    def prepare_command(cmd):
+        command = spawner.Command(cmd)
+        command.payload
+        return command
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        results.append(measure("fork", spawn_fork, str, args.runs, workdir))
+        results.append(measure("posix_spawn", spawn_posix, str, args.runs, workdir))
+        results.append(measure("helper", lambda c: helper.run(qtile, c), prepare_command,
+                               args.runs, workdir))
+    report = {
+        "results": results,
+        "qtile_rss_mb": rss_mb(),
+        "helper_rss_mb": rss_mb(helper.process.pid),
+        "heap_objects": len(heap),
+    }
+    helper.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print("%-12s %10s %10s %10s" % ("path", "call us", "exec p50", "exec p95"))
+    for r in results:
+        print("%-12s %10.1f %8.2fms %8.2fms" % (
+            r["path"], r["call_us_p50"], r["exec_ms_p50"], r["exec_ms_p95"]))
+    print("qtile stand-in RSS %.0f MB, helper RSS %.1f MB" % (
+        report["qtile_rss_mb"], report["helper_rss_mb"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# Draw time of static_widgets.StaticText against a plain widget.TextBox.
+#
+# Both widgets are configured with the config's '|' separator settings on an
+# offscreen bar and drawn --draws times. The drawer replays what each draw
+# recorded onto an image surface the size of the bar, which stands in for
+# the copy to the bar window that every qtile drawer does, so the times
+# include rasterising the text (TextBox) or painting the cached surface
+# (StaticText). The first StaticText draw renders the surface and is
+# reported on its own.
+#
+# Needs the real libqtile with cairocffi and pango, there is no stub mode:
+# what is measured is exactly the pango and cairo work.
+#
+#   python bench/static_text.py
+#   python bench/static_text.py --draws 5000 --json
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.dirname(HERE)
+
+SEPARATOR = dict(text="|", font="Ubuntu Mono", foreground="#5b6268", padding=2, fontsize=14)
+
+
+def make_bar(Drawer, cairocffi, width=3440, height=28):
+    class ImageDrawer(Drawer):
+        """Drawer that copies to an image surface instead of a window."""
+
+        def __init__(self, *args):
+            Drawer.__init__(self, *args)
+            self.target = cairocffi.ImageSurface(cairocffi.FORMAT_ARGB32, width, height)
+
+        def _draw(self, offsetx=0, offsety=0, width=None, height=None, src_x=0, src_y=0):
+            ctx = cairocffi.Context(self.target)
+            ctx.set_source_surface(self.surface, offsetx - src_x, offsety - src_y)
+            ctx.rectangle(offsetx, offsety, width or self.width, height or self.height)
+            ctx.fill()
+            self.target.flush()
+
+    class FakeQtile:
+        def call_soon(self, func, *args):
+            return None
+
+    qtile = FakeQtile()
+
+    class Window:
+        def create_drawer(self, w, h):
+            return ImageDrawer(qtile, self, w, h)
+
+    class FakeBar:
+        horizontal = True
+        background = "#282c34"
+        size = height
+
+        def __init__(self):
+            self.qtile = qtile
+            self.window = Window()
+            self.width = width
+            self.height = height
+
+        def draw(self):
+            pass
+
+    return qtile, FakeBar()
+
+
+def configure(cls, qtile, bar):
+    w = cls(**SEPARATOR)
+    w._configure(qtile, bar)
+    w.configured = True
+    # offset is what older qtile versions call offsetx.
+    w.offset = w.offsetx = w.offsety = 0
+    w.length = w.calculate_length()
+    return w
+
+
+def time_draws(w, draws):
+    samples = []
+    for _ in range(draws):
+        start = time.perf_counter()
+        w.draw()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark StaticText against TextBox draws.")
+    parser.add_argument("--draws", type=int, default=2000)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    sys.path.insert(0, CONFIG_DIR)
+    try:
+        import cairocffi
+        from libqtile import widget
+        from libqtile.backend.base import Drawer
+    except (ImportError, OSError) as e:
+        raise SystemExit("this benchmark needs libqtile with cairocffi and pango: %s" % e)
+    import static_widgets
+
+    qtile, bar = make_bar(Drawer, cairocffi)
+    textbox = configure(widget.TextBox, qtile, bar)
+    static = configure(static_widgets.StaticText, qtile, bar)
+    if textbox.length != static.length:
+        raise SystemExit("the widgets don't have the same width")
+
+    static_widgets.cache.clear()
+    start = time.perf_counter()
+    static.draw()
+    first_us = (time.perf_counter() - start) * 1e6
+    results = {"width": static.length, "static_first_draw_us": first_us}
+    for name, w in (("textbox", textbox), ("static", static)):
+        samples = time_draws(w, args.draws)
+        results[name + "_median_us"] = statistics.median(samples)
+        results[name + "_p95_us"] = sorted(samples)[int(len(samples) * 0.95)]
+    results["speedup"] = results["textbox_median_us"] / results["static_median_us"]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print("%-8s %10s %10s" % ("", "median us", "p95 us"))
+    for name in ("textbox", "static"):
+        print("%-8s %10.1f %10.1f" % (name, results[name + "_median_us"], results[name + "_p95_us"]))
+    print("TextBox/StaticText median draw time: %.2f, StaticText's first draw (rendering) took %.1f us"
+          % (results["speedup"], first_us))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+# A minimal stand-in for libqtile so config.py can be imported without a
+# display, cairo or a running qtile.
+#
+# Only the pieces the config touches at load time are provided. Every stub
+# records the arguments it was built with, which is enough to count objects
+# and to time the config's own code rather than qtile's.
+
+import logging
+import sys
+import types
+
+
+class Configurable:
+    defaults = []
+
+    def __init__(self, *args, **config):
+        self.args = args
+        self._user_config = config
+        self.__dict__.update(config)
+
+    def add_defaults(self, defaults):
+        for name, value, _ in defaults:
+            if not hasattr(self, name):
+                setattr(self, name, value)
+
+
+# libqtile.config
+
+class Key:
+    def __init__(self, modifiers, key, *commands, desc="", swallow=True):
+        self.modifiers = modifiers
+        self.key = key
+        self.commands = commands
+        self.desc = desc
+        self.swallow = swallow
+
+
+class KeyChord:
+    def __init__(self, modifiers, key, submappings, mode=False, name="", desc="", swallow=True):
+        self.modifiers = modifiers
+        self.key = key
+        self.submappings = submappings
+        self.mode = mode
+        self.name = name
+        self.desc = desc
+        self.swallow = swallow
+
+
+class Mouse:
+    def __init__(self, modifiers, button, *commands, start=None):
+        self.modifiers = modifiers
+        self.button = button
+        self.commands = commands
+        self.start = start
+
+
+class Drag(Mouse):
+    pass
+
+
+class Click(Mouse):
+    pass
+
+
+class Group:
+    def __init__(self, name, matches=None, exclusive=False, spawn=None, layout=None,
+                 layouts=None, persist=True, init=True, layout_opts=None,
+                 screen_affinity=None, position=sys.maxsize, label=None):
+        self.name = name
+        self.label = label
+        self.layout = layout
+        self.layouts = layouts or []
+        self.matches = matches or []
+        self.screen_affinity = screen_affinity
+
+
+class ScratchPad(Group):
+    def __init__(self, name, dropdowns=None, position=sys.maxsize, label="", single=False):
+        Group.__init__(self, name, layout="floating", init=False, position=position, label=label)
+        self.dropdowns = dropdowns or []
+
+
+class Match:
+    def __init__(self, title=None, wm_class=None, role=None, wm_type=None,
+                 wm_instance_class=None, net_wm_pid=None, func=None, wid=None):
+        self._rules = {
+            k: v for k, v in dict(
+                title=title, wm_class=wm_class, role=role, wm_type=wm_type,
+                wm_instance_class=wm_instance_class, net_wm_pid=net_wm_pid,
+                func=func, wid=wid,
+            ).items() if v is not None
+        }
+
+    def compare(self, client):
+        # Same semantics as libqtile.config.Match.compare()
+        if not self._rules:
+            return False
+        for name, rule in self._rules.items():
+            if name == "func":
+                return rule(client)
+            if name == "title":
+                values = [client.name]
+            elif name == "wm_class":
+                values = client.get_wm_class() or []
+            elif name == "wm_instance_class":
+                values = (client.get_wm_class() or [])[:1]
+            elif name == "role":
+                values = [client.get_wm_role()]
+            elif name == "wm_type":
+                values = [client.get_wm_type()]
+            elif name == "net_wm_pid":
+                values = [client.get_pid()]
+            else:
+                values = [client.wid]
+            match = getattr(rule, "match", lambda v: v == rule)
+            if not any(v is not None and match(v) for v in values):
+                return False
+        return True
+
+
+class Screen:
+    def __init__(self, top=None, bottom=None, left=None, right=None, wallpaper=None,
+                 wallpaper_mode=None, x=None, y=None, width=None, height=None):
+        self.top = top
+        self.bottom = bottom
+        self.left = left
+        self.right = right
+
+
+# libqtile.lazy
+
+class LazyCall:
+    def __init__(self, path, args=(), kwargs=None):
+        self.path = path
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.conditions = {}
+        self._layouts = set()
+        self._focused = None
+        self._when_floating = None
+        self._condition = None
+        self._func = None
+
+    @property
+    def selectors(self):
+        return [(name, None) for name in self.path[:-1]]
+
+    @property
+    def name(self):
+        return self.path[-1]
+
+    def when(self, **conditions):
+        self.conditions.update(conditions)
+        layout = conditions.pop("layout", None)
+        if layout is not None:
+            self._layouts = {layout} if isinstance(layout, str) else set(layout)
+        for name, value in conditions.items():
+            setattr(self, "_" + name, value)
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return LazyCall(self.path, args, kwargs)
+
+
+class LazyCommand:
+    def __init__(self, path=()):
+        self.path = path
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return LazyCommand(self.path + (name,))
+
+    def __call__(self, *args, **kwargs):
+        return LazyCall(self.path, args, kwargs)
+
+
+# libqtile.command.base
+
+def expose_command(name=None):
+    def decorator(func):
+        return func
+    return decorator
+
+
+# libqtile.bar
+
+class Bar(Configurable):
+    def __init__(self, widgets, size, **config):
+        Configurable.__init__(self, **config)
+        self.widgets = widgets
+        self.size = size
+
+
+# libqtile.widget / libqtile.layout
+
+class _Widget(Configurable):
+    def __init__(self, length=0, **config):
+        Configurable.__init__(self, **config)
+        self.length = length
+        self._mirrors = set()
+
+    def finalize(self):
+        pass
+
+
+class _TextBox(_Widget):
+    def __init__(self, text=" ", width=0, **config):
+        _Widget.__init__(self, width, **config)
+        self.text = text
+
+
+class _Layout(Configurable):
+    default_float_rules = [
+        Match(wm_type="utility"),
+        Match(wm_type="notification"),
+        Match(wm_type="toolbar"),
+        Match(wm_type="splash"),
+        Match(wm_type="dialog"),
+        Match(wm_class="file_progress"),
+        Match(wm_class="confirm"),
+        Match(wm_class="dialog"),
+        Match(wm_class="download"),
+        Match(wm_class="error"),
+        Match(wm_class="notification"),
+        Match(wm_class="splash"),
+        Match(wm_class="toolbar"),
+    ]
+
+
+class _StubNamespace(types.ModuleType):
+    """A module whose unknown attributes are stub classes derived from base."""
+
+    def __init__(self, name, base):
+        types.ModuleType.__init__(self, name)
+        self._base = base
+        self._classes = {}
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        if name not in self._classes:
+            self._classes[name] = type(name, (self._base,), {"__module__": self.__name__})
+        return self._classes[name]
+
+
+class _Subscriber:
+    def __init__(self):
+        self.hooks = {}
+
+    def __getattr__(self, name):
+        def decorator(func):
+            self.hooks.setdefault(name, []).append(func)
+            return func
+        return decorator
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+def install():
+    """Put the stub modules in sys.modules and return the top level package."""
+    base = _module(
+        "libqtile.widget.base",
+        _Widget=_Widget,
+        _TextBox=_TextBox,
+        InLoopPollText=_TextBox,
+        ThreadPoolText=_TextBox,
+        Mirror=_Widget,
+    )
+    widget = _StubNamespace("libqtile.widget", _Widget)
+    widget.base = base
+    layout = _StubNamespace("libqtile.layout", _Layout)
+    layout.base = _module("libqtile.layout.base", Layout=_Layout, _SimpleLayoutBase=_Layout)
+    extension = _StubNamespace("libqtile.extension", Configurable)
+    command = _module("libqtile.command", __path__=[])
+    command.base = _module("libqtile.command.base", expose_command=expose_command)
+
+    subscribe = _Subscriber()
+    modules = {
+        "libqtile.config": _module(
+            "libqtile.config", Key=Key, KeyChord=KeyChord, Drag=Drag, Click=Click,
+            Group=Group, Match=Match, Screen=Screen, ScratchPad=ScratchPad,
+        ),
+        "libqtile.lazy": _module("libqtile.lazy", lazy=LazyCommand(), LazyCall=LazyCall),
+        "libqtile.bar": _module("libqtile.bar", Bar=Bar, CALCULATED=-1, STRETCH=-2, STATIC=-3),
+        "libqtile.hook": _module("libqtile.hook", subscribe=subscribe),
+        "libqtile.log_utils": _module("libqtile.log_utils", logger=logging.getLogger("libqtile")),
+        "libqtile.widget": widget,
+        "libqtile.widget.base": base,
+        "libqtile.layout": layout,
+        "libqtile.layout.base": layout.base,
+        "libqtile.extension": extension,
+        "libqtile.command": command,
+        "libqtile.command.base": command.base,
+    }
+    package = _module("libqtile", qtile=None, __path__=[])
+    for name, module in modules.items():
+        if name.count(".") == 1:
+            setattr(package, name.split(".")[1], module)
+        sys.modules[name] = module
+    sys.modules["libqtile"] = package
+    return package
+
+
+def uninstall():
+    for name in list(sys.modules):
+        if name == "libqtile" or name.startswith("libqtile."):
+            del sys.modules[name]
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# soundserver.VolumeMonitor against a local fake sound server.
+#
+# The fake server listens on a unix socket in a temporary directory and
+# writes pactl subscribe lines to every connected client whenever its volume
+# changes, along with unrelated events the monitor has to ignore. The monitor
+# reads the events through SocketEvents, and reading the volume goes to the
+# fake server's state. Three subscribers stand in for the three bars.
+#
+# Phases:
+#
+#   changes  one volume change every --gap ms, time until every bar has it
+#   burst    --burst changes back to back, like holding a volume key
+#   idle     nothing happens for a second, there should be no reads
+#   drop     the server drops the connection, the monitor falls back to
+#            polling and subscribes again once its backoff runs out
+#   stop     the last bar unsubscribes, the server sees the client go away
+#
+# Exits non-zero if a bar missed a change or the monitor did work while idle.
+#
+#   python bench/volume_events.py
+#   python bench/volume_events.py --changes 200 --gap 5 --json
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.dirname(HERE)
+
+
+class FakeServer:
+    """Holds a volume and tells every connected client when it changes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.volume = 50
+        self.muted = False
+        self.clients = []
+        self.connects = 0
+        self.reads = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_unix_server(self._client, self.path)
+
+    async def _client(self, reader, writer):
+        self.connects += 1
+        self.clients.append(writer)
+        # Only EOF matters, the monitor never writes.
+        await reader.read()
+        if writer in self.clients:
+            self.clients.remove(writer)
+        writer.close()
+
+    def _send(self, line):
+        for writer in self.clients:
+            writer.write(line.encode())
+
+    def set_volume(self, volume):
+        self.volume = volume
+        self._send("Event 'new' on client #12\n")
+        self._send("Event 'change' on sink #53\n")
+
+    async def read(self):
+        self.reads += 1
+        return self.volume, self.muted
+
+    def drop(self):
+        for writer in self.clients:
+            writer.close()
+        self.clients = []
+
+    async def close(self):
+        self.drop()
+        self._server.close()
+        await self._server.wait_closed()
+
+
+class Bar:
+    def __init__(self, waiters):
+        self.value = None
+        self.waiters = waiters
+
+    def on_volume(self, value):
+        self.value = value
+        self.waiters.check()
+
+
+class Waiters:
+    """Resolves a future once every bar shows a given volume."""
+
+    def __init__(self):
+        self.bars = []
+        self.wanted = None
+        self.future = None
+
+    def expect(self, volume):
+        self.wanted = volume
+        self.future = asyncio.get_running_loop().create_future()
+        self.check()
+        return self.future
+
+    def check(self):
+        if self.future is None or self.future.done():
+            return
+        if all(bar.value is not None and bar.value[0] == self.wanted for bar in self.bars):
+            self.future.set_result(time.perf_counter())
+
+
+async def wait_for(waiters, volume, timeout):
+    try:
+        await asyncio.wait_for(waiters.expect(volume), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def run(soundserver, path, changes, gap, burst):
+    server = FakeServer(path)
+    await server.start()
+    monitor = soundserver.VolumeMonitor(events=soundserver.SocketEvents(path), read=server.read,
+                                        poll_interval=0.1)
+    waiters = Waiters()
+    waiters.bars = [Bar(waiters) for _ in range(3)]
+    for bar in waiters.bars:
+        monitor.subscribe(bar.on_volume)
+    results = {"missed": 0}
+    if not await wait_for(waiters, server.volume, 1.0):
+        results["missed"] += 1
+    while not server.clients:
+        await asyncio.sleep(0.001)
+
+    latencies = []
+    reads = server.reads
+    for i in range(changes):
+        volume = i % 101
+        if volume == server.volume:
+            volume = (volume + 1) % 101
+        start = time.perf_counter()
+        server.set_volume(volume)
+        if await wait_for(waiters, volume, 1.0):
+            latencies.append((waiters.future.result() - start) * 1000)
+        else:
+            results["missed"] += 1
+        await asyncio.sleep(gap / 1000)
+    results["changes_ms"] = statistics.median(latencies) if latencies else None
+    results["changes_max_ms"] = max(latencies) if latencies else None
+    results["changes_reads"] = server.reads - reads
+
+    reads = server.reads
+    for i in range(burst):
+        server.set_volume(i % 100 + 1)
+    if not await wait_for(waiters, server.volume, 1.0):
+        results["missed"] += 1
+    await asyncio.sleep(monitor.debounce * 2)
+    results["burst_reads"] = server.reads - reads
+
+    reads = server.reads
+    await asyncio.sleep(1.0)
+    results["idle_reads"] = server.reads - reads
+
+    connects = server.connects
+    server.drop()
+    await asyncio.sleep(0.05)
+    results["drop_mode"] = monitor.mode
+    # Changes while the stream is down are picked up by polling.
+    server.volume = 7
+    if not await wait_for(waiters, 7, 1.0):
+        results["missed"] += 1
+    # And events flow again once the monitor has subscribed again.
+    deadline = time.perf_counter() + 3.0
+    while server.connects == connects and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    results["resubscribed"] = server.connects > connects
+    server.set_volume(93)
+    if not await wait_for(waiters, 93, 1.0):
+        results["missed"] += 1
+
+    for bar in waiters.bars:
+        monitor.unsubscribe(bar.on_volume)
+    await asyncio.sleep(0.05)
+    results["stop_clients"] = len(server.clients)
+    results["stop_mode"] = monitor.mode
+    await server.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the volume monitor from a fake sound server.")
+    parser.add_argument("--changes", type=int, default=100)
+    parser.add_argument("--gap", type=float, default=10.0, help="ms between volume changes")
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    sys.path.insert(0, HERE)
+    import stub_libqtile
+    stub_libqtile.install()
+    sys.path.insert(0, CONFIG_DIR)
+    import soundserver
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "events.sock")
+        r = asyncio.run(run(soundserver, path, args.changes, args.gap, args.burst))
+
+    ok = (r["missed"] == 0 and r["idle_reads"] == 0 and r["resubscribed"]
+          and r["stop_clients"] == 0 and r["stop_mode"] == "stopped")
+    if args.json:
+        print(json.dumps(r, indent=2))
+    else:
+        print("changes   %d, median %.2f ms to every bar, max %.2f ms, %d reads"
+              % (args.changes, r["changes_ms"], r["changes_max_ms"], r["changes_reads"]))
+        print("burst     %d changes, %d reads" % (args.burst, r["burst_reads"]))
+        print("idle      %d reads in 1 s" % r["idle_reads"])
+        print("drop      fell back to %s, subscribed again: %s" % (r["drop_mode"], r["resubscribed"]))
+        print("stop      %d clients left, monitor %s" % (r["stop_clients"], r["stop_mode"]))
+        print("missed    %d" % r["missed"])
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,72 +1,111 @@
 import os
-import subprocess
-from libqtile import bar, extension, hook, layout, qtile, widget
-from libqtile.config import Click, Drag, Group, Key, KeyChord, Match, Screen
+import shlex
+from libqtile import extension, hook, layout, qtile, widget
+from libqtile.config import Click, Drag, Group, Key, KeyChord, Match, Screen, ScratchPad
 from libqtile.lazy import lazy
-import colors
+from libqtile.log_utils import logger
+import batch
+import float_rules
+import latency
+import layout_cache
+import layout_dispatch
+import navigation
+import session_state
+import supervisor
+import theme
+import virtual_stack
+import wakeup
+import window_switcher
+import wmtrace
+from affinity import GroupAffinity
+from supervisor import Service
+import poller
+import prewarm
+import procstat
+import redraw
+import soundserver
+import spawner
+import static_widgets
+from bar_widgets import factory
+from keymap import Keymap
+from spawner import spawn
 
 mod = "mod4"              # Sets mod key to SUPER/WINDOWS
 myTerm = "kitty"      # My terminal of choice
 myBrowser = "google-chrome"       # My browser of choice
+showLatency = False       # Show command latencies on the main bar
+
+# The commands defined here are wrapped in latency.timed, which records how
+# long each call takes. See latency.py for how to query the numbers.
 
 # Allows you to input a name when adding treetab section.
 @lazy.layout.function
+@latency.timed
 def add_treetab_section(layout):
     prompt = qtile.widgets_map["prompt"]
     prompt.start_input("Section name: ", layout.cmd_add_section)
 
-# A function for hide/show all the windows in a group
+# A function for hide/show all the windows in a group. Windows are changed
+# in one batch with a single relayout, and only the windows it hid come back.
 @lazy.function
+@latency.timed
 def minimize_all(qtile):
-    for win in qtile.current_group.windows:
-        if hasattr(win, "toggle_minimize"):
-            win.toggle_minimize()
+    batch.toggle_all(qtile.current_group)
 
-# A function for toggling between MAX and MONADTALL layouts
+# A function for toggling between MAX and MONADTALL layouts. The geometry of
+# the layout being left is cached so toggling back skips a full placement.
 @lazy.function
+@latency.timed
 def maximize_by_switching_layout(qtile):
     current_layout_name = qtile.current_group.layout.name
     if current_layout_name == 'monadtall':
-        qtile.current_group.layout = 'max'
+        layout_cache.switch_layout(qtile.current_group, 'max')
     elif current_layout_name == 'max':
-        qtile.current_group.layout = 'monadtall'
+        layout_cache.switch_layout(qtile.current_group, 'monadtall')
+
 
+# Terminals and the file manager come from a pool of instances started ahead
+# of time, see prewarm.py. Parked windows live in the hidden "prewarm" group.
+prewarmer = prewarm.Prewarmer([
+    prewarm.AppPool("terminal", myTerm, "kitty", size = 2),
+    prewarm.AppPool("files", "pcmanfm", "pcmanfm", size = 1),
+], max_rss_mb = 600)
 
+# Shows every binding with its description in rofi. The cheat sheet comes
+# from the compiled keymap and is only rewritten when the bindings change.
+@lazy.function
+@latency.timed
+def show_keybindings(qtile):
+    path = keymap.write_cheatsheet()
+    qtile.spawn(["sh", "-c", "rofi -dmenu -i -p keys < " + shlex.quote(path)])
+
+# Window switcher that replaces "rofi -show window". Nothing is spawned, the
+# window list is kept up to date from hooks, see window_switcher.py.
+@lazy.function
+@latency.timed
+def open_window_switcher(qtile):
+    switcher.open(qtile)
+
+@latency.timed
 def switch_to_group_on_monitor(qtile, group_name):
     """Switch to group on the appropriate monitor based on group number"""
-    group_num = int(group_name) if group_name.isdigit() else (10 if group_name == "0" else None)
-
-    if group_num is None:
-        qtile.groups_map[group_name].cmd_toscreen()
-        return
-
-    # Groups 1-4 go to monitor 0 (first monitor)
-    # Groups 5-9 and 0 go to monitor 1 (second monitor)
-    if group_num in [1, 2, 3, 4]:
-        target_screen = 0
-    else:  # groups 5, 6, 7, 8, 9, 0
-        target_screen = 1
-
-    # Make sure we don't exceed available screens
-    if target_screen < len(qtile.screens):
-        qtile.focus_screen(target_screen)
-        qtile.groups_map[group_name].cmd_toscreen()
-    else:
-        qtile.groups_map[group_name].cmd_toscreen()
+    group_affinity.switch(qtile, group_name)
 
+# spawn() works like lazy.spawn() but the command line is parsed here, once,
+# and started by a small resident helper instead of the qtile process, see
+# spawner.py.
 keys = [
     # The essentials
-    Key([mod], "Return", lazy.spawn(myTerm), desc="Terminal"),
-    Key([mod, "shift"], "Return", lazy.spawn("rofi -show drun"), desc='Run Launcher'),
-    Key([mod], "w", lazy.spawn(myBrowser), desc='Web browser'),
+    Key([mod], "Return", lazy.function(prewarmer.claim, "terminal"), desc="Terminal"),
+    Key([mod, "shift"], "Return", spawn("rofi -show drun"), desc='Run Launcher'),
+    Key([mod], "w", spawn(myBrowser), desc='Web browser'),
     Key([mod], "b", lazy.hide_show_bar(position='all'), desc="Toggles the bar to show/hide"),
     Key([mod], "Tab", lazy.next_layout(), desc="Toggle between layouts"),
     Key([mod, "shift"], "c", lazy.window.kill(), desc="Kill focused window"),
     Key([mod, "shift"], "r", lazy.reload_config(), desc="Reload the config"),
-    Key([mod, "shift"], "q", lazy.spawn("dm-logout -r"), desc="Logout menu"),
     Key([mod], "r", lazy.spawncmd(), desc="Spawn a command using a prompt widget"),
-    Key([mod, "shift"], "T", lazy.spawn("conky-toggle"), desc="Conky toggle on/off"),# Replace line 42 with:
-    Key([mod, "shift"], "q", lazy.spawn("rofi -show power-menu -modi power-menu:rofi-power-menu"), desc="Logout menu"),
+    Key([mod, "shift"], "T", spawn("conky-toggle"), desc="Conky toggle on/off"),
+    Key([mod, "shift"], "q", spawn("rofi -show power-menu -modi power-menu:rofi-power-menu"), desc="Logout menu"),
 
     # Switch between windows
     # Some layouts like 'monadtall' only need to use j/k to move
@@ -115,12 +154,12 @@ keys = [
     # although it does also work in the 'bsp' and 'columns' layouts.
     Key([mod], "equal",
         lazy.layout.grow_left().when(layout=["bsp", "columns"]),
-        lazy.layout.grow().when(layout=["monadtall", "monadwide"]),
+        lazy.layout.grow().when(layout=["monadtall", "monadwide", "virtualtall"]),
         desc="Grow window to the left"
         ),
     Key([mod], "minus",
         lazy.layout.grow_right().when(layout=["bsp", "columns"]),
-        lazy.layout.shrink().when(layout=["monadtall", "monadwide"]),
+        lazy.layout.shrink().when(layout=["monadtall", "monadwide", "virtualtall"]),
         desc="Grow window to the left"
         ),
 
@@ -132,6 +171,9 @@ keys = [
     Key([mod, "control"], "k", lazy.layout.grow_up(), desc="Grow window up"),
     Key([mod], "n", lazy.layout.normalize(), desc="Reset all window sizes"),
     Key([mod], "m", lazy.layout.maximize(), desc='Toggle between min and max sizes'),
+    # Page through the hidden secondary windows of the 'virtualtall' layout.
+    Key([mod], "Page_Down", lazy.layout.next_page().when(layout=["virtualtall"]), desc='Next page of windows'),
+    Key([mod], "Page_Up", lazy.layout.previous_page().when(layout=["virtualtall"]), desc='Previous page of windows'),
     Key([mod], "t", lazy.window.toggle_floating(), desc='toggle floating'),
     Key([mod], "f", maximize_by_switching_layout(), lazy.window.toggle_fullscreen(), desc='toggle fullscreen'),
     Key([mod, "shift"], "m", minimize_all(), desc="Toggle hide/show all windows on current group"),
@@ -140,7 +182,7 @@ keys = [
     Key([mod], "period", lazy.next_screen(), desc='Move focus to next monitor'),
     Key([mod], "comma", lazy.prev_screen(), desc='Move focus to prev monitor'),
     # Add this single line to your keys list (not a KeyChord):
-    Key([mod], "x", lazy.spawn("notify-send 'Test key works'"), desc="Test key"),
+    Key([mod], "x", spawn("notify-send 'Test key works'"), desc="Test key"),
     # Dmenu/rofi scripts launched using the key chord SUPER+p followed by 'key'
     #
     #
@@ -170,15 +212,18 @@ keys = [
     #     Key([], "z", lazy.spawn("notify-send 'KeyChord works!'"), desc='Test KeyChord'),
     # ]),
     KeyChord([mod], "p", [
-        Key([], "l", lazy.spawn("betterlockscreen -l"), desc='Lock screen'),
-        Key([], "t", lazy.spawn("kitty"), desc='Terminal'),
-        Key([], "b", lazy.spawn("brave"), desc='Browser'),
-        Key([], "f", lazy.spawn("pcmanfm"), desc='File manager'),
-        Key([], "r", lazy.spawn("rofi -show drun"), desc='App launcher'),
-        Key([], "w", lazy.spawn("rofi -show window"), desc='Window switcher'),
-        Key([], "s", lazy.spawn("flameshot gui"), desc='Screenshot'),
-        Key([], "v", lazy.spawn("pavucontrol"), desc='Volume control'),
-        Key([], "n", lazy.spawn("notify-send 'Qtile' 'KeyChord works!'"), desc='Test notification'),
+        Key([], "l", spawn("betterlockscreen -l"), desc='Lock screen'),
+        Key([], "t", lazy.function(prewarmer.claim, "terminal"), desc='Terminal'),
+        Key([], "b", spawn("brave"), desc='Browser'),
+        Key([], "f", lazy.function(prewarmer.claim, "files"), desc='File manager'),
+        Key([], "r", spawn("rofi -show drun"), desc='App launcher'),
+        Key([], "w", open_window_switcher(), desc='Window switcher'),
+        Key([], "s", spawn("flameshot gui"), desc='Screenshot'),
+        Key([], "v", spawn("pavucontrol"), desc='Volume control'),
+        Key([], "n", spawn("notify-send 'Qtile' 'KeyChord works!'"), desc='Test notification'),
+        Key([], "c", lazy.function(theme.cycle), desc='Cycle color scheme'),
+        Key([], "k", show_keybindings(), desc='Keybindings cheat sheet'),
+        Key([], "e", lazy.function(wmtrace.recorder.toggle), desc='Start/stop recording an event trace'),
     ]),
 ]
 
@@ -193,6 +238,12 @@ group_labels = ["💻", "💬", "🚀", "🎵", "🦁", "👷", "🌮", "🎮",
 group_layouts = ["monadtall", "monadtall", "monadtall", "monadtall", "monadtall", "monadtall", "monadtall", "monadtall", "monadtall", "monadtall"]
 
 
+# Groups 1-4 go to monitor 0 (first monitor)
+# Groups 5-9 and 0 go to monitor 1 (second monitor)
+# The table is rebuilt when monitors are plugged or unplugged, see the
+# screens_reconfigured hook below.
+group_affinity = GroupAffinity.split(group_names, [4, 6], num_screens=3)
+
 for i in range(len(group_names)):
     groups.append(
         Group(
@@ -221,12 +272,26 @@ for i in groups:
         ]
     )
 
-colors = colors.DoomOne
+# Bindings made of lazy.layout calls restricted with .when(layout=...) are
+# resolved once per layout change instead of on every keypress, see
+# layout_dispatch.py.
+layout_dispatch.dispatch.rewrite(keys)
+
+# Every binding is now in place. Compiling them catches two bindings for the
+# same keys (qtile would silently keep the last one), see keymap.py.
+keymap = Keymap(keys)
+keys = keymap.keys
+
+# Holding group for prewarmed windows. Its empty label keeps it out of the
+# GroupBox and it has no keys of its own.
+groups.append(ScratchPad("prewarm", []))
+
+colors = theme.use("DoomOne")
 
 layout_theme = {"border_width": 0,
                 "margin": 8,
-                "border_focus": colors[8],
-                "border_normal": colors[1]
+                "border_focus": colors.hex[8],
+                "border_normal": colors.hex[1]
                 }
 
 layouts = [
@@ -234,6 +299,9 @@ layouts = [
     layout.MonadWide(**layout_theme),
     layout.Tile(**layout_theme),
     layout.Max(**layout_theme),
+    # MonadTall that only maps a page of secondary windows, for groups with
+    # very many of them, see virtual_stack.py.
+    virtual_stack.VirtualTall(**layout_theme, visible = 5),
     #layout.Bsp(**layout_theme),
     #layout.Floating(**layout_theme)
     #layout.RatioTile(**layout_theme),
@@ -273,20 +341,48 @@ widget_defaults = dict(
 )
 
 extension_defaults = widget_defaults.copy()
+
+# Lets theme.apply() recolour these in place when switching palettes.
+theme.track(layout_theme, widget_defaults)
+
+switcher = window_switcher.WindowSwitcher(
+    window_switcher.index,
+    goto = switch_to_group_on_monitor,
+    font = "Ubuntu Bold",
+    fontsize = 14,
+    foreground = colors.hex[1],
+    background = colors.hex[0],
+    highlight = colors.hex[6],
+)
+theme.track(switcher)
+
+# Data sources for polled widgets. These run on the shared poll executor so a
+# slow or hung command never blocks the event loop. The running kernel can't
+# change without a reboot, so it is read once.
+poller.register("kernel", lambda: os.uname().release, interval = 300, timeout = 5,
+                changes = wakeup.never)
+
+# Per-screen widgets (GroupBox, CurrentLayout, Prompt, WindowName, separators)
+# are built for every bar. The rest show the same thing on every screen and
+# are shared: one instance does the polling and qtile shows it on the other
+# bars through lightweight mirrors. Separators are painted from a cached
+# surface, see static_widgets.py.
 def init_widgets_list():
     widgets_list = [
-        widget.Spacer(length = 8),
+        factory.build(widget.Spacer, length = 8),
         # widget.Image(
         #          filename = "~/.config/qtile/icons/dt-icon.png",
         #          scale = "False",
         #          mouse_callbacks = {'Button1': lambda: qtile.cmd_spawn("qtilekeys-yad")},
         #          ),
-        widget.Prompt(
+        factory.build(
+            widget.Prompt,
             font = "Ubuntu Mono",
             fontsize=14,
             foreground = colors[1]
         ),
-        widget.GroupBox(
+        factory.build(
+            widget.GroupBox,
             fontsize = 10,
             margin_y = 5,
             margin_x = 12,
@@ -303,7 +399,8 @@ def init_widgets_list():
             other_current_screen_border = colors[7],
             other_screen_border = colors[4],
         ),
-        widget.TextBox(
+        factory.build(
+            static_widgets.StaticText,
             text = '|',
             font = "Ubuntu Mono",
             foreground = colors[9],
@@ -320,65 +417,80 @@ def init_widgets_list():
         #          padding = 10,
         #          foreground = colors[3],
         # ),
-        widget.TextBox(
+        factory.build(
+            static_widgets.StaticText,
             text = '|',
             font = "Ubuntu Mono",
             foreground = colors[9],
             padding = 2,
             fontsize = 14
         ),
-        widget.CurrentLayout(
+        factory.build(
+            widget.CurrentLayout,
             foreground = colors[1],
             padding = 5
         ),
-        widget.TextBox(
+        factory.build(
+            static_widgets.StaticText,
             text = '|',
             font = "Ubuntu Mono",
             foreground = colors[9],
             padding = 2,
             fontsize = 14
         ),
-        widget.WindowName(
+        factory.build(
+            widget.WindowName,
             foreground = colors[6],
             padding = 4,
             max_chars = 40
         ),
-        widget.GenPollText(
-            update_interval = 300,
-            func = lambda: subprocess.check_output("printf $(uname -r)", shell=True, text=True),
+        factory.shared(
+            "kernel",
+            poller.PolledText,
+            source = "kernel",
             foreground = colors[3],
             padding = 6, 
             fmt = '❤  {}',
         ),
-        widget.CPU(
+        factory.shared(
+            "cpu",
+            procstat.CPU,
             format = '  Cpu: {load_percent}%',
             foreground = colors[4],
             padding = 6, 
         ),
-        widget.Memory(
+        factory.shared(
+            "memory",
+            procstat.Memory,
             foreground = colors[8],
             padding = 6, 
             mouse_callbacks = {'Button1': lambda: qtile.cmd_spawn(myTerm + ' -e htop')},
             format = '{MemUsed: .0f}{mm}',
             fmt = '🖥  Mem: {}',
         ),
-        widget.Volume(
+        factory.shared(
+            "volume",
+            soundserver.Volume,
             foreground = colors[7],
             padding = 6, 
             fmt = '🕫  Vol: {}',
         ),
-        widget.Clock(
+        factory.shared(
+            "clock",
+            wakeup.Clock,
             foreground = colors[8],
             padding = 6, 
             format = "⧗  %a, %b %d - %H:%M",
         ),
-        widget.Spacer(length = 8),
+        factory.build(widget.Spacer, length = 8),
     ]
     return widgets_list
 
 def init_widgets_screen1():
     widgets_screen1 = init_widgets_list()
-    widgets_screen1.insert(-1, widget.Systray(padding = 3))
+    widgets_screen1.insert(-1, factory.build(widget.Systray, padding = 3))
+    if showLatency:
+        widgets_screen1.insert(-1, factory.build(latency.LatencyText, foreground = colors[8], padding = 6))
     return widgets_screen1 
 
 def init_widgets_screen2():
@@ -500,46 +612,46 @@ def init_widgets_screen2():
 #     return widgets_screen2
 
 # For adding transparency to your bar, add (background="#00000000") to the "Screen" line(s)
-# For ex: Screen(top=bar.Bar(widgets=init_widgets_screen2(), background="#00000000", size=24)),
+# For ex: Screen(top=redraw.Bar(widgets=init_widgets_screen2(), background="#00000000", size=24)),
 
+# redraw.Bar batches widget redraws and draws each bar at most once per
+# monitor frame, see redraw.py.
 def init_screens():
-    return [Screen(top=bar.Bar(widgets=init_widgets_screen1(), margin=[8, 12, 0, 12], size=28)),
-            Screen(top=bar.Bar(widgets=init_widgets_screen2(), margin=[8, 12, 0, 12], size=28)),
-            Screen(top=bar.Bar(widgets=init_widgets_screen2(), margin=[8, 12, 0, 12], size=28))]
+    return [Screen(top=redraw.Bar(widgets=init_widgets_screen1(), margin=[8, 12, 0, 12], size=28)),
+            Screen(top=redraw.Bar(widgets=init_widgets_screen2(), margin=[8, 12, 0, 12], size=28)),
+            Screen(top=redraw.Bar(widgets=init_widgets_screen2(), margin=[8, 12, 0, 12], size=28))]
 
 if __name__ in ["config", "__main__"]:
     screens = init_screens()
-    widgets_list = init_widgets_list()
-    widgets_screen1 = init_widgets_screen1()
-    widgets_screen2 = init_widgets_screen2()
 
+# Group and screen steps wrap around, see navigation.py.
+@latency.timed
 def window_to_prev_group(qtile):
-    if qtile.currentWindow is not None:
-        i = qtile.groups.index(qtile.currentGroup)
-        qtile.currentWindow.togroup(qtile.groups[i - 1].name)
+    navigation.window_to_group_offset(qtile, -1)
 
+@latency.timed
 def window_to_next_group(qtile):
-    if qtile.currentWindow is not None:
-        i = qtile.groups.index(qtile.currentGroup)
-        qtile.currentWindow.togroup(qtile.groups[i + 1].name)
+    navigation.window_to_group_offset(qtile, 1)
 
+@latency.timed
 def window_to_previous_screen(qtile):
-    i = qtile.screens.index(qtile.current_screen)
-    if i != 0:
-        group = qtile.screens[i - 1].group.name
-        qtile.current_window.togroup(group)
+    navigation.window_to_screen_offset(qtile, -1)
 
+@latency.timed
 def window_to_next_screen(qtile):
-    i = qtile.screens.index(qtile.current_screen)
-    if i + 1 != len(qtile.screens):
-        group = qtile.screens[i + 1].group.name
-        qtile.current_window.togroup(group)
+    navigation.window_to_screen_offset(qtile, 1)
 
+@latency.timed
 def switch_screens(qtile):
-    i = qtile.screens.index(qtile.current_screen)
-    group = qtile.screens[i - 1].group
+    group = navigation.screen_offset(qtile, -1).group
     qtile.current_screen.set_group(group)
 
+# Move every window matching a Match to a group with one layout pass, e.g.
+# lazy.function(move_matching_to_group, Match(wm_class="Slack"), "2")
+@latency.timed
+def move_matching_to_group(qtile, match, group_name):
+    navigation.move_matching(qtile, match, group_name)
+
 mouse = [
     Drag([mod], "Button1", lazy.window.set_position_floating(), start=lazy.window.get_position()),
     Drag([mod], "Button3", lazy.window.set_size_floating(), start=lazy.window.get_size()),
@@ -551,8 +663,10 @@ dgroups_app_rules = []  # type: list
 follow_mouse_focus = True
 bring_front_click = False
 cursor_warp = False
-floating_layout = layout.Floating(
-    border_focus=colors[8],
+# float_rules.Floating looks the rules up in a compiled index instead of
+# trying every Match on each new window.
+floating_layout = float_rules.Floating(
+    border_focus=colors.hex[8],
     border_width=2,
     float_rules=[
         # Run the utility of `xprop` to see the wm class and name of an X client.
@@ -594,14 +708,137 @@ auto_minimize = True
 # When using the Wayland backend, this can be used to configure input devices.
 wl_input_rules = None
 
-@hook.subscribe.startup_once
-def start_once():
-    home = os.path.expanduser('~')
-    subprocess.call([home + '/.config/qtile/autostart.sh'])
+# Autostart programs. These used to be started by autostart.sh, which blocked
+# qtile's startup until it finished. The supervisor starts every service as
+# soon as whatever it comes after is ready, skips ones that are already
+# running and restarts ones that crash, see supervisor.py. autostart.sh
+# started everything even if xrandr failed, so the dependencies here are
+# ordering only (after) rather than requires.
+conky_colorscheme = "tomorrow-night"
+
+autostart_services = [
+    Service("xrandr", ["xrandr",
+                       "--output", "DisplayPort-0", "--mode", "3440x1440", "--rate", "165",
+                       "--output", "DisplayPort-1", "--mode", "3440x1440", "--rate", "165"],
+            oneshot = True),
+    Service("screenlayout", ["~/.screenlayout/layout.sh"], after = ["xrandr"], oneshot = True,
+            condition = lambda: os.path.exists(os.path.expanduser("~/.screenlayout/layout.sh"))),
+    Service("picom", ["picom", "--config", "~/.config/picom/picom.conf"],
+            replace = True, ready = supervisor.ready_after(0.2)),
+    Service("lxsession", ["lxsession"]),
+    Service("dunst", ["dunst"]),
+    Service("nm-applet", ["nm-applet"]),
+    Service("mpd", ["systemctl", "--user", "start", "mpd"], oneshot = True),
+    Service("keyring", ["gnome-keyring-daemon", "--start", "--components=secrets"], oneshot = True),
+    # Wallpaper and conky need the final monitor layout.
+    Service("nitrogen", ["nitrogen", "--restore"], after = ["screenlayout"], oneshot = True),
+    Service("conky", ["conky", "-c", "~/.config/conky/qtile/01/" + conky_colorscheme + ".conf"],
+            after = ["screenlayout", "picom"]),
+    Service("betterlockscreen", ["betterlockscreen", "-u", "/usr/share/backgrounds/dtos-backgrounds/0277.jpg"],
+            oneshot = True,
+            condition = lambda: not os.path.isdir(os.path.expanduser("~/.cache/betterlockscreen"))),
+]
+
+# Kept at module level, the event loop only holds weak references to the
+# supervisor's tasks.
+autostart = supervisor.Supervisor(autostart_services)
 
 @hook.subscribe.startup_once
-def autostart():
-    subprocess.Popen(['gnome-keyring-daemon', '--start', '--components=secrets'])
+def start_once():
+    autostart.start()
+
+@hook.subscribe.startup_complete
+@hook.subscribe.screens_reconfigured
+def update_group_affinity():
+    group_affinity.on_screens_changed(qtile)
+
+# Monitors may have come back at a different refresh rate.
+@hook.subscribe.screens_reconfigured
+def update_refresh_rates():
+    redraw.scheduler.query_rates(qtile)
+
+@hook.subscribe.shutdown
+def report_redraws():
+    logger.info("bar redraws: %s", redraw.scheduler.stats())
+    logger.info("static bar segments: %s", static_widgets.cache.stats())
+    logger.info("layout cache: %s", layout_cache.stats)
+    logger.info("timer wake-ups: %s", wakeup.scheduler.stats())
+    logger.info("volume events: %s", soundserver.monitor.stats())
+    logger.info("command latency (calls, p95 ms): %s", latency.recorder.stats())
+    logger.info("window switcher: %s", window_switcher.index.stats())
+    logger.info("session state: %s", session_state.state.stats())
+
+@hook.subscribe.startup_complete
+def start_prewarm():
+    prewarmer.start(qtile)
+
+@hook.subscribe.startup_complete
+def start_spawner():
+    spawner.spawner.start()
+
+@hook.subscribe.shutdown
+def stop_spawner():
+    spawner.spawner.stop()
+
+hook.subscribe.client_new(prewarmer.on_client_new)
+hook.subscribe.client_killed(prewarmer.on_client_killed)
+hook.subscribe.client_focus(prewarmer.on_client_focus)
+
+@hook.subscribe.shutdown
+def report_prewarm():
+    logger.info("prewarm: %s", prewarmer.stats())
+
+hook.subscribe.addgroup(navigation.on_groups_changed)
+hook.subscribe.delgroup(navigation.on_groups_changed)
+hook.subscribe.changegroup(navigation.on_groups_changed)
+
+# Cached layout geometry is only valid while a group's windows stay the same.
+hook.subscribe.group_window_add(layout_cache.on_group_window_change)
+hook.subscribe.group_window_remove(layout_cache.on_group_window_change)
+hook.subscribe.client_killed(layout_cache.on_client_killed)
+hook.subscribe.float_change(layout_cache.on_float_change)
+
+hook.subscribe.layout_change(layout_dispatch.dispatch.on_layout_change)
+
+# Event traces for bench/replay.py, recorded while toggled on with mod+p e.
+hook.subscribe.client_new(wmtrace.recorder.client_new)
+hook.subscribe.client_killed(wmtrace.recorder.client_killed)
+hook.subscribe.client_name_updated(wmtrace.recorder.client_name_updated)
+hook.subscribe.screens_reconfigured(wmtrace.recorder.screens)
+
+# Window list for the window switcher.
+hook.subscribe.client_new(window_switcher.index.on_client_new)
+hook.subscribe.client_killed(window_switcher.index.on_client_killed)
+hook.subscribe.client_name_updated(window_switcher.index.on_client_name_updated)
+hook.subscribe.client_focus(window_switcher.index.on_client_focus)
+hook.subscribe.client_focus(switcher.on_client_focus)
+hook.subscribe.group_window_add(window_switcher.index.on_group_window_add)
+
+@hook.subscribe.shutdown
+def stop_trace():
+    wmtrace.recorder.stop()
+
+# Groups, layouts and window placement survive restarts, see session_state.py.
+# The prewarm hooks above see new windows first, so parked ones stay parked.
+hook.subscribe.startup_complete(session_state.state.restore)
+hook.subscribe.client_new(session_state.state.on_client_new)
+hook.subscribe.client_killed(session_state.state.on_client_killed)
+hook.subscribe.client_name_updated(session_state.state.on_client_name_updated)
+hook.subscribe.client_focus(session_state.state.changed)
+hook.subscribe.group_window_add(session_state.state.changed)
+hook.subscribe.group_window_remove(session_state.state.changed)
+hook.subscribe.float_change(session_state.state.changed)
+hook.subscribe.layout_change(session_state.state.changed)
+
+@hook.subscribe.shutdown
+def save_session_state():
+    session_state.state.write()
+
+# Logs how many widget objects the bars needed and roughly how much memory
+# they take, see bar_widgets.py.
+@hook.subscribe.startup_complete
+def report_widgets():
+    logger.info("bar widgets: %s", factory.report())
 
 
 # XXX: Gasp! We're lying here. In fact, nobody really uses or cares about this
@@ -0,0 +1,119 @@
+# Indexed float rules.
+#
+# layout.Floating decides whether a new window floats by trying every Match
+# in float_rules in turn, and each Match fetches the window's properties again.
+# FloatRuleIndex compiles the rules once: exact strings go into per-property
+# sets, regex rules on the same property are merged into one pattern, and
+# anything else (func, pid, multi-property rules) stays a plain Match. Window
+# properties are read once per decision and decisions are memoized per
+# (wm_class, title, wm_type, role).
+
+import re
+
+from libqtile import layout
+
+# Match properties the index knows how to look up
+INDEXED = ("wm_class", "wm_instance_class", "title", "wm_type", "role")
+
+_Pattern = type(re.compile(""))
+
+
+class FloatRuleIndex:
+    def __init__(self, rules, cache_size=4096):
+        self.exact = {prop: set() for prop in INDEXED}
+        patterns = {prop: [] for prop in INDEXED}
+        self.fallback = []
+        for rule in rules:
+            items = list(rule._rules.items())
+            if len(items) != 1 or items[0][0] not in INDEXED:
+                self.fallback.append(rule)
+                continue
+            prop, value = items[0]
+            if isinstance(value, str):
+                self.exact[prop].add(value)
+            elif isinstance(value, _Pattern):
+                patterns[prop].append(value)
+            else:
+                self.fallback.append(rule)
+
+        self.patterns = {}
+        for prop, compiled in patterns.items():
+            if compiled:
+                # Match.compare uses pattern.match(), keep every branch anchored
+                # at the start the same way and keep per-pattern flags inline.
+                self.patterns[prop] = re.compile("|".join(
+                    "(?:%s)" % _with_flags(p) for p in compiled
+                ))
+        self.used = {prop for prop in INDEXED if self.exact[prop] or prop in self.patterns}
+        self.cache_size = cache_size
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def properties(self, win):
+        """Read only the window properties some rule looks at."""
+        wm_class = ()
+        if "wm_class" in self.used or "wm_instance_class" in self.used:
+            wm_class = tuple(win.get_wm_class() or ())
+        title = win.name if "title" in self.used else None
+        wm_type = win.get_wm_type() if "wm_type" in self.used else None
+        role = win.get_wm_role() if "role" in self.used and hasattr(win, "get_wm_role") else None
+        return wm_class, title, wm_type, role
+
+    def _decide(self, wm_class, title, wm_type, role):
+        values = {
+            "wm_class": wm_class,
+            "wm_instance_class": wm_class[:1],
+            "title": (title,) if title is not None else (),
+            "wm_type": (wm_type,) if wm_type is not None else (),
+            "role": (role,) if role is not None else (),
+        }
+        for prop in self.used:
+            exact = self.exact[prop]
+            pattern = self.patterns.get(prop)
+            for value in values[prop]:
+                if value in exact or (pattern is not None and pattern.match(value)):
+                    return True
+        return False
+
+    def match(self, win):
+        try:
+            key = self.properties(win)
+        except Exception:
+            # Window went away while we were looking, same as Window.match().
+            return False
+        decision = self.cache.get(key)
+        if decision is None:
+            self.misses += 1
+            decision = self._decide(*key)
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            self.cache[key] = decision
+        else:
+            self.hits += 1
+        if decision:
+            return True
+        return any(win.match(rule) for rule in self.fallback)
+
+
+def _with_flags(pattern):
+    flags = pattern.flags & (re.IGNORECASE | re.MULTILINE | re.DOTALL | re.VERBOSE)
+    if not flags:
+        return pattern.pattern
+    letters = "".join(
+        letter for flag, letter in (
+            (re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"),
+        ) if flags & flag
+    )
+    return "(?%s:%s)" % (letters, pattern.pattern)
+
+
+class Floating(layout.Floating):
+    """layout.Floating that decides default floating through a FloatRuleIndex."""
+
+    def __init__(self, float_rules=None, **config):
+        layout.Floating.__init__(self, float_rules=float_rules, **config)
+        self.rule_index = FloatRuleIndex(self.float_rules)
+
+    def match(self, win):
+        return self.rule_index.match(win)
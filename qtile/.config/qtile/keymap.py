@@ -0,0 +1,146 @@
+# Keybinding compiler.
+#
+# qtile grabs keys by keycode and modifier mask, so two bindings for the same
+# combination silently overwrite each other and the last one in the list
+# wins. Keymap walks the keys list once at config load, KeyChords included,
+# and builds a trie of every modifier+key path. Duplicate paths and bindings
+# that shadow a chord prefix are collected as conflicts, and either logged or
+# raised depending on on_conflict.
+#
+# The result is a frozen path -> binding table for lookups and a cheat sheet
+# built from the desc fields. The cheat sheet is written to the cache
+# directory only when it changes, so the launcher can show it without asking
+# qtile.
+
+import os
+import types
+
+from libqtile.log_utils import logger
+
+# Order qtile's modifier names are shown in.
+MODIFIERS = ("mod4", "mod1", "control", "shift", "mod2", "mod3", "mod5", "lock")
+NAMES = {"mod4": "super", "mod1": "alt", "control": "ctrl"}
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "qtile")
+
+
+class KeymapConflict(Exception):
+    pass
+
+
+def normalize(modifiers, name):
+    modifiers = tuple(sorted(set(modifiers), key=lambda m: (
+        MODIFIERS.index(m) if m in MODIFIERS else len(MODIFIERS), m)))
+    # "T" and "t" are the same keycode, qtile can't tell them apart.
+    return modifiers, name.lower() if len(name) == 1 else name
+
+
+def combo(key):
+    """Normalized (modifiers, key) for a Key or KeyChord."""
+    return normalize(key.modifiers, key.key)
+
+
+def _describe(key):
+    if key.desc:
+        return key.desc
+    return "chord" if getattr(key, "submappings", None) is not None else "binding"
+
+
+def format_path(path):
+    return " ".join(
+        "+".join([NAMES.get(m, m) for m in modifiers] + [name])
+        for modifiers, name in path
+    )
+
+
+class Keymap:
+    def __init__(self, keys, on_conflict="warn"):
+        if on_conflict not in ("warn", "error"):
+            raise ValueError("on_conflict must be 'warn' or 'error'")
+        self.trie = {}
+        self.conflicts = []
+        self.keys = self._compile(keys, self.trie, ())
+        table = {}
+        self._flatten(self.trie, (), table)
+        self.table = types.MappingProxyType(table)
+        self._cheatsheet = None
+        self._search_index = None
+
+        if self.conflicts:
+            message = "\n".join(
+                "%s: %r overrides %r" % (format_path(path), new, old)
+                for path, old, new in self.conflicts
+            )
+            if on_conflict == "error":
+                raise KeymapConflict(message)
+            logger.warning("keymap: %d conflicting bindings:\n%s", len(self.conflicts), message)
+
+    def _compile(self, keys, node, prefix):
+        """Fill node from keys and return keys with overridden bindings dropped."""
+        position = {}
+        kept = []
+        for key in keys:
+            step = combo(key)
+            path = prefix + (step,)
+            submappings = getattr(key, "submappings", None)
+            previous = node.get(step)
+            if previous is not None:
+                self.conflicts.append((path, _describe(previous[0]), _describe(key)))
+                # Same outcome as qtile: the later binding wins.
+                kept[position[step]] = None
+            if submappings is not None:
+                children = {}
+                key.submappings = self._compile(submappings, children, path)
+                node[step] = (key, children)
+            else:
+                node[step] = (key, None)
+            position[step] = len(kept)
+            kept.append(key)
+        return [key for key in kept if key is not None]
+
+    def _flatten(self, node, prefix, table):
+        for step, (key, children) in node.items():
+            path = prefix + (step,)
+            table[path] = key
+            if children is not None:
+                self._flatten(children, path, table)
+
+    def lookup(self, *path):
+        """Binding for a sequence of (modifiers, key) steps, or None."""
+        return self.table.get(tuple(normalize(modifiers, name) for modifiers, name in path))
+
+    def cheatsheet(self):
+        """One "keys  description" line per binding, in config order."""
+        if self._cheatsheet is None:
+            width = max((len(format_path(path)) for path in self.table), default=0)
+            self._cheatsheet = [
+                "%-*s  %s" % (width, format_path(path), key.desc)
+                for path, key in self.table.items()
+                # A chord on its own is only a prefix, list it if it says what it's for.
+                if key.desc or getattr(key, "submappings", None) is None
+            ]
+        return self._cheatsheet
+
+    def search(self, query):
+        """Cheat sheet lines whose keys or description contain every word of query."""
+        if self._search_index is None:
+            self._search_index = [(line.lower(), line) for line in self.cheatsheet()]
+        words = query.lower().split()
+        return [line for text, line in self._search_index if all(w in text for w in words)]
+
+    def write_cheatsheet(self, path=None):
+        """Write the cheat sheet for external viewers if it changed, return its path."""
+        path = path or os.path.join(CACHE_DIR, "keys.txt")
+        data = ("\n".join(self.cheatsheet()) + "\n").encode()
+        try:
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return path
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return path
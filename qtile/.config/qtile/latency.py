@@ -0,0 +1,194 @@
+# Latency of the commands defined in config.py.
+#
+# @timed records how long each call of a function takes, together with how
+# many group relayouts and bar redraw requests happened during it. Every
+# function keeps its last `capacity` calls in a ring buffer and all of its
+# calls in a histogram with fixed millisecond buckets, so the cost stays the
+# same however long qtile runs.
+#
+# The numbers can be read over qtile's command interface, either through the
+# LatencyText debug widget
+#
+#   qtile cmd-obj -o widget latencytext -f latency
+#
+# or, without the widget, by evaluating in the root object
+#
+#   qtile cmd-obj -o cmd -f eval -a "__import__('latency').recorder.report()"
+
+import collections
+import functools
+import time
+
+import libqtile
+from libqtile.command.base import expose_command
+from libqtile.widget import base
+
+import redraw
+
+# Upper bounds of the histogram buckets in ms, plus one for everything slower.
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+
+def _count_relayouts(group_class, counter):
+    """Make group_class.layout_all() bump counter[0]. Safe to repeat on reload."""
+    layout_all = getattr(group_class.layout_all, "__wrapped__", group_class.layout_all)
+
+    @functools.wraps(layout_all)
+    def counted(self, *args, **kwargs):
+        counter[0] += 1
+        return layout_all(self, *args, **kwargs)
+
+    group_class.layout_all = counted
+
+
+class Series:
+    """Recent calls and the latency histogram of one function."""
+
+    def __init__(self, name, capacity):
+        self.name = name
+        # (ms, relayouts, redraw requests) of the most recent calls
+        self.recent = collections.deque(maxlen=capacity)
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms, relayouts, redraws):
+        self.recent.append((ms, relayouts, redraws))
+        bucket = 0
+        while bucket < len(BUCKETS_MS) and ms > BUCKETS_MS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+        self.calls += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p):
+        """p-th percentile in ms over the calls still in the ring buffer."""
+        if not self.recent:
+            return None
+        ordered = sorted(ms for ms, _, _ in self.recent)
+        return round(ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)], 3)
+
+    def summary(self):
+        recent = self.recent
+        labels = ["<=%gms" % bound for bound in BUCKETS_MS] + [">%gms" % BUCKETS_MS[-1]]
+        return {
+            "calls": self.calls,
+            "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": round(self.max_ms, 3),
+            "last_ms": round(recent[-1][0], 3) if recent else None,
+            "relayouts_avg": round(sum(r for _, r, _ in recent) / len(recent), 2) if recent else None,
+            "redraws_avg": round(sum(d for _, _, d in recent) / len(recent), 2) if recent else None,
+            "histogram": {label: n for label, n in zip(labels, self.histogram) if n},
+        }
+
+
+class Recorder:
+    def __init__(self, capacity=128):
+        self.capacity = capacity
+        self.series = {}
+        self.listeners = []
+        self.relayouts = [0]
+        self._counting = None
+
+    def _ensure_counting(self):
+        # The group class is only reachable once qtile is running.
+        qtile = libqtile.qtile
+        group = getattr(qtile, "current_group", None)
+        if group is None or self._counting is type(group):
+            return
+        self._counting = type(group)
+        _count_relayouts(self._counting, self.relayouts)
+
+    def record(self, name, ms, relayouts, redraws):
+        series = self.series.get(name)
+        if series is None:
+            series = self.series[name] = Series(name, self.capacity)
+        series.add(ms, relayouts, redraws)
+        for listener in self.listeners:
+            listener(series)
+
+    def timed(self, func=None, *, name=None):
+        """Decorator recording the latency of every call of func."""
+        if func is None:
+            return functools.partial(self.timed, name=name)
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            self._ensure_counting()
+            relayouts = self.relayouts[0]
+            redraws = redraw.scheduler.requested
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                ms = (time.perf_counter() - start) * 1000
+                self.record(label, ms, self.relayouts[0] - relayouts,
+                            redraw.scheduler.requested - redraws)
+
+        return wrapper
+
+    def report(self, name=None):
+        """Summaries by function, slowest (p95) first, or just one function's."""
+        if name is not None:
+            series = self.series.get(name)
+            return series.summary() if series is not None else None
+        ordered = sorted(self.series.values(), key=lambda s: s.percentile(95) or 0, reverse=True)
+        return {series.name: series.summary() for series in ordered}
+
+    def recent(self, name):
+        series = self.series.get(name)
+        return list(series.recent) if series is not None else []
+
+    def reset(self):
+        self.series.clear()
+
+    def stats(self):
+        return {name: (s.calls, s.percentile(95)) for name, s in self.series.items()}
+
+
+recorder = Recorder()
+timed = recorder.timed
+
+
+class LatencyText(base._TextBox):
+    """Debug widget showing the latest timed call, and the command interface to the data."""
+
+    defaults = [
+        ("format", "{name} {last_ms:.1f}ms p95 {p95_ms:.1f}ms", "Display format"),
+    ]
+
+    def __init__(self, **config):
+        base._TextBox.__init__(self, "", **config)
+        self.add_defaults(LatencyText.defaults)
+
+    def timer_setup(self):
+        recorder.listeners.append(self._on_record)
+
+    def _on_record(self, series):
+        summary = series.summary()
+        self.update(self.format.format(name=series.name, **summary))
+
+    def finalize(self):
+        if self._on_record in recorder.listeners:
+            recorder.listeners.remove(self._on_record)
+        base._TextBox.finalize(self)
+
+    @expose_command()
+    def latency(self, name=None):
+        """Latency summaries of the timed functions, or of the one called name."""
+        return recorder.report(name)
+
+    @expose_command()
+    def latency_recent(self, name):
+        """(ms, relayouts, redraw requests) of name's most recent calls."""
+        return recorder.recent(name)
+
+    @expose_command()
+    def latency_reset(self):
+        """Forget everything recorded so far."""
+        recorder.reset()
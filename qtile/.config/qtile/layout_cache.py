@@ -0,0 +1,139 @@
+# Per-group layout geometry snapshots.
+#
+# Toggling a group between monadtall and max makes the new layout place every
+# client from scratch. switch_layout() takes a snapshot of where the outgoing
+# layout put each tiled window, keyed by layout name and screen geometry, and
+# when the group is switched back with the same windows on the same screen it
+# puts them straight back instead of running the layout again.
+#
+# mod+f also toggles fullscreen right after switching. A fullscreen window
+# is out of the layout only until it leaves fullscreen again, so it still
+# counts as one of the layout's windows here and keeps the geometry the
+# layout last gave it.
+#
+# Snapshots of a group are dropped whenever a window is added to it, removed
+# from it or starts/stops floating, see the hooks in config.py.
+
+from libqtile import qtile
+
+from batch import deferred_layout
+
+
+def _managed(group):
+    """The windows the layout places, including fullscreen ones."""
+    return [win for win in group.windows if not win.floating or getattr(win, "fullscreen", False)]
+
+
+class Snapshot:
+    def __init__(self, windows, focused, previous=None):
+        # Border colours depend on focus, so the snapshot is only good for
+        # the same windows with the same one focused.
+        self.key = (tuple(win.wid for win in windows), focused)
+        if previous is not None and previous.key != self.key:
+            previous = None
+        self.geometry = []
+        for i, win in enumerate(windows):
+            if getattr(win, "fullscreen", False):
+                # Covering the screen isn't where the layout put it.
+                self.geometry.append(previous.geometry[i] if previous is not None else None)
+            else:
+                self.geometry.append(
+                    (win.hidden, win.x, win.y, win.width, win.height, win.borderwidth, win.bordercolor))
+
+    def usable(self, windows):
+        """Whether every window that isn't fullscreen has geometry."""
+        return all(
+            geometry is not None or getattr(win, "fullscreen", False)
+            for win, geometry in zip(windows, self.geometry)
+        )
+
+    def apply(self, windows):
+        for win, geometry in zip(windows, self.geometry):
+            # Placed by the layout when it leaves fullscreen.
+            if getattr(win, "fullscreen", False):
+                continue
+            hidden, x, y, width, height, borderwidth, bordercolor = geometry
+            # Layouts like max hide everything but the focused window.
+            if hidden:
+                win.hide()
+                continue
+            win.place(x, y, width, height, borderwidth, bordercolor)
+            win.unhide()
+
+
+# group name -> {(layout name, screen rect): Snapshot}
+_cache = {}
+stats = {"hits": 0, "misses": 0}
+
+
+def _screen_key(screen):
+    rect = screen.get_rect()
+    return (rect.x, rect.y, rect.width, rect.height)
+
+
+def invalidate(group):
+    _cache.pop(group.name, None)
+
+
+def switch_layout(group, name):
+    """Switch group to layout name, reusing cached geometry when it's still valid."""
+    if group.screen is None or group.layout.name == name:
+        group.layout = name
+        return
+
+    screen_key = _screen_key(group.screen)
+    tiled = _managed(group)
+    focused = group.current_window.wid if group.current_window is not None else None
+    snapshots = _cache.setdefault(group.name, {})
+    current = Snapshot(tiled, focused, snapshots.get((group.layout.name, screen_key)))
+    snapshots[(group.layout.name, screen_key)] = current
+
+    snapshot = snapshots.get((name, screen_key))
+    if snapshot is None or snapshot.key != current.key or not snapshot.usable(tiled):
+        stats["misses"] += 1
+        group.layout = name
+        # Taken now, before a fullscreen toggle in the same binding covers
+        # the window up.
+        snapshots[(name, screen_key)] = Snapshot(tiled, focused)
+        return
+
+    stats["hits"] += 1
+    with group.qtile.core.masked():
+        with deferred_layout(group) as pending:
+            group.layout = name
+            # Geometry comes from the snapshot, skip the placement pass.
+            pending.clear()
+        snapshot.apply(tiled)
+        win = group.current_window
+        if win is not None and group.screen == group.qtile.current_screen:
+            win.focus(False)
+
+
+# Hook handlers
+
+def on_group_window_change(group, window):
+    invalidate(group)
+
+
+def on_client_killed(window):
+    _fullscreen.discard(window.wid)
+    if window.group is not None:
+        invalidate(window.group)
+
+
+# wids of windows last seen fullscreen
+_fullscreen = set()
+
+
+def on_float_change():
+    # The hook doesn't say which window changed, in practice it's the
+    # focused one. Going into or out of fullscreen leaves snapshots alone.
+    win = qtile.current_window
+    if win is None or win.group is None:
+        return
+    if getattr(win, "fullscreen", False):
+        _fullscreen.add(win.wid)
+    elif win.wid in _fullscreen:
+        _fullscreen.discard(win.wid)
+    else:
+        invalidate(win.group)
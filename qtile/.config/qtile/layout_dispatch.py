@@ -0,0 +1,95 @@
+# Layout-resolved dispatch for .when(layout=...) bindings.
+#
+# For a binding like
+#
+#   Key([mod], "equal",
+#       lazy.layout.grow_left().when(layout=["bsp", "columns"]),
+#       lazy.layout.grow().when(layout=["monadtall", "monadwide"]))
+#
+# qtile checks every command's conditions on each keypress and then looks
+# the layout up again through the command graph. LayoutDispatch replaces the
+# commands of such bindings with one lazy.function that calls a list of
+# bound layout methods. The list is worked out per group, once, whenever the
+# group's layout changes (layout_change hook), so holding down grow or
+# shuffle does no predicate or lookup work per event.
+#
+# Only bindings made entirely of plain lazy.layout.* calls, optionally
+# restricted with when(layout=...), are rewritten. Anything else keeps
+# going through qtile as before.
+
+import functools
+
+from libqtile.lazy import lazy
+
+LAYOUT_SELECTORS = [("layout", None)]
+
+
+def _plain_layout_call(call):
+    if list(call.selectors) != LAYOUT_SELECTORS:
+        return False
+    if getattr(call, "_focused", None) is not None or getattr(call, "_when_floating", None) is not None:
+        return False
+    func = getattr(call, "_func", None)
+    # lazy.when() only replaces the always-true default when func= is given.
+    return func is None or func.__qualname__.startswith("LazyCall.")
+
+
+def _method(layout, name):
+    # Newer qtile exposes commands under their own name, older under cmd_*.
+    return getattr(layout, name, None) or getattr(layout, "cmd_" + name, None)
+
+
+class LayoutDispatch:
+    def __init__(self):
+        self.bindings = []
+        # group name -> (layout, [calls for each binding])
+        self.resolved = {}
+
+    def rewrite(self, keys):
+        """Rewrite eligible bindings in keys (KeyChords included) in place."""
+        for key in keys:
+            submappings = getattr(key, "submappings", None)
+            if submappings is not None:
+                self.rewrite(submappings)
+                continue
+            calls = list(key.commands)
+            if not any(getattr(call, "_layouts", None) for call in calls):
+                continue
+            if not all(_plain_layout_call(call) for call in calls):
+                continue
+            index = len(self.bindings)
+            self.bindings.append([call for call in calls if getattr(call, "_condition", None) is not False])
+            key.commands = [lazy.function(self.run, index)]
+        return keys
+
+    def resolve(self, group):
+        layout = group.layout
+        name = layout.name
+        per_binding = []
+        for calls in self.bindings:
+            resolved = []
+            for call in calls:
+                if call._layouts and name not in call._layouts:
+                    continue
+                method = _method(layout, call.name)
+                if method is not None:
+                    resolved.append(functools.partial(method, *call.args, **call.kwargs))
+            per_binding.append(resolved)
+        entry = self.resolved[group.name] = (layout, per_binding)
+        return entry
+
+    def run(self, qtile, index):
+        group = qtile.current_group
+        entry = self.resolved.get(group.name)
+        if entry is None or entry[0] is not group.layout:
+            entry = self.resolve(group)
+        for call in entry[1][index]:
+            call()
+
+    # Hook handlers
+
+    def on_layout_change(self, layout, group):
+        self.resolve(group)
+
+
+dispatch = LayoutDispatch()
@@ -0,0 +1,77 @@
+# Group/screen navigation with a maintained index.
+#
+# qtile keeps groups in a plain list, so "the group after this one" means a
+# linear qtile.groups.index() on every keypress. GroupIndex keeps a name ->
+# position map that is rebuilt only when groups are added, removed or
+# reordered, and every step wraps around instead of running off the end.
+# Groups with an empty label (ScratchPads) are skipped. Screens already know
+# their own position (screen.index).
+#
+# move_matching() moves every window matching a Match to one group with a
+# single layout pass per affected group. It skips unlabelled groups too, so
+# the windows parked in the prewarm ScratchPad stay there.
+
+from batch import deferred_layout
+
+
+class GroupIndex:
+    def __init__(self):
+        self.names = []
+        self.positions = {}
+
+    def rebuild(self, qtile):
+        self.names = [group.name for group in qtile.groups if group.label]
+        self.positions = {name: i for i, name in enumerate(self.names)}
+
+    def offset(self, qtile, name, step):
+        """Name of the group step places away from name, wrapping around."""
+        if name not in self.positions:
+            self.rebuild(qtile)
+        position = self.positions[name]
+        return self.names[(position + step) % len(self.names)]
+
+
+index = GroupIndex()
+
+
+def on_groups_changed(*args):
+    """Hook handler for addgroup/delgroup/changegroup."""
+    index.names = []
+    index.positions = {}
+
+
+def screen_offset(qtile, step):
+    """The screen step places away from the current one, wrapping around."""
+    return qtile.screens[(qtile.current_screen.index + step) % len(qtile.screens)]
+
+
+def window_to_group_offset(qtile, step):
+    win = qtile.current_window
+    if win is None:
+        return
+    win.togroup(index.offset(qtile, qtile.current_group.name, step))
+
+
+def window_to_screen_offset(qtile, step):
+    win = qtile.current_window
+    screen = screen_offset(qtile, step)
+    if win is None or screen is qtile.current_screen:
+        return
+    win.togroup(screen.group.name)
+
+
+def move_matching(qtile, match, group_name):
+    """Move every window matching match to group_name, laying out each group once."""
+    target = qtile.groups_map[group_name]
+    windows = [
+        win for group in qtile.groups if group.label for win in group.windows
+        if group is not target and match.compare(win)
+    ]
+    if not windows:
+        return 0
+    groups = {win.group for win in windows}
+    groups.add(target)
+    with qtile.core.masked(), deferred_layout(*groups):
+        for win in windows:
+            win.togroup(group_name, switch_group=False)
+    return len(windows)
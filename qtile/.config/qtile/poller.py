@@ -0,0 +1,232 @@
+# Shared poll executor for bar widgets.
+#
+# Every data source registered here runs on a small, bounded thread pool
+# instead of the qtile event loop. Each source gets its own interval, a hard
+# timeout and a circuit breaker, and results are handed back to the loop with
+# call_soon_threadsafe so a slow fork or a hung command can never delay key
+# handling or bar redraws.
+#
+# A source that knows when its value can change passes a change hint
+# (changes=wakeup.never, wakeup.every(3600), ...). It is then polled at that
+# wall-clock moment, through the shared wake-up scheduler, instead of every
+# interval seconds. interval still paces retries after a failure.
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from libqtile.log_utils import logger
+from libqtile.widget import base
+
+import wakeup
+
+# Circuit breaker states
+CLOSED = "closed"        # polling normally
+OPEN = "open"            # too many failures, skipping polls until cooldown ends
+HALF_OPEN = "half-open"  # cooldown over, next poll decides
+
+
+class Source:
+    """A named poll function plus its scheduling and failure state."""
+
+    def __init__(self, name, func, interval, timeout=5, max_failures=3, cooldown=60, changes=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.changes = changes
+        self.timeout = timeout
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.subscribers = []
+        self.value = None
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.in_flight = None
+        self.expired = False
+        self.timer = None
+
+    def publish(self, value):
+        self.value = value
+        for callback in list(self.subscribers):
+            callback(value)
+
+
+class PollExecutor:
+    """Runs registered sources off the event loop and fans results back in."""
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self.sources = {}
+        self.qtile = None
+        self._pool = None
+
+    def register(self, name, func, interval, **kwargs):
+        if name not in self.sources:
+            self.sources[name] = Source(name, func, interval, **kwargs)
+        return self.sources[name]
+
+    def subscribe(self, qtile, name, callback):
+        source = self.sources[name]
+        source.subscribers.append(callback)
+        if source.value is not None:
+            callback(source.value)
+        self.qtile = qtile
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="qtile-poll")
+        if source.timer is None and source.in_flight is None:
+            self._poll(source)
+
+    def unsubscribe(self, name, callback):
+        source = self.sources.get(name)
+        if source is None or callback not in source.subscribers:
+            return
+        source.subscribers.remove(callback)
+        if not source.subscribers and source.timer is not None:
+            source.timer.cancel()
+            source.timer = None
+        if not any(s.subscribers for s in self.sources.values()):
+            self.shutdown()
+
+    def shutdown(self):
+        for source in self.sources.values():
+            if source.timer is not None:
+                source.timer.cancel()
+                source.timer = None
+        if self._pool is not None:
+            # Running polls can't be interrupted, don't wait for them.
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def poll_now(self, name):
+        source = self.sources[name]
+        if source.in_flight is None:
+            if source.timer is not None:
+                source.timer.cancel()
+            self._poll(source)
+
+    def stats(self):
+        return {
+            name: {"state": s.state, "failures": s.failures, "subscribers": len(s.subscribers)}
+            for name, s in self.sources.items()
+        }
+
+    def _schedule(self, source, delay):
+        source.timer = None
+        if self._pool is None or not source.subscribers:
+            return
+        source.timer = self.qtile.call_later(delay, self._poll, source)
+
+    def _schedule_next(self, source):
+        if source.changes is None:
+            self._schedule(source, source.interval)
+            return
+        source.timer = None
+        when = source.changes(time.time())
+        if when is None or self._pool is None or not source.subscribers:
+            return
+        source.timer = wakeup.scheduler.at(self.qtile, when, self._poll, source)
+
+    def _poll(self, source):
+        source.timer = None
+        if self._pool is None:
+            return
+
+        if source.state == OPEN:
+            remaining = source.opened_at + source.cooldown - time.monotonic()
+            if remaining > 0:
+                self._schedule(source, remaining)
+                return
+            source.state = HALF_OPEN
+
+        if source.in_flight is not None:
+            # Previous call is still hung in a worker, don't pile up another.
+            self._failed(source)
+            return
+
+        future = self._pool.submit(source.func)
+        source.in_flight = future
+        deadline = self.qtile.call_later(source.timeout, self._timed_out, source, future)
+        future.add_done_callback(
+            lambda f: self.qtile.call_soon_threadsafe(self._done, source, f, deadline)
+        )
+
+    def _timed_out(self, source, future):
+        if source.in_flight is not future:
+            return
+        # The worker keeps running but its result will be dropped. The source
+        # stays in flight so a hung command never occupies more than one worker.
+        logger.warning("poll source %s timed out after %ss", source.name, source.timeout)
+        source.expired = True
+        self._failed(source)
+
+    def _done(self, source, future, deadline):
+        deadline.cancel()
+        source.in_flight = None
+        if source.expired:
+            source.expired = False
+            return
+        if future.cancelled():
+            return
+        try:
+            value = future.result()
+        except Exception:
+            logger.exception("poll source %s failed", source.name)
+            self._failed(source)
+            return
+
+        source.failures = 0
+        source.state = CLOSED
+        source.publish(value)
+        self._schedule_next(source)
+
+    def _failed(self, source):
+        source.failures += 1
+        if source.state == HALF_OPEN or source.failures >= source.max_failures:
+            source.state = OPEN
+            source.opened_at = time.monotonic()
+            logger.warning("poll source %s disabled for %ss", source.name, source.cooldown)
+            self._schedule(source, source.cooldown)
+        else:
+            self._schedule(source, source.interval)
+
+
+executor = PollExecutor()
+
+
+def register(name, func, interval, **kwargs):
+    return executor.register(name, func, interval, **kwargs)
+
+
+class PolledText(base._TextBox):
+    """Text widget fed by a shared poll executor source."""
+
+    defaults = [
+        ("source", None, "Name of a source registered with poller.register()"),
+        ("default_text", "N/A", "Text shown until the first result arrives"),
+    ]
+
+    def __init__(self, **config):
+        base._TextBox.__init__(self, "", **config)
+        self.add_defaults(PolledText.defaults)
+        self.text = self.default_text
+
+    def timer_setup(self):
+        # A config reload re-imports this module before the old widgets are
+        # finalized, keep the executor this widget subscribed to.
+        self._executor = executor
+        self._executor.subscribe(self.qtile, self.source, self._on_result)
+
+    def _on_result(self, value):
+        self.update(str(value))
+
+    def button_press(self, x, y, button):
+        if button == 1 and not self.mouse_callbacks and getattr(self, "_executor", None):
+            self._executor.poll_now(self.source)
+        base._TextBox.button_press(self, x, y, button)
+
+    def finalize(self):
+        # The last unsubscribe shuts the executor's thread pool down.
+        if getattr(self, "_executor", None) is not None:
+            self._executor.unsubscribe(self.source, self._on_result)
+            self._executor = None
+        base._TextBox.finalize(self)
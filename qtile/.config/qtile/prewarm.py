@@ -0,0 +1,226 @@
+# Pre-warmed application pool.
+#
+# kitty and pcmanfm take a few hundred milliseconds to map their first window
+# when the machine is busy. An AppPool keeps a few instances started ahead of
+# time, parked unmapped in a hidden ScratchPad group. claim() moves a parked
+# window to the current group, which is only a reparent and a map, and then
+# starts a replacement in the background. When nothing is parked the app is
+# spawned cold, the same way lazy.spawn would do it.
+#
+# New windows are recognised by pid, like qtile's own DropDown does. After a
+# config reload the windows still sitting in the holding group are adopted
+# again by wm_class.
+#
+# hit_ms and miss_ms run from the key press until the window has focus and
+# the X server reports it viewable, so a hit includes the layout pass and the
+# map, not only the move out of the holding group.
+
+import collections
+import os
+import statistics
+import time
+
+from libqtile.log_utils import logger
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+# xcffib.xproto.MapState.Viewable
+MAP_VIEWABLE = 2
+
+
+class AppPool:
+    """Parked instances of one application.
+
+    ``cmd`` is what qtile.spawn() runs, ``wm_class`` identifies adopted
+    windows after a reload and ``size`` is how many to keep parked.
+    """
+
+    def __init__(self, name, cmd, wm_class, size=1):
+        self.name = name
+        self.cmd = cmd
+        self.wm_class = wm_class
+        self.size = size
+        self.parked = []
+        # pid -> spawn time, for processes whose window hasn't shown up yet
+        self.pending = {}
+        # pid -> claim time, for cold spawns after a miss
+        self.cold = {}
+        # Processes this pool started. Single instance apps like pcmanfm hand
+        # the new window to the process that is already running.
+        self.owned = set()
+        # window -> claim time, for claimed windows that aren't shown yet
+        self.shown = {}
+        self.hits = 0
+        self.misses = 0
+        self.hit_ms = collections.deque(maxlen=100)
+        self.miss_ms = collections.deque(maxlen=100)
+
+
+def rss_mb(pid):
+    try:
+        with open("/proc/%d/statm" % pid) as f:
+            return int(f.read().split()[1]) * PAGE_SIZE / 2 ** 20
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+
+def _median(values):
+    return round(statistics.median(values), 1) if values else None
+
+
+class Prewarmer:
+    def __init__(self, pools, group="prewarm", max_rss_mb=600, spawn_timeout=15.0):
+        self.pools = {pool.name: pool for pool in pools}
+        self.group = group
+        self.max_rss_mb = max_rss_mb
+        self.spawn_timeout = spawn_timeout
+        self.qtile = None
+        # wid -> pid of every window from an owned process, so a pid can be
+        # forgotten once its last window is gone.
+        self.pids = {}
+
+    def start(self, qtile):
+        """Adopt windows left in the holding group and fill every pool."""
+        self.qtile = qtile
+        holding = qtile.groups_map.get(self.group)
+        if holding is not None:
+            by_class = {pool.wm_class: pool for pool in self.pools.values()}
+            for win in list(holding.windows):
+                wm_class = win.get_wm_class() or ()
+                pool = next((by_class[c] for c in wm_class if c in by_class), None)
+                if pool is not None and win not in pool.parked:
+                    pool.parked.append(win)
+                    pid = win.get_pid()
+                    pool.owned.add(pid)
+                    self.pids[win.wid] = pid
+        self.refill()
+
+    def memory_mb(self):
+        pids = set()
+        for pool in self.pools.values():
+            pids.update(win.get_pid() for win in pool.parked)
+            pids.update(pool.pending)
+        return sum(rss_mb(pid) for pid in pids if pid)
+
+    def refill(self, *pools):
+        if self.qtile is None:
+            return
+        for pool in pools or self.pools.values():
+            while len(pool.parked) + len(pool.pending) < pool.size:
+                if self.memory_mb() >= self.max_rss_mb:
+                    logger.info("prewarm: memory cap of %d MB reached, not refilling %s",
+                                self.max_rss_mb, pool.name)
+                    return
+                pid = self.qtile.spawn(pool.cmd)
+                if not pid:
+                    return
+                pool.pending[pid] = time.monotonic()
+                pool.owned.add(pid)
+                self.qtile.call_later(self.spawn_timeout, self._expire, pool, pid)
+
+    def _expire(self, pool, pid):
+        # The process never mapped a window, don't wait for it forever.
+        if pool.pending.pop(pid, None) is not None:
+            logger.warning("prewarm: %s (pid %d) didn't map a window in %.0fs",
+                           pool.name, pid, self.spawn_timeout)
+
+    def claim(self, qtile, name):
+        """Show a parked instance of name on the current group, or spawn one."""
+        pool = self.pools[name]
+        if self.qtile is None:
+            self.start(qtile)
+        start = time.monotonic()
+        while pool.parked:
+            win = pool.parked.pop(0)
+            if win.group is None or win.group.name != self.group:
+                # Moved out of the holding group by hand.
+                continue
+            group = qtile.current_group
+            pool.hits += 1
+            pool.shown[win] = (start, pool.hit_ms)
+            win.togroup(group.name)
+            group.focus(win)
+            break
+        else:
+            pool.misses += 1
+            pid = qtile.spawn(pool.cmd)
+            if pid:
+                pool.cold[pid] = start
+                pool.owned.add(pid)
+                qtile.call_later(self.spawn_timeout, pool.cold.pop, pid, None)
+        qtile.call_soon(self.refill, pool)
+
+    def stats(self):
+        return {
+            name: {
+                "hits": pool.hits,
+                "misses": pool.misses,
+                "parked": len(pool.parked),
+                "hit_ms": _median(pool.hit_ms),
+                "miss_ms": _median(pool.miss_ms),
+            }
+            for name, pool in self.pools.items()
+        }
+
+    def _shown(self, pool, client, deadline):
+        if client not in pool.shown:
+            return
+        # A round trip to the X server: once the reply is back the server has
+        # handled the map request sent before it.
+        window = getattr(client, "window", None)
+        if window is not None and window.get_attributes().map_state != MAP_VIEWABLE:
+            if time.monotonic() < deadline:
+                self.qtile.call_later(0.005, self._shown, pool, client, deadline)
+            else:
+                del pool.shown[client]
+            return
+        start, samples = pool.shown.pop(client)
+        samples.append((time.monotonic() - start) * 1000)
+
+    # Hook handlers
+
+    def on_client_new(self, client):
+        pid = client.get_pid()
+        for pool in self.pools.values():
+            spawned = pid
+            if pid not in pool.cold and pid not in pool.pending:
+                if pid not in pool.owned or pool.wm_class not in (client.get_wm_class() or ()):
+                    continue
+                # Handed off to an earlier instance, count it as the oldest
+                # outstanding spawn. Windows someone is waiting for go first.
+                if pool.cold:
+                    spawned = next(iter(pool.cold))
+                elif pool.pending:
+                    spawned = next(iter(pool.pending))
+                else:
+                    continue
+            self.pids[client.wid] = pid
+            if spawned in pool.cold:
+                # Timed until it is shown, like a hit.
+                pool.shown[client] = (pool.cold.pop(spawned), pool.miss_ms)
+                return
+            del pool.pending[spawned]
+            client.togroup(self.group)
+            pool.parked.append(client)
+            return
+
+    def on_client_focus(self, client):
+        for pool in self.pools.values():
+            if client in pool.shown:
+                # Focus is set while qtile is still handling the claim, check
+                # the map once the requests have been flushed.
+                self.qtile.call_soon(self._shown, pool, client,
+                                     time.monotonic() + self.spawn_timeout)
+                return
+
+    def on_client_killed(self, client):
+        pid = self.pids.pop(client.wid, None)
+        if pid is not None and pid not in self.pids.values():
+            # The process's last window is gone, a new process may get its pid.
+            for pool in self.pools.values():
+                pool.owned.discard(pid)
+        for pool in self.pools.values():
+            pool.shown.pop(client, None)
+            if client in pool.parked:
+                pool.parked.remove(client)
+                if self.qtile is not None:
+                    self.qtile.call_soon(self.refill, pool)
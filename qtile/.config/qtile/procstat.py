@@ -0,0 +1,203 @@
+# One /proc sampler shared by every CPU and Memory widget.
+#
+# qtile's own CPU and Memory widgets each run their own timer and go through
+# psutil, so three bars means three reads of /proc/stat and /proc/meminfo per
+# tick. Here the files are kept open, re-read into a preallocated buffer once
+# per tick and the parsed values are pushed to every subscribed widget, so the
+# polling cost doesn't grow with the number of bars.
+
+from libqtile.widget import base
+
+MEASURES = {"G": 1024 ** 3, "M": 1024 ** 2, "K": 1024, "B": 1}
+
+
+class ProcFile:
+    """A /proc file that is opened once and re-read into the same buffer."""
+
+    def __init__(self, path, size=16384):
+        self.path = path
+        self.buf = bytearray(size)
+        self._file = None
+
+    def read(self):
+        if self._file is None:
+            self._file = open(self.path, "rb", buffering=0)
+        while True:
+            self._file.seek(0)
+            n = self._file.readinto(self.buf)
+            if n < len(self.buf):
+                return memoryview(self.buf)[:n]
+            # File outgrew the buffer (lots of cores), grow once and retry.
+            self.buf = bytearray(len(self.buf) * 2)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def parse_cpu(data):
+    """Return (busy, total) jiffies from the aggregate line of /proc/stat."""
+    line = bytes(data[:512]).split(b"\n", 1)[0]
+    fields = [int(v) for v in line.split()[1:]]
+    total = sum(fields[:8])  # guest time is already counted in user/nice
+    idle = fields[3] + fields[4]  # idle + iowait
+    return total - idle, total
+
+
+def parse_meminfo(data):
+    """Return /proc/meminfo as a dict of byte counts."""
+    values = {}
+    for line in bytes(data).splitlines():
+        key, _, rest = line.partition(b":")
+        values[key.decode()] = int(rest.split()[0]) * 1024
+    return values
+
+
+class ProcSampler:
+    """Samples /proc once per tick and fans the results out to subscribers."""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.stat = ProcFile("/proc/stat")
+        self.meminfo = ProcFile("/proc/meminfo")
+        self.subscribers = {"cpu": [], "memory": []}
+        self.values = {"cpu": None, "memory": None}
+        self.qtile = None
+        self._last_cpu = None
+        self._timer = None
+        self.reads = 0
+
+    def subscribe(self, qtile, kind, callback):
+        self.subscribers[kind].append(callback)
+        self.qtile = qtile
+        if self.values[kind] is not None:
+            callback(self.values[kind])
+        if self._timer is None:
+            self.tick()
+
+    def unsubscribe(self, kind, callback):
+        if callback in self.subscribers[kind]:
+            self.subscribers[kind].remove(callback)
+        if not any(self.subscribers.values()) and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            self.stat.close()
+            self.meminfo.close()
+
+    def tick(self):
+        if self.subscribers["cpu"]:
+            self._publish("cpu", self.sample_cpu())
+        if self.subscribers["memory"]:
+            self._publish("memory", self.sample_memory())
+        self._timer = self.qtile.call_later(self.interval, self.tick)
+
+    def sample_cpu(self):
+        self.reads += 1
+        busy, total = parse_cpu(self.stat.read())
+        last = self._last_cpu or (0, 0)
+        self._last_cpu = (busy, total)
+        if total == last[1]:
+            return {"load_percent": 0.0}
+        return {"load_percent": round(100 * (busy - last[0]) / (total - last[1]), 1)}
+
+    def sample_memory(self):
+        self.reads += 1
+        info = parse_meminfo(self.meminfo.read())
+        total = info["MemTotal"]
+        free = info["MemFree"]
+        # Same definition psutil uses on Linux, so the numbers match what
+        # qtile's Memory widget showed.
+        available = info.get("MemAvailable")
+        if available is None:
+            cached = info.get("Cached", 0) + info.get("SReclaimable", 0)
+            available = free + cached + info.get("Buffers", 0)
+        used = total - available
+        swap_total = info.get("SwapTotal", 0)
+        swap_free = info.get("SwapFree", 0)
+        return {
+            "MemUsed": used,
+            "MemTotal": total,
+            "MemFree": free,
+            "Buffers": info.get("Buffers", 0),
+            "Active": info.get("Active", 0),
+            "Inactive": info.get("Inactive", 0),
+            "Shmem": info.get("Shmem", 0),
+            "MemPercent": round(100 * used / total, 1),
+            "SwapTotal": swap_total,
+            "SwapFree": swap_free,
+            "SwapUsed": swap_total - swap_free,
+            "SwapPercent": round(100 * (swap_total - swap_free) / swap_total, 1) if swap_total else 0.0,
+        }
+
+    def _publish(self, kind, value):
+        self.values[kind] = value
+        for callback in list(self.subscribers[kind]):
+            callback(value)
+
+
+sampler = ProcSampler()
+
+
+class _SampledText(base._TextBox):
+    kind = None
+
+    def __init__(self, **config):
+        base._TextBox.__init__(self, "", **config)
+
+    def timer_setup(self):
+        # Keep the sampler this widget subscribed to: a config reload
+        # re-imports this module before the old widgets are finalized, and
+        # the module-level sampler is a new one by then.
+        self._sampler = sampler
+        self._sampler.subscribe(self.qtile, self.kind, self._on_sample)
+
+    def _on_sample(self, values):
+        self.update(self.format.format(**self.render(values)))
+
+    def render(self, values):
+        return values
+
+    def finalize(self):
+        if getattr(self, "_sampler", None) is not None:
+            self._sampler.unsubscribe(self.kind, self._on_sample)
+            self._sampler = None
+        base._TextBox.finalize(self)
+
+
+class CPU(_SampledText):
+    """Drop-in for widget.CPU fed by the shared sampler."""
+
+    kind = "cpu"
+    defaults = [
+        ("format", "CPU {load_percent}%", "CPU display format"),
+    ]
+
+    def __init__(self, **config):
+        _SampledText.__init__(self, **config)
+        self.add_defaults(CPU.defaults)
+
+
+class Memory(_SampledText):
+    """Drop-in for widget.Memory fed by the shared sampler."""
+
+    kind = "memory"
+    defaults = [
+        ("format", "{MemUsed:.0f}{mm}/{MemTotal:.0f}{mm}", "Formatting for field names."),
+        ("measure_mem", "M", "Measurement for Memory (G, M, K, B)"),
+        ("measure_swap", "M", "Measurement for Swap (G, M, K, B)"),
+    ]
+
+    def __init__(self, **config):
+        _SampledText.__init__(self, **config)
+        self.add_defaults(Memory.defaults)
+
+    def render(self, values):
+        mem = MEASURES[self.measure_mem]
+        swap = MEASURES[self.measure_swap]
+        scaled = dict(values, mm=self.measure_mem, ms=self.measure_swap)
+        for key in ("MemUsed", "MemTotal", "MemFree", "Buffers", "Active", "Inactive", "Shmem"):
+            scaled[key] = values[key] / mem
+        for key in ("SwapTotal", "SwapFree", "SwapUsed"):
+            scaled[key] = values[key] / swap
+        return scaled
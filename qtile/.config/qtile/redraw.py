@@ -0,0 +1,219 @@
+# Frame-coalesced bar redraws.
+#
+# A widget whose text changes without changing width redraws itself straight
+# away, and WindowName does that on every title change. A terminal or browser
+# updating its title many times a second therefore repaints and copies that
+# part of the bar to the screen each time. bar.draw() is already deferred to
+# the end of the current loop iteration, but it isn't rate limited either.
+#
+# Bar marks widgets and bars dirty instead of drawing them, and the scheduler
+# flushes each bar at most once per frame of the monitor it is on. Refresh
+# rates come from xrandr, and 60 Hz is assumed until they are known.
+#
+# A widget shared across bars draws its Mirrors on the other bars by copying
+# its own surface, so a mirror is only drawn after the widget it reflects has
+# been: while that widget waits for its bar's flush, its mirrors wait too and
+# are drawn right after it.
+# stats() counts requested against performed draws.
+
+import asyncio
+import re
+import time
+
+from libqtile import bar
+from libqtile.log_utils import logger
+
+DEFAULT_RATE = 60.0
+
+_OUTPUT = re.compile(r"^\S+ connected (?:primary )?\d+x\d+\+(\d+)\+(\d+)")
+_CURRENT_RATE = re.compile(r"([\d.]+)\*")
+
+
+def parse_rates(xrandr_output):
+    """{(x, y): refresh rate} for every active output in xrandr --current output."""
+    rates = {}
+    position = None
+    for line in xrandr_output.splitlines():
+        match = _OUTPUT.match(line)
+        if match:
+            position = (int(match.group(1)), int(match.group(2)))
+            continue
+        if not line.startswith(" "):
+            position = None
+            continue
+        if position is not None:
+            current = _CURRENT_RATE.search(line)
+            if current:
+                rates[position] = float(current.group(1))
+    return rates
+
+
+class FrameScheduler:
+    def __init__(self):
+        # bar -> {"bar": whole bar dirty, "widgets": [dirty widgets], ...}
+        self.state = {}
+        self.draws = {}
+        self.rates = {}
+        self.requested = 0
+        self.performed = 0
+        self._flushing = False
+        self._querying = False
+
+    def attach(self, b):
+        if b not in self.state:
+            self.state[b] = {"bar": False, "widgets": [], "last": 0.0, "handle": None}
+        for widget in b.widgets:
+            if widget not in self.draws:
+                self.draws[widget] = widget.draw
+                widget.draw = lambda widget=widget: self.request_widget(widget)
+        if not self.rates and not self._querying:
+            self.query_rates(b.qtile)
+
+    def detach(self, b):
+        state = self.state.pop(b, None)
+        if state is not None and state["handle"] is not None:
+            state["handle"].cancel()
+        for widget in b.widgets:
+            self.draws.pop(widget, None)
+
+    def query_rates(self, qtile):
+        async def query():
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    "xrandr", "--current",
+                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+                )
+                output, _ = await proc.communicate()
+            except OSError as e:
+                logger.warning("redraw: couldn't read refresh rates: %s", e)
+                return
+            finally:
+                self._querying = False
+            self.rates = parse_rates(output.decode(errors="replace"))
+            logger.info("redraw: refresh rates %s", self.rates)
+
+        self._querying = True
+        qtile.call_soon(asyncio.ensure_future, query())
+
+    def interval(self, b):
+        screen = b.screen
+        rate = self.rates.get((screen.x, screen.y), DEFAULT_RATE) if screen is not None else DEFAULT_RATE
+        return 1.0 / rate
+
+    def request_bar(self, b):
+        self.requested += 1
+        state = self.state.get(b)
+        if state is None:
+            return False
+        state["bar"] = True
+        self._schedule(b, state)
+        return True
+
+    def _pending(self, widget):
+        state = self.state.get(widget.bar)
+        return state is not None and (state["bar"] or widget in state["widgets"])
+
+    def request_widget(self, widget):
+        if self._flushing or widget.bar not in self.state:
+            self.draws[widget]()
+            return
+        self.requested += 1
+        reflects = getattr(widget, "reflects", None)
+        if reflects is not None and self._pending(reflects):
+            # Copying it now would show what it looked like before.
+            return
+        state = self.state[widget.bar]
+        if widget not in state["widgets"]:
+            state["widgets"].append(widget)
+        self._schedule(widget.bar, state)
+
+    def _schedule(self, b, state):
+        if state["handle"] is not None:
+            return
+        delay = state["last"] + self.interval(b) - time.monotonic()
+        if delay > 0:
+            state["handle"] = b.qtile.call_later(delay, self.flush, b)
+        else:
+            state["handle"] = b.qtile.call_soon(self.flush, b)
+
+    def flush(self, b):
+        state = self.state.get(b)
+        if state is None:
+            return
+        if state["handle"] is not None:
+            # Flushed early for a mirror, see below.
+            state["handle"].cancel()
+            state["handle"] = None
+        if state["bar"]:
+            # Mirrors copy the surface of the widget they reflect, so draw
+            # those widgets first if they are still waiting on another bar.
+            for widget in b.widgets:
+                reflects = getattr(widget, "reflects", None)
+                if reflects is not None and reflects.bar is not b and self._pending(reflects):
+                    self.flush(reflects.bar)
+        state["last"] = time.monotonic()
+        widgets, state["widgets"] = state["widgets"], []
+        self._flushing = True
+        try:
+            if state["bar"]:
+                state["bar"] = False
+                self.performed += 1
+                b.flush_draw()
+            else:
+                for widget in widgets:
+                    if getattr(widget, "configured", True):
+                        self.performed += 1
+                        self.draws[widget]()
+                        self._draw_mirrors(widget)
+        finally:
+            self._flushing = False
+
+    def _draw_mirrors(self, widget):
+        # What widget._draw_with_mirrors() does, draws[widget] skips it.
+        for mirror in getattr(widget, "_mirrors", ()):
+            if not mirror.configured:
+                continue
+            if mirror.length_type == bar.CALCULATED and mirror.bar is not widget.bar:
+                # The width may change, that bar flushes on its next frame.
+                mirror.bar.draw()
+            else:
+                self.performed += 1
+                mirror.draw()
+
+    def stats(self):
+        return {
+            "requested": self.requested,
+            "performed": self.performed,
+            "coalesced": self.requested - self.performed,
+            "rates": dict(self.rates),
+        }
+
+
+scheduler = FrameScheduler()
+
+
+class Bar(bar.Bar):
+    """bar.Bar that draws through the frame scheduler."""
+
+    _scheduler = None
+
+    def _configure(self, *args, **kwargs):
+        bar.Bar._configure(self, *args, **kwargs)
+        # A config reload re-imports this module before the old bars are
+        # finalized, keep the scheduler this bar is attached to.
+        self._scheduler = scheduler
+        self._scheduler.attach(self)
+
+    def draw(self):
+        if self._scheduler is None or not self._scheduler.request_bar(self):
+            bar.Bar.draw(self)
+
+    def flush_draw(self):
+        # Draw now, bar.Bar.draw() would only queue it for later.
+        self._actual_draw()
+
+    def finalize(self):
+        if self._scheduler is not None:
+            self._scheduler.detach(self)
+            self._scheduler = None
+        bar.Bar.finalize(self)
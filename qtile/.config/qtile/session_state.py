@@ -0,0 +1,370 @@
+# Group, window and layout state that survives restarts and crashes.
+#
+# When qtile comes back up every window goes through placement from scratch
+# and lands in whatever group is current, each group starts on its first
+# layout and MonadTall ratios are back to the default. SessionState keeps a
+# compact binary snapshot of which group every window was in, whether it was
+# floating, minimized or focused there, and each group's layout and layout
+# ratios, and puts all of that back in one pass at startup.
+#
+# Windows are recognised by their X window id first, which stays the same
+# when only qtile restarts, then by WM_CLASS and WM_WINDOW_ROLE, using the
+# title to pick between several windows of the same class. Entries nothing
+# matched at startup wait `pending_timeout` seconds for the application to
+# open its window again, e.g. when a session manager restarts it.
+#
+# Window class, role and title are read when a window appears and updated
+# from hooks, so writing a snapshot asks the X server for nothing. Changes
+# only schedule a write, at most one every `interval` seconds, and the file
+# is replaced atomically so a crash mid-write keeps the previous snapshot.
+# Layout ratios have no hook, they are saved with the next write and at
+# shutdown. Windows in groups without a label (the ScratchPads) are not
+# saved, like in navigation.GroupIndex.
+#
+# Format, all little endian:
+#
+#   header   b"QSTATE" version(u8) saved(f64) groups(u16) windows(u32)
+#   group    name length(u8) current layout(u8) ratios(u8) name
+#            then layout index(u8) ratio(f32) per ratio
+#   window   wid(u32) group(u16) flags(u8) length(u16)
+#            then instance, class, role and title, \0 separated
+#
+# bench/session_state.py reports snapshot size and restore time for large
+# window counts.
+
+import collections
+import os
+import struct
+import time
+
+from libqtile import qtile
+from libqtile.log_utils import logger
+
+from batch import deferred_layout
+
+MAGIC = b"QSTATE"
+VERSION = 1
+STATE_PATH = os.path.expanduser("~/.cache/qtile/session.qstate")
+
+FLOATING, MINIMIZED, FOCUSED = 1, 2, 4
+
+_HEADER = struct.Struct("<dHI")
+_GROUP = struct.Struct("<BBB")
+_RATIO = struct.Struct("<Bf")
+_WINDOW = struct.Struct("<IHBH")
+# Titles change all the time, only the start is kept to tell windows apart.
+_MAX_TITLE = 64
+
+GroupState = collections.namedtuple("GroupState", "name layout ratios")
+WindowState = collections.namedtuple("WindowState", "wid group flags instance wm_class role title")
+
+
+class StateError(Exception):
+    pass
+
+
+def _text(value, limit=255):
+    return (value or "").replace("\0", " ").encode("utf-8", "replace")[:limit]
+
+
+def _identity(window):
+    """(instance, class, role) of a window, read from the X server."""
+    wm_class = window.get_wm_class() or []
+    instance = wm_class[0] if wm_class else ""
+    cls = wm_class[1] if len(wm_class) > 1 else ""
+    get_wm_role = getattr(window, "get_wm_role", None)
+    role = (get_wm_role() if get_wm_role is not None else None) or ""
+    return instance, cls, role
+
+
+def encode_group(name, layout, ratios):
+    name = _text(name)
+    return b"".join(
+        [_GROUP.pack(len(name), layout, len(ratios)), name]
+        + [_RATIO.pack(index, ratio) for index, ratio in ratios]
+    )
+
+
+def encode_window(wid, group, flags, strings):
+    return _WINDOW.pack(wid, group, flags, len(strings)) + strings
+
+
+def encode_strings(instance, wm_class, role, title):
+    return b"\0".join((_text(instance), _text(wm_class), _text(role), _text(title, _MAX_TITLE)))
+
+
+def encode(groups, windows, saved=None):
+    """A snapshot of groups [(name, layout, ratios)] and windows [(wid, group, flags, strings)]."""
+    parts = [MAGIC, bytes([VERSION]), _HEADER.pack(saved or time.time(), len(groups), len(windows))]
+    parts.extend(encode_group(*group) for group in groups)
+    parts.extend(encode_window(*window) for window in windows)
+    return b"".join(parts)
+
+
+def decode(data):
+    """(saved, [GroupState], [WindowState]) from a snapshot."""
+    if data[:len(MAGIC)] != MAGIC or len(data) < len(MAGIC) + 1 + _HEADER.size:
+        raise StateError("not a session snapshot")
+    if data[len(MAGIC)] != VERSION:
+        raise StateError("snapshot version %d, expected %d" % (data[len(MAGIC)], VERSION))
+    offset = len(MAGIC) + 1
+    saved, group_count, window_count = _HEADER.unpack_from(data, offset)
+    offset += _HEADER.size
+    try:
+        groups = []
+        for _ in range(group_count):
+            length, layout, ratio_count = _GROUP.unpack_from(data, offset)
+            offset += _GROUP.size
+            name = data[offset:offset + length].decode("utf-8", "replace")
+            offset += length
+            ratios = []
+            for _ in range(ratio_count):
+                index, ratio = _RATIO.unpack_from(data, offset)
+                # Stored as f32, 0.55 would come back as 0.55000001.
+                ratios.append((index, round(ratio, 4)))
+                offset += _RATIO.size
+            groups.append(GroupState(name, layout, ratios))
+        windows = []
+        for _ in range(window_count):
+            wid, group, flags, length = _WINDOW.unpack_from(data, offset)
+            offset += _WINDOW.size
+            strings = data[offset:offset + length].decode("utf-8", "replace").split("\0")
+            offset += length
+            strings += [""] * (4 - len(strings))
+            windows.append(WindowState(wid, groups[group].name, flags, *strings[:4]))
+    except (struct.error, IndexError):
+        raise StateError("snapshot is truncated")
+    if offset > len(data):
+        raise StateError("snapshot is truncated")
+    return saved, groups, windows
+
+
+def read(path=STATE_PATH):
+    with open(path, "rb") as f:
+        return decode(f.read())
+
+
+class Matcher:
+    """Pairs saved windows with windows that exist now."""
+
+    def __init__(self, windows):
+        self.by_wid = {}
+        # (class, role) -> {wid: saved window}, in snapshot order
+        self.by_class = collections.defaultdict(dict)
+        # (class, role, title) -> saved windows, claimed ones are skipped
+        self.by_title = collections.defaultdict(list)
+        for state in windows:
+            self.by_wid[state.wid] = state
+            self.by_class[(state.wm_class, state.role)][state.wid] = state
+            self.by_title[(state.wm_class, state.role, state.title)].append(state)
+        # Popped from the end, so the first saved window comes out first.
+        for states in self.by_title.values():
+            states.reverse()
+
+    def __len__(self):
+        return len(self.by_wid)
+
+    def claim(self, wid, instance, wm_class, role, title):
+        """The saved window for this one, or None. Each is handed out once."""
+        state = self.by_wid.get(wid)
+        # X reuses ids after a restart of the server, the class has to agree.
+        if state is None or state.wm_class != wm_class or state.role != role:
+            state = None
+            title = _text(title, _MAX_TITLE).decode("utf-8", "replace")
+            same_title = self.by_title.get((wm_class, role, title), [])
+            while same_title and state is None:
+                candidate = same_title.pop()
+                if candidate.wid in self.by_wid:
+                    state = candidate
+            if state is None:
+                same_class = self.by_class.get((wm_class, role))
+                if not same_class:
+                    return None
+                state = next(iter(same_class.values()))
+        del self.by_wid[state.wid]
+        key = (state.wm_class, state.role)
+        del self.by_class[key][state.wid]
+        if not self.by_class[key]:
+            del self.by_class[key]
+        return state
+
+
+class SessionState:
+    def __init__(self, path=STATE_PATH, interval=2.0, pending_timeout=60):
+        self.path = path
+        self.interval = interval
+        self.pending_timeout = pending_timeout
+        # wid -> encoded instance, class, role and title
+        self.strings = {}
+        self.identities = {}
+        self.matcher = None
+        self._write_pending = False
+        self.writes = 0
+        self.write_ms = 0.0
+        self.size = 0
+        self.restore_ms = None
+        self.restored = 0
+        self.restored_late = 0
+
+    def _windows(self):
+        for group in qtile.groups:
+            if not group.label:
+                continue
+            for window in group.windows:
+                yield group, window
+
+    def _remember(self, window):
+        identity = _identity(window)
+        self.identities[window.wid] = identity
+        self.strings[window.wid] = encode_strings(*identity, window.name)
+        return identity
+
+    def snapshot(self):
+        """The current state as snapshot bytes."""
+        groups = []
+        group_index = {}
+        for group in qtile.groups:
+            if not group.label:
+                continue
+            ratios = [
+                (i, layout.ratio) for i, layout in enumerate(group.layouts)
+                if isinstance(getattr(layout, "ratio", None), float)
+            ]
+            group_index[group.name] = len(groups)
+            groups.append((group.name, group.current_layout, ratios))
+        windows = []
+        for group, window in self._windows():
+            if window.wid not in self.strings:
+                self._remember(window)
+            flags = 0
+            if window.floating:
+                flags |= FLOATING
+            if getattr(window, "minimized", False):
+                flags |= MINIMIZED
+            if window is group.current_window:
+                flags |= FOCUSED
+            windows.append((window.wid, group_index[group.name], flags, self.strings[window.wid]))
+        return encode(groups, windows)
+
+    def write(self):
+        self._write_pending = False
+        # Until restore() has run, the file still holds the last session.
+        if not getattr(qtile, "_session_state_restored", False):
+            return
+        start = time.perf_counter()
+        data = self.snapshot()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+        self.writes += 1
+        self.write_ms += (time.perf_counter() - start) * 1000
+        self.size = len(data)
+
+    def changed(self, *args):
+        if self._write_pending:
+            return
+        self._write_pending = True
+        qtile.call_later(self.interval, self.write)
+
+    # Restoring
+
+    def restore(self):
+        """Put windows, layouts and ratios back the way the snapshot has them."""
+        start = time.perf_counter()
+        # Marked on qtile, a config reload must not restore a second time.
+        qtile._session_state_restored = True
+        try:
+            _, groups, windows = read(self.path)
+        except FileNotFoundError:
+            return
+        except (OSError, StateError) as e:
+            logger.warning("session state: can't restore from %s: %s", self.path, e)
+            return
+
+        self.matcher = Matcher(windows)
+        moves = []
+        for _, window in self._windows():
+            # Windows that were there before the hooks were are read now.
+            identity = self.identities.get(window.wid) or self._remember(window)
+            state = self.matcher.claim(window.wid, *identity, window.name or "")
+            if state is not None and state.group in qtile.groups_map:
+                moves.append((window, state))
+
+        touched = [g for g in qtile.groups if g.label]
+        with qtile.core.masked(), deferred_layout(*touched):
+            for state in groups:
+                group = qtile.groups_map.get(state.name)
+                if group is None:
+                    continue
+                for index, ratio in state.ratios:
+                    if index < len(group.layouts):
+                        group.layouts[index].ratio = ratio
+                if state.layout < len(group.layouts) and state.layout != group.current_layout:
+                    group.use_layout(state.layout)
+            for window, state in moves:
+                self._apply(window, state)
+
+        self.restored = len(moves)
+        self.restore_ms = (time.perf_counter() - start) * 1000
+        logger.info("session state: restored %d windows in %.1f ms, %d still expected",
+                    self.restored, self.restore_ms, len(self.matcher))
+        if self.matcher:
+            qtile.call_later(self.pending_timeout, self._expire)
+
+    def _apply(self, window, state):
+        if window.group is None or window.group.name != state.group:
+            window.togroup(state.group, switch_group=False)
+        if bool(state.flags & FLOATING) != window.floating:
+            window.floating = bool(state.flags & FLOATING)
+        if state.flags & MINIMIZED and not getattr(window, "minimized", True):
+            window.minimized = True
+        if state.flags & FOCUSED and window.group is not None:
+            window.group.focus(window, warp=False)
+
+    def _expire(self):
+        self.matcher = None
+
+    def stats(self):
+        return {
+            "windows": len(self.strings),
+            "bytes": self.size,
+            "writes": self.writes,
+            "write_ms_avg": round(self.write_ms / self.writes, 3) if self.writes else None,
+            "restored": self.restored,
+            "restored_late": self.restored_late,
+            "restore_ms": round(self.restore_ms, 3) if self.restore_ms is not None else None,
+        }
+
+    # Hook handlers
+
+    def on_client_new(self, client):
+        identity = self._remember(client)
+        # Already placed by another hook, e.g. a prewarmed window.
+        if not self.matcher or client.group is not None:
+            return
+        state = self.matcher.claim(client.wid, *identity, client.name or "")
+        if state is None or state.group not in qtile.groups_map:
+            return
+        client.togroup(state.group)
+        self.restored_late += 1
+        # Float and minimize once the window is managed in its group.
+        qtile.call_soon(self._apply, client, state)
+
+    def on_client_killed(self, client):
+        self.strings.pop(client.wid, None)
+        self.identities.pop(client.wid, None)
+        self.changed()
+
+    def on_client_name_updated(self, client):
+        identity = self.identities.get(client.wid)
+        if identity is None:
+            return
+        strings = encode_strings(*identity, client.name)
+        if strings != self.strings[client.wid]:
+            self.strings[client.wid] = strings
+            self.changed()
+
+
+state = SessionState()
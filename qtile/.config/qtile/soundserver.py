@@ -0,0 +1,219 @@
+# Event-driven volume for the bar.
+#
+# widget.Volume runs amixer every update_interval (0.2s) to find out whether
+# anything changed. VolumeMonitor instead keeps one subscription to the sound
+# server's change events ("pactl subscribe", which works for PulseAudio and
+# PipeWire) and only reads the volume when a sink or the default sink
+# changed. Bursts, like holding a volume key, are read once. While idle it
+# costs nothing.
+#
+# If the event stream can't be opened or drops, the monitor polls every
+# poll_interval seconds and tries to subscribe again with exponential backoff.
+# Without pactl at all the widget just keeps its last value, the failing
+# read is logged once.
+#
+# The event source is pluggable: SocketEvents reads the same line format
+# from a unix socket, so the monitor can be driven by a local fake server,
+# see bench/volume_events.py.
+
+import asyncio
+import re
+
+from libqtile.log_utils import logger
+from libqtile.widget import Volume as _Volume
+
+# "Event 'change' on sink #53", "Event 'change' on server #-1"
+_RELEVANT = re.compile(r"on (sink|server)( #|$)")
+_PERCENT = re.compile(r"(\d+)%")
+
+
+class PactlEvents:
+    """Change events from a long running "pactl subscribe"."""
+
+    def __init__(self, command=("pactl", "subscribe")):
+        self.command = command
+
+    async def lines(self):
+        proc = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            async for line in proc.stdout:
+                yield line.decode(errors="replace")
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+
+
+class SocketEvents:
+    """The same events, one per line, from a unix socket."""
+
+    def __init__(self, path):
+        self.path = path
+
+    async def lines(self):
+        reader, writer = await asyncio.open_unix_connection(self.path)
+        try:
+            async for line in reader:
+                yield line.decode(errors="replace")
+        finally:
+            writer.close()
+
+
+async def _output(*command):
+    proc = await asyncio.create_subprocess_exec(
+        *command,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    out, _ = await proc.communicate()
+    if proc.returncode != 0:
+        raise OSError("%s exited %d" % (command[0], proc.returncode))
+    return out.decode(errors="replace")
+
+
+async def read_pactl():
+    """(volume percent, muted) of the default sink."""
+    volume, mute = await asyncio.gather(
+        _output("pactl", "get-sink-volume", "@DEFAULT_SINK@"),
+        _output("pactl", "get-sink-mute", "@DEFAULT_SINK@"),
+    )
+    percents = [int(p) for p in _PERCENT.findall(volume)]
+    return (max(percents) if percents else -1), "yes" in mute
+
+
+class VolumeMonitor:
+    def __init__(self, events=None, read=read_pactl, poll_interval=5.0, debounce=0.02,
+                 max_backoff=60.0):
+        self.events = events if events is not None else PactlEvents()
+        self.read = read
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.max_backoff = max_backoff
+        self.subscribers = []
+        self.value = None
+        self.mode = "stopped"
+        self.events_seen = 0
+        self.reads = 0
+        self._task = None
+        self._pending = None
+        self._read_failed = False
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+        if self.value is not None:
+            callback(self.value)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+        if not self.subscribers and self._task is not None:
+            # Cancelling the task closes the event stream, which kills the
+            # pactl subscribe child.
+            self._task.cancel()
+            self._task = None
+            if self._pending is not None:
+                self._pending.cancel()
+                self._pending = None
+            self.mode = "stopped"
+
+    def refresh(self):
+        """Read the volume soon, coalescing with any other pending request."""
+        if self._pending is None:
+            loop = asyncio.get_running_loop()
+            self._pending = loop.call_later(self.debounce, self._read_soon)
+
+    def _read_soon(self):
+        self._pending = None
+        asyncio.get_running_loop().create_task(self._refresh())
+
+    async def _refresh(self):
+        self.reads += 1
+        try:
+            value = await self.read()
+        except OSError as e:
+            # Polling would repeat this every few seconds.
+            if not self._read_failed:
+                self._read_failed = True
+                logger.warning("volume: couldn't read the volume: %s", e)
+            return
+        self._read_failed = False
+        if value != self.value:
+            self.value = value
+            for callback in list(self.subscribers):
+                callback(value)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        backoff = 1.0
+        while True:
+            await self._refresh()
+            started = loop.time()
+            self.mode = "events"
+            lines = self.events.lines()
+            try:
+                async for line in lines:
+                    self.events_seen += 1
+                    if _RELEVANT.search(line):
+                        self.refresh()
+                reason = "event stream closed"
+            except OSError as e:
+                reason = str(e)
+            finally:
+                # Close it now rather than whenever the generator is
+                # collected, also when the task is cancelled.
+                await lines.aclose()
+            if loop.time() - started > self.max_backoff:
+                backoff = 1.0
+            logger.info("volume: %s, polling for %.0fs", reason, backoff)
+            self.mode = "polling"
+            deadline = loop.time() + backoff
+            while True:
+                await asyncio.sleep(min(self.poll_interval, max(deadline - loop.time(), 0)))
+                if loop.time() >= deadline:
+                    break
+                await self._refresh()
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def stats(self):
+        return {"mode": self.mode, "events": self.events_seen, "reads": self.reads}
+
+
+monitor = VolumeMonitor()
+
+
+class Volume(_Volume):
+    """widget.Volume fed by the shared VolumeMonitor instead of polling."""
+
+    def timer_setup(self):
+        if self.theme_path:
+            self.setup_images()
+        # A config reload re-imports this module before the old widgets are
+        # finalized, keep the monitor this widget subscribed to.
+        self._monitor = monitor
+        self._monitor.subscribe(self._on_volume)
+
+    def _on_volume(self, value):
+        volume, muted = value
+        if volume == self.volume and muted == self.is_mute:
+            return
+        self.volume, self.is_mute = volume, muted
+        self._update_drawer()
+        self.bar.draw()
+
+    def update(self):
+        if getattr(self, "_monitor", None) is not None:
+            self._monitor.refresh()
+
+    def finalize(self):
+        if getattr(self, "_monitor", None) is not None:
+            self._monitor.unsubscribe(self._on_volume)
+            self._monitor = None
+        _Volume.finalize(self)
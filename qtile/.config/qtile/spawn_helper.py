@@ -0,0 +1,43 @@
+# Resident spawn helper, started by spawner.py.
+#
+# Runs as "python -S -E spawn_helper.py FD" so it only has the interpreter
+# core in memory. Each message on the socket FD is one command: the absolute
+# path of the program followed by its argv, NUL separated. Commands are
+# started with posix_spawn in a new session with std{in,out,err} on
+# /dev/null, the same way qtile.spawn does it. The helper exits when qtile
+# closes its end of the socket.
+
+import os
+import signal
+import socket
+import sys
+
+
+def main(fd):
+    # Keep the socket out of the programs we start.
+    os.set_inheritable(fd, False)
+    sock = socket.socket(fileno=fd)
+    # Children are reaped by the kernel. posix_spawn resets SIGCHLD for the
+    # programs we start so shells and the like still see their own children.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    env = dict(os.environ)
+    null = os.open(os.devnull, os.O_RDWR)
+    file_actions = [(os.POSIX_SPAWN_DUP2, null, target) for target in (0, 1, 2)]
+    while True:
+        try:
+            message = sock.recv(65536)
+        except InterruptedError:
+            continue
+        if not message:
+            return 0
+        path, *argv = message.split(b"\0")
+        try:
+            os.posix_spawn(path, argv, env, file_actions=file_actions,
+                           setsid=True, setsigdef=(signal.SIGCHLD, signal.SIGINT))
+        except OSError as e:
+            os.write(2, b"spawn_helper: %s: %s\n" % (path, str(e).encode()))
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1])))
@@ -0,0 +1,123 @@
+# Spawning keybinding commands through a resident helper.
+#
+# lazy.spawn() splits the command line and searches PATH on every keypress,
+# then starts the program from the qtile process itself, with its large heap
+# of cairo and pango state. Spawner starts spawn_helper.py once, a bare
+# interpreter that talks to qtile over a socketpair, and command() parses and
+# resolves each keybinding's argv when the config is loaded. A keypress is
+# then a single send() on the socket.
+#
+# If the helper has died it is started again, and if that fails too the
+# command goes through qtile.spawn() as before.
+
+import os
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+
+from libqtile.lazy import lazy
+from libqtile.log_utils import logger
+
+HELPER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "spawn_helper.py")
+
+
+class Command:
+    """A command line parsed once, ready to send to the helper."""
+
+    def __init__(self, cmd, shell=False):
+        self.cmd = cmd
+        args = shlex.split(cmd) if isinstance(cmd, str) else list(cmd)
+        if shell:
+            line = cmd if isinstance(cmd, str) else subprocess.list2cmdline(args)
+            args = ["/bin/sh", "-c", line]
+        self.args = args
+        self._payload = None
+
+    @property
+    def payload(self):
+        # Resolved on first use, the program may be installed after login.
+        if self._payload is None:
+            path = shutil.which(self.args[0])
+            if path is None:
+                return None
+            self._payload = b"\0".join(
+                os.fsencode(arg) for arg in [path, *self.args]
+            )
+        return self._payload
+
+
+class Spawner:
+    def __init__(self, python=sys.executable):
+        self.python = python
+        self.sock = None
+        self.process = None
+        self.sent = 0
+        self.fallbacks = 0
+
+    def start(self):
+        if self.sock is not None:
+            return
+        ours, theirs = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            self.process = subprocess.Popen(
+                [self.python, "-S", "-E", HELPER, str(theirs.fileno())],
+                pass_fds=[theirs.fileno()],
+                stdin=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        except OSError as e:
+            logger.warning("spawner: couldn't start the helper: %s", e)
+            ours.close()
+            return
+        finally:
+            theirs.close()
+        self.sock = ours
+
+    def stop(self):
+        if self.sock is not None:
+            # The helper exits when its end of the socket reads EOF.
+            self.sock.close()
+            self.sock = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+
+    def _send(self, payload):
+        self.sock.send(payload)
+        self.sent += 1
+
+    def run(self, qtile, command):
+        payload = command.payload
+        if payload is None:
+            # Let qtile log that the program wasn't found.
+            qtile.spawn(command.args)
+            return
+        for attempt in range(2):
+            if self.sock is None:
+                self.start()
+            if self.sock is None:
+                break
+            try:
+                self._send(payload)
+                return
+            except OSError:
+                self.sock.close()
+                self.sock = None
+                if self.process is not None:
+                    self.process.poll()
+                    self.process = None
+        self.fallbacks += 1
+        qtile.spawn(command.args)
+
+    def command(self, cmd, shell=False):
+        """Keybinding action that spawns cmd, like lazy.spawn(cmd, shell)."""
+        return lazy.function(self.run, Command(cmd, shell))
+
+
+spawner = Spawner()
+spawn = spawner.command
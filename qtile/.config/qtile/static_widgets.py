@@ -0,0 +1,142 @@
+# Pre-rendered static bar segments.
+#
+# The '|' separators never change, yet every bar redraw lays them out with
+# pango and paints them again, on every screen. StaticText renders its text
+# once into an image surface and later draws just paint that surface. The
+# surfaces live in an LRU cache keyed by everything that changes the pixels:
+# text, font, size, shadow, colours, padding and size. Separators with the
+# same look share one entry across bars. qtile sets font sizes in pixels, so
+# DPI doesn't change the rendering and isn't part of the key.
+#
+# A theme or font change produces a new key. The whole cache is also dropped
+# on theme.apply() so surfaces for the old palette don't linger.
+#
+# Whether painting a cached surface actually beats laying out a one-character
+# TextBox hasn't been measured yet. bench/static_text.py compares the two
+# where libqtile, cairo and pango are installed, and the cache logs its draw
+# times for hits and misses at shutdown.
+
+import collections
+import time
+
+from libqtile import widget
+
+import theme
+
+
+class SurfaceCache:
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Time spent in StaticText.draw(), split by cache outcome.
+        self.hit_ms = 0.0
+        self.miss_ms = 0.0
+
+    def get(self, key):
+        surface = self.entries.get(key)
+        if surface is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return surface
+
+    def put(self, key, surface):
+        self.entries[key] = surface
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            _, old = self.entries.popitem(last=False)
+            old.finish()
+
+    def clear(self, *args):
+        for surface in self.entries.values():
+            surface.finish()
+        self.entries.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ms_avg": round(self.hit_ms / self.hits, 3) if self.hits else None,
+            "miss_ms_avg": round(self.miss_ms / self.misses, 3) if self.misses else None,
+        }
+
+
+cache = SurfaceCache()
+theme.on_apply(cache.clear)
+
+
+def _colour_key(colour):
+    return tuple(colour) if isinstance(colour, list) else colour
+
+
+class StaticText(widget.TextBox):
+    """TextBox for text that doesn't change, drawn from a cached surface."""
+
+    def cache_key(self):
+        return (
+            self.text, self.font, self.fontsize, _colour_key(self.fontshadow),
+            _colour_key(self.foreground), _colour_key(self.background or self.bar.background),
+            self.actual_padding, self.width, self.bar.height,
+        )
+
+    def _render(self):
+        # cairo is only needed once the bar is up, not to load the config.
+        import cairocffi
+        from libqtile import pangocffi
+
+        surface = cairocffi.ImageSurface(cairocffi.FORMAT_ARGB32, self.width, self.bar.height)
+        ctx = pangocffi.patch_cairo_context(cairocffi.Context(surface))
+        ctx.set_operator(cairocffi.OPERATOR_SOURCE)
+        self.drawer.set_source_rgb(self.background or self.bar.background, ctx=ctx)
+        ctx.paint()
+        ctx.set_operator(cairocffi.OPERATOR_OVER)
+        # TextLayout always draws on its drawer's context.
+        saved, self.drawer.ctx = self.drawer.ctx, ctx
+        try:
+            self.layout.draw(
+                self.actual_padding or 0,
+                int(self.bar.height / 2.0 - self.layout.height / 2.0) + 1,
+            )
+        finally:
+            self.drawer.ctx = saved
+        surface.flush()
+        return surface
+
+    def draw(self):
+        if not self.can_draw():
+            return
+        if not self.bar.horizontal or getattr(self, "_should_scroll", False):
+            widget.TextBox.draw(self)
+            return
+
+        import cairocffi
+
+        start = time.perf_counter()
+        key = self.cache_key()
+        surface = cache.get(key)
+        hit = surface is not None
+        if not hit:
+            surface = self._render()
+            cache.put(key, surface)
+
+        if self.drawer.ctx is None:
+            self.drawer._reset_surface()
+        self.drawer.clear_rect(0, 0, self.width, self.bar.height)
+        ctx = self.drawer.ctx
+        ctx.save()
+        ctx.set_operator(cairocffi.OPERATOR_SOURCE)
+        ctx.set_source_surface(surface, 0, 0)
+        ctx.rectangle(0, 0, self.width, self.bar.height)
+        ctx.fill()
+        ctx.restore()
+        self.draw_at_default_position()
+
+        elapsed = (time.perf_counter() - start) * 1000
+        if hit:
+            cache.hit_ms += elapsed
+        else:
+            cache.miss_ms += elapsed
@@ -0,0 +1,207 @@
+# Autostart supervisor.
+#
+# Replaces the blocking autostart.sh call. Services are declared in config.py
+# with their dependencies and a readiness check, and started from the qtile
+# event loop: anything whose dependencies are ready starts right away, in
+# parallel with everything else. Long-running services that are already
+# running (e.g. after a qtile restart) are adopted instead of launched twice,
+# crashed ones are restarted with exponential backoff, and a startup timeline
+# is logged once everything has settled.
+
+import asyncio
+import os
+import time
+
+from libqtile.log_utils import logger
+
+
+class Service:
+    """A program to start at login.
+
+    oneshot services are ready once they exit successfully (xrandr, nitrogen).
+    Long-running services are ready once ``ready`` returns true, or right
+    after they start if no check is given. ``replace`` kills an already
+    running copy first instead of adopting it.
+
+    ``requires`` services must have succeeded, the service is skipped if one
+    of them failed. ``after`` services only order the start: the service
+    waits until they are ready or have failed and then starts either way,
+    like the old autostart.sh did.
+    """
+
+    def __init__(self, name, argv, requires=(), after=(), oneshot=False, ready=None,
+                 replace=False, restart=True, condition=None, process_name=None):
+        self.name = name
+        self.argv = [os.path.expanduser(arg) for arg in argv]
+        self.requires = tuple(requires)
+        self.after = tuple(after)
+        self.oneshot = oneshot
+        self.ready_check = ready
+        self.replace = replace
+        self.restart = restart and not oneshot
+        self.condition = condition
+        self.process_name = process_name or os.path.basename(self.argv[0])
+        self.process = None
+        self.ready = asyncio.Event()
+        self.failed = False
+        self.restarts = 0
+
+
+def running_pids(process_name):
+    """Pids of running processes whose comm is process_name."""
+    pids = []
+    # comm is truncated to 15 characters by the kernel
+    wanted = process_name[:15]
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open("/proc/%s/comm" % entry) as f:
+                if f.read().strip() == wanted:
+                    pids.append(int(entry))
+        except OSError:
+            continue
+    return pids
+
+
+def ready_after(seconds):
+    """Readiness check: the process stayed up for this long."""
+    async def check(service):
+        await asyncio.sleep(seconds)
+        return service.process is None or service.process.returncode is None
+    return check
+
+
+def ready_when_path_exists(path):
+    """Readiness check: a file or socket showed up (e.g. mpd's socket)."""
+    path = os.path.expanduser(path)
+
+    async def check(service, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not os.path.exists(path):
+            if time.monotonic() > deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+    return check
+
+
+class Supervisor:
+    def __init__(self, services, backoff=1.0, max_backoff=60.0, max_restarts=5, stable_after=60.0):
+        self.services = {service.name: service for service in services}
+        for service in services:
+            for dep in service.requires + service.after:
+                if dep not in self.services:
+                    raise ValueError("%s requires unknown service %s" % (service.name, dep))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_restarts = max_restarts
+        self.stable_after = stable_after
+        self.timeline = []
+        self._start = None
+        self._tasks = []
+
+    def _mark(self, service, event):
+        self.timeline.append((time.monotonic() - self._start, service.name, event))
+
+    def start(self):
+        """Kick off every service on the running event loop and return at once."""
+        self._start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._run(s)) for s in self.services.values()]
+        self._tasks.append(loop.create_task(self._report()))
+
+    async def _report(self):
+        # Long-running services stay supervised, so wait for readiness rather
+        # than for their tasks to finish.
+        await asyncio.gather(*(s.ready.wait() for s in self.services.values()))
+        lines = ["%7.3fs  %-16s %s" % entry for entry in sorted(self.timeline)]
+        logger.info("autostart timeline:\n%s", "\n".join(lines))
+
+    async def _run(self, service):
+        for dep in service.requires:
+            dep_service = self.services[dep]
+            await dep_service.ready.wait()
+            if dep_service.failed:
+                self._mark(service, "skipped, %s failed" % dep)
+                service.failed = True
+                service.ready.set()
+                return
+        for dep in service.after:
+            await self.services[dep].ready.wait()
+
+        if service.condition is not None and not service.condition():
+            self._mark(service, "skipped by condition")
+            service.ready.set()
+            return
+
+        existing = []
+        if not service.oneshot:
+            # Scanning /proc blocks, keep it off the event loop.
+            loop = asyncio.get_running_loop()
+            existing = await loop.run_in_executor(None, running_pids, service.process_name)
+        if existing and not service.replace:
+            self._mark(service, "already running (pid %d), adopted" % existing[0])
+            service.ready.set()
+            return
+        for pid in existing:
+            try:
+                os.kill(pid, 15)
+            except OSError:
+                pass
+
+        await self._launch(service)
+        if not service.oneshot and service.process is not None:
+            # Supervise in the background, readiness is already signalled.
+            await self._supervise(service)
+
+    async def _launch(self, service):
+        try:
+            service.process = await asyncio.create_subprocess_exec(
+                *service.argv,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        except OSError as e:
+            self._mark(service, "failed to start: %s" % e)
+            service.failed = True
+            service.ready.set()
+            return
+        self._mark(service, "started (pid %d)" % service.process.pid)
+
+        if service.oneshot:
+            code = await service.process.wait()
+            service.failed = code != 0
+            self._mark(service, "exited %d" % code)
+            service.ready.set()
+            return
+
+        if service.ready_check is not None and not service.ready.is_set():
+            ok = await service.ready_check(service)
+            self._mark(service, "ready" if ok else "readiness check failed")
+            service.failed = not ok and service.process.returncode is not None
+        service.ready.set()
+
+    async def _supervise(self, service):
+        while True:
+            started = time.monotonic()
+            code = await service.process.wait()
+            self._mark(service, "exited %d" % code)
+            if not service.restart or code == 0:
+                return
+            if time.monotonic() - started > self.stable_after:
+                service.restarts = 0
+            if service.restarts >= self.max_restarts:
+                logger.warning("autostart: giving up on %s after %d restarts",
+                               service.name, service.restarts)
+                return
+            delay = min(self.backoff * 2 ** service.restarts, self.max_backoff)
+            service.restarts += 1
+            self._mark(service, "restarting in %.1fs" % delay)
+            logger.info("autostart: %s exited %d, restarting in %.1fs", service.name, code, delay)
+            await asyncio.sleep(delay)
+            await self._launch(service)
+            if service.process is None or service.failed:
+                return
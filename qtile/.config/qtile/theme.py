@@ -0,0 +1,177 @@
+# Cached palettes and live theme switching.
+#
+# The palettes in colors.py are lists of ["#hex", "#hex"] pairs. Passing those
+# pairs to widgets makes the drawer build a cairo gradient between two equal
+# colours and re-parse both hex strings on every draw. Here each palette is
+# parsed once: identical pairs collapse to a single (r, g, b, alpha) tuple that
+# the drawer can use directly, real gradients stay lists.
+#
+# Every parsed colour remembers its index in the palette, so apply() can walk
+# the running layouts and widgets and swap colours in place for another palette
+# without a reload_config. Layout borders need hex strings, use palette.hex for
+# those.
+
+import colors as palettes
+
+PALETTES = [
+    name for name, value in vars(palettes).items()
+    if not name.startswith("_") and isinstance(value, list)
+]
+
+
+class Color(tuple):
+    """A renderer-ready (r, g, b, alpha) tuple tagged with its palette index."""
+
+    def __new__(cls, value, index):
+        color = tuple.__new__(cls, value)
+        color.index = index
+        return color
+
+
+class HexColor(str):
+    """A hex colour string tagged with its palette index, for window borders."""
+
+    def __new__(cls, value, index):
+        color = str.__new__(cls, value)
+        color.index = index
+        return color
+
+
+class Gradient(list):
+    """A list of Colors the drawer renders as a gradient, tagged with its index."""
+
+    def __init__(self, values, index):
+        list.__init__(self, values)
+        self.index = index
+
+
+def parse_hex(value):
+    value = value.lstrip("#")
+    alpha = 1.0
+    if len(value) == 8:
+        alpha = int(value[6:8], 16) / 255.0
+    return (int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16), alpha)
+
+
+class Palette:
+    def __init__(self, name, raw):
+        self.name = name
+        self.rgba = []
+        self.hex = []
+        for index, entry in enumerate(raw):
+            if isinstance(entry, str):
+                entry = [entry]
+            parsed = [parse_hex(c) for c in entry]
+            if len(set(parsed)) == 1:
+                self.rgba.append(Color(parsed[0], index))
+            else:
+                self.rgba.append(Gradient([Color(c, index) for c in parsed], index))
+            self.hex.append(HexColor(entry[0], index))
+
+    def __getitem__(self, index):
+        return self.rgba[index]
+
+    def __len__(self):
+        return len(self.rgba)
+
+    def swap(self, value):
+        """Return the colour from this palette matching an indexed colour value."""
+        if isinstance(value, HexColor):
+            return self.hex[value.index]
+        return self.rgba[value.index]
+
+
+_cache = {}
+
+
+def load(name):
+    """Return the parsed palette, parsing it only the first time it's asked for."""
+    if name not in _cache:
+        _cache[name] = Palette(name, getattr(palettes, name))
+    return _cache[name]
+
+
+current = None
+tracked = []
+listeners = []
+
+
+def use(name):
+    """Pick the palette the config starts with."""
+    global current
+    current = load(name)
+    return current
+
+
+def track(*objs):
+    """Register config-level dicts/objects (layout_theme, ...) to recolour on apply()."""
+    tracked.extend(objs)
+
+
+def on_apply(func):
+    """Call func(palette) after apply() has switched palettes."""
+    listeners.append(func)
+    return func
+
+
+def _recolor(obj, palette):
+    """Swap every indexed colour attribute of obj to palette. Returns True if any changed."""
+    changed = False
+    attrs = obj if isinstance(obj, dict) else vars(obj)
+    for attr, value in list(attrs.items()):
+        if isinstance(value, (Color, HexColor, Gradient)):
+            attrs[attr] = palette.swap(value)
+            changed = True
+        elif attr == "_user_config":
+            # Configurable only copies options onto the object when first
+            # read, the rest still live in the user config.
+            changed = _recolor(value, palette) or changed
+    return changed
+
+
+def apply(qtile, name):
+    """Recolour the running layouts and widgets with a palette in place."""
+    global current
+    palette = load(name)
+    if palette is current:
+        return
+
+    for obj in tracked:
+        _recolor(obj, palette)
+
+    for group in qtile.groups:
+        for layout in group.layouts:
+            _recolor(layout, palette)
+        if group.floating_layout is not None:
+            _recolor(group.floating_layout, palette)
+
+    bars = set()
+    for widget in qtile.widgets_map.values():
+        if not _recolor(widget, palette):
+            continue
+        # Text widgets cache their foreground in the pango layout.
+        text_layout = getattr(widget, "layout", None)
+        if text_layout is not None and hasattr(widget, "foreground"):
+            text_layout.colour = widget.foreground
+        if widget.bar is not None:
+            bars.add(widget.bar)
+        for mirror in getattr(widget, "_mirrors", ()):
+            _recolor(mirror, palette)
+            bars.add(mirror.bar)
+
+    # Borders are painted on layout, so only the visible groups need it now,
+    # the others repaint when they're shown.
+    for screen in qtile.screens:
+        if screen.group is not None:
+            screen.group.layout_all()
+    current = palette
+    for func in listeners:
+        func(palette)
+    for bar in bars:
+        bar.draw()
+
+
+def cycle(qtile):
+    """Switch to the next palette in colors.py."""
+    name = current.name if current is not None else PALETTES[0]
+    apply(qtile, PALETTES[(PALETTES.index(name) + 1) % len(PALETTES)])
@@ -0,0 +1,148 @@
+# MonadTall for groups with very many windows.
+#
+# MonadTall maps and places every secondary window, however many there are,
+# so with 100 terminals the secondary column is 100 slivers a few pixels high
+# and every relayout sends 100 configure requests. VirtualTall shows at most
+# `visible` secondary panes, a page, and keeps the rest unmapped. A relayout
+# only places the main window and the panes on the current page, and unmaps
+# whatever just left the page, so its cost follows the number of visible
+# panes, not the number of windows.
+#
+# The page follows focus (next/previous walk through the hidden windows too)
+# and can be flipped with next_page/previous_page. Panes on a page always
+# share the height evenly. grow, shrink and maximize act on the main pane
+# ratio instead of on single secondary panes.
+
+from libqtile import layout
+from libqtile.command.base import expose_command
+
+
+class VirtualTall(layout.MonadTall):
+    """MonadTall showing one page of secondary windows at a time."""
+
+    defaults = [
+        ("visible", 5, "Number of secondary panes shown at once."),
+    ]
+
+    def __init__(self, **config):
+        layout.MonadTall.__init__(self, **config)
+        self.add_defaults(VirtualTall.defaults)
+        # index of the first secondary window on the page, 0 for clients[1]
+        self.page_start = 0
+        self.shown = set()
+
+    def clone(self, group):
+        c = layout.MonadTall.clone(self, group)
+        c.page_start = 0
+        c.shown = set()
+        return c
+
+    def _secondary_count(self):
+        return max(len(self.clients) - 1, 0)
+
+    def _page(self):
+        """The main window followed by the secondary windows on the page."""
+        clients = self.clients.clients
+        count = self._secondary_count()
+        if count == 0:
+            return clients[:1]
+        visible = min(self.visible, count)
+        focused = self.clients.current_index - 1
+        if focused >= 0:
+            # Scroll just far enough to bring the focused window onto the page.
+            if focused < self.page_start:
+                self.page_start = focused
+            elif focused >= self.page_start + visible:
+                self.page_start = focused - visible + 1
+        # Pages are always full, the last one ends with the last window.
+        self.page_start = max(0, min(self.page_start, count - visible))
+        return [clients[0]] + clients[1 + self.page_start:1 + self.page_start + visible]
+
+    def normalize(self, redraw=True):
+        "Evenly distribute screen-space among the visible secondary panes"
+        n = min(self._secondary_count(), self.visible)
+        if n > 0 and self.screen_rect is not None:
+            self.relative_sizes = [1.0 / n] * n
+        if redraw:
+            self.group.layout_all()
+        self.do_normalize = False
+
+    def layout(self, windows, screen_rect):
+        page = self._page()
+        for client in self.shown.difference(page):
+            client.hide()
+        self.shown = set(page)
+        for slot, client in enumerate(page):
+            self._place(client, slot, screen_rect)
+
+    def configure(self, client, screen_rect):
+        page = self._page()
+        if client not in page:
+            client.hide()
+            return
+        self._place(client, page.index(client), screen_rect)
+
+    def _place(self, client, slot, screen_rect):
+        self.screen_rect = screen_rect
+        if len(self.clients) == 1:
+            layout.MonadTall.configure(self, client, screen_rect)
+            return
+        if self.do_normalize or len(self.relative_sizes) != min(self._secondary_count(), self.visible):
+            self.normalize(False)
+        px = self.border_focus if client.has_focus else self.border_normal
+        self._configure_specific(client, screen_rect, px, slot)
+        client.unhide()
+
+    def remove(self, client):
+        self.shown.discard(client)
+        return layout.MonadTall.remove(self, client)
+
+    def _get_closest(self, x, y, clients):
+        # Windows off the page keep the position they had when last shown.
+        return layout.MonadTall._get_closest(self, x, y, [c for c in clients if c in self.shown])
+
+    # Secondary panes on a page are always the same height.
+
+    def _maximize_focused_secondary(self):
+        pass
+
+    def _maximize_secondary(self):
+        self.ratio = self.min_ratio
+
+    def grow(self):
+        "Grow the main pane"
+        self._grow_main(self.change_ratio)
+        self.group.layout_all()
+
+    def shrink(self):
+        "Shrink the main pane"
+        self._shrink_main(self.change_ratio)
+        self.group.layout_all()
+
+    def _flip_page(self, pages):
+        count = self._secondary_count()
+        if count <= self.visible:
+            return
+        self.page_start = max(0, min(self.page_start + pages * self.visible, count - self.visible))
+        # Focus moves onto the new page, or the page would follow it back.
+        self.group.focus(self.clients[1 + self.page_start])
+
+    @expose_command()
+    def next_page(self):
+        """Show the next page of secondary windows"""
+        self._flip_page(1)
+
+    @expose_command()
+    def previous_page(self):
+        """Show the previous page of secondary windows"""
+        self._flip_page(-1)
+
+    def info(self):
+        d = layout.MonadTall.info(self)
+        count = self._secondary_count()
+        d.update(
+            visible=self.visible,
+            page_start=self.page_start,
+            hidden=max(count - self.visible, 0),
+        )
+        return d
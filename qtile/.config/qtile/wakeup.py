@@ -0,0 +1,185 @@
+# Wall-clock aligned wake-ups for time based widgets.
+#
+# widget.Clock wakes every update_interval seconds, although a "%H:%M" clock
+# only changes once a minute. next_change() looks at the finest strftime
+# field a format uses and works out the wall-clock moment its output can
+# next change. Clock wakes exactly then. Polled sources can declare the same
+# kind of hint, see poller.register(changes=...).
+#
+# Every wake-up goes through one WakeupScheduler, which keeps a single loop
+# timer for the earliest deadline and runs everything that is due when it
+# fires. Widgets on all bars that change on the same boundary therefore share
+# one wake-up.
+
+import heapq
+import itertools
+import re
+import time
+from datetime import datetime, timedelta, tzinfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from libqtile import widget
+from libqtile.log_utils import logger
+
+SECOND = 1
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+# Finest unit each strftime field depends on. Anything not listed is a date
+# field and changes at most once a day.
+_FIELD_UNITS = {
+    "S": SECOND, "s": SECOND, "T": SECOND, "X": SECOND, "c": SECOND, "r": SECOND, "f": SECOND,
+    "M": MINUTE, "R": MINUTE,
+    "H": HOUR, "I": HOUR, "k": HOUR, "l": HOUR, "p": HOUR, "z": HOUR, "Z": HOUR,
+}
+_FIELD = re.compile(r"%[-_0^#]?([a-zA-Z%])")
+
+
+def resolution(fmt):
+    """Seconds between possible changes of strftime(fmt), None if it never changes."""
+    units = [_FIELD_UNITS.get(field, DAY) for field in _FIELD.findall(fmt) if field != "%"]
+    return min(units) if units else None
+
+
+def as_tzinfo(tz):
+    """tz as a tzinfo, a string names a zoneinfo zone. None is local time.
+
+    Clock already turns a string timezone into a tzinfo when it is created,
+    this only covers callers of next_change() that pass a zone name.
+    """
+    if tz is None or isinstance(tz, tzinfo):
+        return tz
+    if not tz:
+        return None
+    try:
+        return ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning("Unknown timezone %r, using local time.", tz)
+        return None
+
+
+def next_change(fmt, now=None, tz=None):
+    """Wall-clock time at which strftime(fmt) can next change, None for never.
+
+    tz is a tzinfo, a zone name such as "Europe/Lisbon" or None for local time.
+    """
+    unit = resolution(fmt)
+    if unit is None:
+        return None
+    now = time.time() if now is None else now
+    if unit < HOUR:
+        # Local time is a whole number of minutes away from UTC.
+        return (now // unit + 1) * unit
+    # Hours and days start on local boundaries, e.g. half-hour time zones.
+    local = datetime.fromtimestamp(now, as_tzinfo(tz))
+    if unit == HOUR:
+        boundary = local.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    else:
+        boundary = datetime.combine(local.date() + timedelta(days=1), datetime.min.time(), local.tzinfo)
+    return boundary.timestamp()
+
+
+# Change hints for poller.register(changes=...)
+
+def never(now):
+    """The value can't change while qtile runs (e.g. the running kernel)."""
+    return None
+
+
+def every(seconds):
+    """The value can change on every multiple of seconds of wall-clock time."""
+    def hint(now):
+        return (now // seconds + 1) * seconds
+    return hint
+
+
+class Wakeup:
+    __slots__ = ("when", "func", "args", "cancelled")
+
+    def __init__(self, when, func, args):
+        self.when = when
+        self.func = func
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class WakeupScheduler:
+    def __init__(self, slack=0.005, max_sleep=300.0):
+        # Fire slightly after the boundary so the new value is already there.
+        self.slack = slack
+        # Loop timers don't count time spent suspended, so never sleep long
+        # enough to miss a boundary by much after a resume.
+        self.max_sleep = max_sleep
+        self.heap = []
+        self.qtile = None
+        self.handle = None
+        self.armed_for = None
+        self.wakeups = 0
+        self.calls = 0
+        self._seq = itertools.count()
+
+    def at(self, qtile, when, func, *args):
+        """Call func(*args) at wall-clock time when. Returns a cancellable handle."""
+        self.qtile = qtile
+        wakeup = Wakeup(when, func, args)
+        heapq.heappush(self.heap, (when, next(self._seq), wakeup))
+        self._arm()
+        return wakeup
+
+    def _arm(self):
+        while self.heap and self.heap[0][2].cancelled:
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return
+        earliest = self.heap[0][0]
+        if self.handle is not None:
+            if self.armed_for <= earliest:
+                return
+            self.handle.cancel()
+        delay = min(max(earliest - time.time(), 0) + self.slack, self.max_sleep)
+        self.armed_for = earliest
+        self.handle = self.qtile.call_later(delay, self._fire)
+
+    def _fire(self):
+        self.handle = None
+        self.wakeups += 1
+        # Nothing runs early: a clock woken before its boundary would only
+        # show the old time again.
+        horizon = time.time()
+        due = []
+        while self.heap and self.heap[0][0] <= horizon:
+            due.append(heapq.heappop(self.heap)[2])
+        for wakeup in due:
+            if not wakeup.cancelled:
+                self.calls += 1
+                wakeup.func(*wakeup.args)
+        self._arm()
+
+    def stats(self):
+        return {"wakeups": self.wakeups, "calls": self.calls, "pending": len(self.heap)}
+
+
+scheduler = WakeupScheduler()
+
+
+class Clock(widget.Clock):
+    """widget.Clock that only wakes when its format's output can change."""
+
+    def timer_setup(self):
+        self._wakeup = None
+        self._tick()
+
+    def _tick(self):
+        self.update(self.poll())
+        when = next_change(self.format, tz=self.timezone)
+        if when is not None and not getattr(self, "finalized", False):
+            self._wakeup = scheduler.at(self.qtile, when, self._tick)
+
+    def finalize(self):
+        if getattr(self, "_wakeup", None) is not None:
+            self._wakeup.cancel()
+        widget.Clock.finalize(self)
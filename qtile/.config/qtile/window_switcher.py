@@ -0,0 +1,262 @@
+# In-process window switcher.
+#
+# "rofi -show window" starts a process that asks the X server for every
+# window's properties and builds its own list, on every use. WindowIndex
+# keeps title, WM_CLASS, group and a most-recently-used rank for each client
+# and is updated from hooks as they change, so a query is one regex search
+# per window over strings that are already lowercased. WindowSwitcher shows
+# the matches in a qtile popup and reads keys there, nothing is spawned.
+#
+# Queries match fuzzily: the typed characters have to appear in order.
+# Tighter and earlier matches rank first, then more recently used windows.
+# Windows in groups without a label (the ScratchPads) are left out, like in
+# navigation.GroupIndex.
+
+import html
+import itertools
+import re
+import time
+
+
+class Entry:
+    __slots__ = ("window", "title", "wm_class", "group", "mru", "key")
+
+    def __init__(self, window, mru):
+        self.window = window
+        self.mru = mru
+        self.title = window.name or ""
+        wm_class = window.get_wm_class() or []
+        self.wm_class = wm_class[-1] if wm_class else ""
+        self.group = window.group
+        self.rekey()
+
+    def rekey(self):
+        group = self.group.name if self.group is not None else ""
+        self.key = ("%s\0%s\0%s" % (self.title, self.wm_class, group)).lower()
+
+
+def _pattern(query):
+    return re.compile(".*?".join(re.escape(c) for c in query.lower()))
+
+
+class WindowIndex:
+    def __init__(self):
+        self.entries = {}
+        self.populated = False
+        self._clock = itertools.count(1)
+        self.queries = 0
+        self.query_us = 0.0
+        self.max_query_us = 0.0
+
+    def populate(self, qtile):
+        """Index the windows that were there before the hooks were."""
+        if self.populated:
+            return
+        self.populated = True
+        for group in qtile.groups:
+            for window in group.windows:
+                if window.wid not in self.entries:
+                    self.entries[window.wid] = Entry(window, next(self._clock))
+            # Oldest focus first, so the last focused window ranks highest.
+            for window in group.focus_history:
+                if window.wid in self.entries:
+                    self.entries[window.wid].mru = next(self._clock)
+
+    def query(self, text, limit=12):
+        """Best matching windows for text, or all by recency if it's empty."""
+        start = time.perf_counter()
+        candidates = [e for e in self.entries.values() if e.group is not None and e.group.label]
+        if not text:
+            candidates.sort(key=lambda e: -e.mru)
+            results = candidates[:limit]
+        else:
+            search = _pattern(text).search
+            scored = []
+            for entry in candidates:
+                match = search(entry.key)
+                if match is not None:
+                    scored.append((match.end() - match.start(), match.start(), -entry.mru, entry))
+            scored.sort(key=lambda s: s[:3])
+            results = [s[3] for s in scored[:limit]]
+        elapsed = (time.perf_counter() - start) * 1e6
+        self.queries += 1
+        self.query_us += elapsed
+        self.max_query_us = max(self.max_query_us, elapsed)
+        return results
+
+    def stats(self):
+        return {
+            "windows": len(self.entries),
+            "queries": self.queries,
+            "query_us_avg": round(self.query_us / self.queries, 1) if self.queries else None,
+            "query_us_max": round(self.max_query_us, 1),
+        }
+
+    # Hook handlers
+
+    def on_client_new(self, client):
+        self.entries[client.wid] = Entry(client, next(self._clock))
+
+    def on_client_killed(self, client):
+        self.entries.pop(client.wid, None)
+
+    def on_client_name_updated(self, client):
+        entry = self.entries.get(client.wid)
+        if entry is not None:
+            entry.title = client.name or ""
+            entry.rekey()
+
+    def on_client_focus(self, client):
+        entry = self.entries.get(client.wid)
+        if entry is not None:
+            entry.mru = next(self._clock)
+
+    def on_group_window_add(self, group, window):
+        entry = self.entries.get(window.wid)
+        if entry is not None and entry.group is not group:
+            entry.group = group
+            entry.rekey()
+
+
+index = WindowIndex()
+
+
+class WindowSwitcher:
+    def __init__(self, index, goto=None, width=900, rows=12, font="sans", fontsize=14,
+                 foreground="#ffffff", background="#111111", highlight="#51afef"):
+        self.index = index
+        # goto(qtile, group_name) brings a group up, see affinity.py
+        self.goto = goto
+        self.width = width
+        self.rows = rows
+        self.font = font
+        self.fontsize = fontsize
+        self.foreground = foreground
+        self.background = background
+        self.highlight = highlight
+        self.qtile = None
+        self.popup = None
+        self.text = ""
+        self.results = []
+        self.selected = 0
+        self.previous = None
+        self._keys = None
+
+    def open(self, qtile):
+        if self.popup is not None:
+            return
+        # The popup needs cairo, which loading the config doesn't.
+        from libqtile.popup import Popup
+
+        self.qtile = qtile
+        self.index.populate(qtile)
+        if self._keys is None:
+            names = ("Escape", "Return", "KP_Enter", "BackSpace", "Up", "Down", "Tab", "ISO_Left_Tab")
+            self._keys = {qtile.core.keysym_from_name(name): name for name in names}
+        screen = qtile.current_screen
+        line = int(self.fontsize * 1.6)
+        height = line * (self.rows + 1) + 16
+        self.popup = Popup(
+            qtile,
+            x=screen.x + (screen.width - self.width) // 2,
+            y=screen.y + screen.height // 5,
+            width=self.width,
+            height=height,
+            font=self.font,
+            fontsize=self.fontsize,
+            foreground=self.foreground,
+            background=self.background,
+            horizontal_padding=12,
+            vertical_padding=8,
+            wrap=False,
+        )
+        self.popup.win.process_key_press = self._on_key
+        self.previous = qtile.current_window
+        self.text = ""
+        self._search()
+        self.popup.place()
+        self.popup.unhide()
+        self.popup.win.focus(False)
+        self._draw()
+
+    def close(self, refocus=True):
+        if self.popup is None:
+            return
+        popup, self.popup = self.popup, None
+        popup.hide()
+        popup.kill()
+        if refocus and self.previous is not None and self.previous.group is not None:
+            self.previous.focus(False)
+        self.previous = None
+
+    def _search(self):
+        self.results = self.index.query(self.text, self.rows)
+        # Like alt-tab, an empty query starts on the window used before this one.
+        current = self.previous
+        self.selected = 1 if not self.text and len(self.results) > 1 and self.results[0].window is current else 0
+
+    def _on_key(self, keysym):
+        name = self._keys.get(keysym)
+        if name == "Escape":
+            self.close()
+            return
+        if name in ("Return", "KP_Enter"):
+            self._choose()
+            return
+        if name == "BackSpace":
+            self.text = self.text[:-1]
+            self._search()
+        elif name in ("Down", "Tab"):
+            self.selected = min(self.selected + 1, max(len(self.results) - 1, 0))
+        elif name in ("Up", "ISO_Left_Tab"):
+            self.selected = max(self.selected - 1, 0)
+        elif 0x20 <= keysym <= 0xFF:
+            # Latin-1 keysyms are their own code points.
+            self.text += chr(keysym)
+            self._search()
+        else:
+            return
+        self._draw()
+
+    def _choose(self):
+        if not self.results:
+            self.close()
+            return
+        window = self.results[self.selected].window
+        self.close(refocus=False)
+        group = window.group
+        if group is None:
+            return
+        if group.screen is None or group.screen is not self.qtile.current_screen:
+            if self.goto is not None:
+                self.goto(self.qtile, group.name)
+            elif group.screen is not None:
+                self.qtile.focus_screen(group.screen.index)
+            else:
+                self.qtile.current_screen.set_group(group)
+        if getattr(window, "minimized", False):
+            window.minimized = False
+        group.focus(window)
+
+    def _draw(self):
+        lines = ["<b>&gt; %s</b>" % html.escape(self.text, quote=False)]
+        for i, entry in enumerate(self.results):
+            label = entry.group.label if entry.group is not None else ""
+            text = "%s  %s  <i>%s</i>" % (
+                html.escape(label, quote=False),
+                html.escape(entry.title, quote=False),
+                html.escape(entry.wm_class, quote=False),
+            )
+            if i == self.selected:
+                text = '<span foreground="%s">%s</span>' % (self.highlight, text)
+            lines.append(text)
+        popup = self.popup
+        popup.clear()
+        popup.layout.text = "\n".join(lines)
+        popup.draw_text()
+        popup.draw()
+
+    def on_client_focus(self, client):
+        # Something else took focus, e.g. a click on a window.
+        if self.popup is not None and client is not self.popup.win:
+            self.close(refocus=False)
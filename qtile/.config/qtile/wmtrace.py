@@ -0,0 +1,264 @@
+# Recording of window manager event traces.
+#
+# Recorder appends what qtile sees to a compact binary trace: key presses,
+# windows mapping and going away, title changes and screen changes, each with
+# the time since the previous record. bench/replay.py feeds a trace back to
+# this config on a headless X server and reports how long every event took
+# to handle, so a slow moment on the desktop can be captured once and kept as
+# a regression test.
+#
+# mod+p e starts and stops recording into ~/.cache/qtile/traces. A config
+# reload ends the recording.
+#
+# Format, all little endian:
+#
+#   header   b"QTRACE" version(u8)
+#   record   kind(u8) delta_us(u32) length(u16) payload
+#
+#   SESSION  wall-clock start (f64), delta is always 0
+#   KEY      keysym (u32) modifier mask (u16)
+#   MAP      wid (u32) then title, instance, class and window type, \0 separated
+#   UNMAP    wid (u32)
+#   TITLE    wid (u32) then the title
+#   SCREENS  x, y, width, height (i16 i16 u16 u16) per screen
+#
+# Files are only ever appended to. Every recording starts with a SESSION
+# record, so several recordings can share one file.
+
+import collections
+import os
+import struct
+import sys
+import time
+
+from libqtile import qtile
+from libqtile.log_utils import logger
+
+MAGIC = b"QTRACE"
+VERSION = 1
+TRACE_DIR = os.path.expanduser("~/.cache/qtile/traces")
+
+SESSION, KEY, MAP, UNMAP, TITLE, SCREENS = range(6)
+KIND_NAMES = {SESSION: "session", KEY: "key", MAP: "map", UNMAP: "unmap", TITLE: "title", SCREENS: "screens"}
+
+_RECORD = struct.Struct("<BIH")
+_WID = struct.Struct("<I")
+_KEY = struct.Struct("<IH")
+_SCREEN = struct.Struct("<hhHH")
+_MAX_DELTA = 2 ** 32 - 1
+_MAX_PAYLOAD = 2 ** 16 - 1
+
+Event = collections.namedtuple("Event", "time kind fields")
+
+
+class TraceError(Exception):
+    pass
+
+
+def _text(value):
+    return (value or "").replace("\0", " ").encode("utf-8", "replace")
+
+
+def encode(kind, *fields):
+    """Payload bytes for a record of kind."""
+    if kind == SESSION:
+        return struct.pack("<d", fields[0])
+    if kind == KEY:
+        return _KEY.pack(*fields)
+    if kind == UNMAP:
+        return _WID.pack(fields[0])
+    if kind in (MAP, TITLE):
+        wid, *strings = fields
+        payload = _WID.pack(wid) + b"\0".join(_text(s) for s in strings)
+        return payload[:_MAX_PAYLOAD]
+    if kind == SCREENS:
+        return b"".join(_SCREEN.pack(*screen) for screen in fields[:_MAX_PAYLOAD // _SCREEN.size])
+    raise TraceError("unknown record kind %r" % kind)
+
+
+def decode(kind, payload):
+    """The fields encode() was given, as a tuple."""
+    if kind == SESSION:
+        return struct.unpack("<d", payload)
+    if kind == KEY:
+        return _KEY.unpack(payload)
+    if kind == UNMAP:
+        return _WID.unpack(payload)
+    if kind in (MAP, TITLE):
+        wid = _WID.unpack_from(payload)[0]
+        strings = payload[_WID.size:].decode("utf-8", "replace").split("\0")
+        if kind == MAP:
+            strings += [""] * (4 - len(strings))
+        return (wid, *strings)
+    if kind == SCREENS:
+        return tuple(_SCREEN.iter_unpack(payload))
+    raise TraceError("unknown record kind %r" % kind)
+
+
+def read(path):
+    """Yield the Events in a trace, times in seconds from the start of the file."""
+    with open(path, "rb") as f:
+        header = f.read(len(MAGIC) + 1)
+        if len(header) <= len(MAGIC) or header[:len(MAGIC)] != MAGIC:
+            raise TraceError("%s is not a trace" % path)
+        if header[len(MAGIC)] != VERSION:
+            raise TraceError("%s has trace version %d, expected %d" % (path, header[-1], VERSION))
+        now = 0
+        while True:
+            head = f.read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                # A recording cut off mid-write still replays up to there.
+                return
+            kind, delta, length = _RECORD.unpack(head)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            now += delta
+            yield Event(now / 1e6, kind, decode(kind, payload))
+
+
+class Writer:
+    """Appends records to a trace file."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.file = open(path, "ab", buffering=65536)
+        if self.file.tell() == 0:
+            self.file.write(MAGIC + bytes([VERSION]))
+        self.last = None
+        self.records = 0
+        # offsets of the KEY records the file currently ends with
+        self.trailing_keys = []
+        self.write(SESSION, time.time())
+
+    def write(self, kind, *fields):
+        now = time.monotonic()
+        delta = 0 if self.last is None or kind == SESSION else int((now - self.last) * 1e6)
+        self.last = now
+        payload = encode(kind, *fields)
+        if kind == KEY:
+            self.trailing_keys.append(self.file.tell())
+        else:
+            self.trailing_keys = []
+        self.file.write(_RECORD.pack(kind, min(delta, _MAX_DELTA), len(payload)))
+        self.file.write(payload)
+        self.records += 1
+
+    def drop_keys(self, count):
+        """Cut the last count records off if they are all KEY records."""
+        if count <= 0 or len(self.trailing_keys) < count:
+            return
+        offset = self.trailing_keys[-count]
+        del self.trailing_keys[-count:]
+        self.file.flush()
+        self.file.truncate(offset)
+        self.file.seek(offset)
+        self.records -= count
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def _process_key_event(keysym, mask):
+    # Looked up through sys.modules so the wrapper, which outlives a config
+    # reload, always reports to the current recorder.
+    sys.modules[__name__].recorder.key(keysym, mask)
+
+
+class Recorder:
+    def __init__(self, flush_interval=1.0):
+        self.flush_interval = flush_interval
+        self.writer = None
+        self._flush_pending = False
+
+    @property
+    def recording(self):
+        return self.writer is not None
+
+    def start(self, path=None):
+        if self.writer is not None:
+            return self.writer.path
+        if path is None:
+            path = os.path.join(TRACE_DIR, time.strftime("%Y%m%d-%H%M%S.qtrace"))
+        self.writer = Writer(path)
+        self._watch_keys()
+        self.screens()
+        logger.info("wmtrace: recording to %s", path)
+        return path
+
+    def stop(self, drop_keys=0):
+        if self.writer is None:
+            return None
+        writer, self.writer = self.writer, None
+        writer.drop_keys(drop_keys)
+        writer.close()
+        logger.info("wmtrace: wrote %d records to %s", writer.records, writer.path)
+        return writer.path
+
+    def toggle(self, qtile=None, keys=2):
+        """Start or stop recording.
+
+        keys is how many key presses the binding calling this takes (mod+p e
+        in config.py). They are dropped from the end of the trace, replaying
+        them would toggle recording again.
+        """
+        if self.writer is None:
+            self.start()
+        else:
+            self.stop(drop_keys=keys)
+
+    def _watch_keys(self):
+        if getattr(qtile, "_wmtrace_keys", False):
+            return
+        process_key_event = qtile.process_key_event
+
+        def recorded(keysym, mask):
+            _process_key_event(keysym, mask)
+            return process_key_event(keysym, mask)
+
+        qtile.process_key_event = recorded
+        qtile._wmtrace_keys = True
+
+    def _write(self, kind, *fields):
+        if self.writer is None:
+            return
+        self.writer.write(kind, *fields)
+        if not self._flush_pending:
+            self._flush_pending = True
+            qtile.call_later(self.flush_interval, self._flush)
+
+    def _flush(self):
+        self._flush_pending = False
+        if self.writer is not None:
+            self.writer.flush()
+
+    # Event sources, see the hooks in config.py
+
+    def key(self, keysym, mask):
+        self._write(KEY, keysym, mask)
+
+    def client_new(self, client):
+        if self.writer is None:
+            return
+        wm_class = client.get_wm_class() or []
+        instance = wm_class[0] if wm_class else ""
+        cls = wm_class[1] if len(wm_class) > 1 else ""
+        get_wm_type = getattr(client, "get_wm_type", None)
+        wm_type = get_wm_type() if get_wm_type is not None else ""
+        self._write(MAP, client.wid, client.name, instance, cls, wm_type)
+
+    def client_killed(self, client):
+        self._write(UNMAP, client.wid)
+
+    def client_name_updated(self, client):
+        self._write(TITLE, client.wid, client.name)
+
+    def screens(self, *args):
+        self._write(SCREENS, *((s.x, s.y, s.width, s.height) for s in qtile.screens))
+
+
+recorder = Recorder()